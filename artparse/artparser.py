@@ -1,24 +1,93 @@
 # TODO: Author parsing produces sub-par results if author format changes in single reference
 # eg. from lastname-firstname --> firstname-lastname: such as "Lastname1, E., F. Lastname2, S. Lastname3"
 
+import os.path
 import sys
-import pdftotext
-from PyPDF2 import PdfFileReader
-from collections import defaultdict
-from difflib import SequenceMatcher
+from collections import namedtuple
+from contextlib import nullcontext
 from . import reference
 from . import author
+from . import pagegrid
+from . import headers
+from . import textstore
+from . import patterns
+from . import pagestore
+from . import pdfmanipulate
+from . import layout
+from . import backends
+from .events import NULL_SINK
 #import reference
 #import author
 import regex as re
 
+# Streaming read keeps at least this many pages so headers and footers can still be detected
+STREAMING_MIN_PAGES = 2 * headers.MIN_PAGES + 2
+# Files with these extensions are read as pre-extracted text, pages separated by form feeds
+TEXT_EXTENSIONS = [".txt"]
+PAGE_BREAK = "\f"
+# Number of leading words of a reference searched for when locating it in the page texts
+LOCATE_WORDS = 4
+# Triage samples the last pages, where the references usually are, and pages spread over the rest
+TRIAGE_LAST_PAGES = 3
+TRIAGE_SPREAD_PAGES = 3
+
+# Outcome of Extractor.triage
+# file_size: bytes, or None for stdin
+# has_text: whether most sampled pages have a text layer (if not, the document needs OCR)
+# two_column: whether most sampled pages with text have two or more columns
+# references_page: page number (counting from zero) of the last references heading in the sampled pages, or None
+# backend: name of the text extraction backend used, None for text input
+# info: document information dictionary of the pdf, or None
+# sampled_pages: page numbers the answers are based on
+# error: why the pdf could not be decoded, or None. Page count, references page and info of such documents are None.
+Triage = namedtuple("Triage", ["filename", "file_size", "page_count", "has_text", "two_column", "references_page",
+                               "backend", "info", "sampled_pages", "error"], defaults=[None])
+
+def triage_page_numbers(page_count):
+    """Page numbers sampled by triage: the last pages and evenly spaced pages before them"""
+    last_start = max(0, page_count - TRIAGE_LAST_PAGES)
+    spread = {round(i * last_start / TRIAGE_SPREAD_PAGES) for i in range(TRIAGE_SPREAD_PAGES)} if last_start else set()
+    return sorted(spread | set(range(last_start, page_count)))
+
+
+def has_reference_heading(page, splits=None):
+    """
+    Whether a page has the reference section heading on a line of its own. On pages with columns the
+    heading shares its lines with the other columns, so the columns are searched one by one.
+    splits: column splits of the page, detected when needed if not given
+    """
+    if patterns.REFERENCE_HEADING.search(page):
+        return True
+    if not patterns.REFERENCE_HEADING_WORDS.search(page):
+        return False
+    if splits is None:
+        splits = pagegrid.detect_column_splits(pagegrid.PageGrid.from_page(page))
+    if len(splits) == 0:
+        return False
+    lines = page.splitlines()
+    return any(patterns.REFERENCE_HEADING.search("\n".join(line[start:stop] for line in lines))
+               for start, stop in pagegrid.column_bounds(splits))
+
+
 class Extractor(object):
-    def __init__(self, pdffile=None):
+    def __init__(self, pdffile=None, events=None):
         self.pdffile = pdffile
+        self.events = events if events is not None else NULL_SINK
+        self.profile = None
+        self.page_store = None
+        self.text_input = None
+        self.ocr = None
+        self.backend = backends.DEFAULT_BACKEND
+        self.backend_used = None
+        self.layout_executor = None
         self.pdf = None
         self.header_footer_info = None
         self.column_info = None
         self.margin_info = None
+        self.page_layouts = None
+        self._page_grids = {}
+        self.page_offset = 0
+        self._document_text = None
         self.references_start_index = None
         self.references = []
         self.references_layout = None
@@ -28,21 +97,55 @@ class Extractor(object):
         if self.pdf:
             return "\n\n".join(self.pdf)
         else:
-            print("The pdf file has not been converted to text, or there is no text (such as image pdf).")
+            self.events.emit("no_text", "The pdf file has not been converted to text, or there is no text (such as image pdf).")
+
+    def stage(self, name):
+        """Context manager measuring a pipeline stage, if a DocumentProfile is attached to self.profile"""
+        if self.profile is None:
+            return nullcontext()
+        return self.profile.stage(name, self)
 
     def get_fulltext(self):
-        if self.pdf:
-            return "\n\n".join(self.pdf) + "\n\n"
-        else:
-            return ""
+        return self.get_document_text().text
+
+    def get_document_text(self):
+        """Returns the full text store of the pages. It is only rebuilt when pages have changed."""
+        if self._document_text is None or not self._document_text.is_current(self.pdf):
+            self._document_text = textstore.DocumentText(self.pdf or [], self.page_offset)
+        return self._document_text
+
+    def get_references_start_location(self):
+        """Returns (page_number, line_number) of the reference section start, or None if not detected"""
+        if not self.references_start_index:
+            return None
+        return self.get_document_text().locate(self.references_start_index)
+
+    def locate_references(self):
+        """
+        Sets the source pdffile, page and line of every reference. A reference is located where its
+        first words occur in the page texts, searching forward from the previous reference.
+        References whose text was rewritten (eg. repetition dashes) are left without location.
+        """
+        document = self.get_document_text()
+        position = self.references_start_index or 0
+        for ref in self.references:
+            ref.pdffile = self.pdffile or ""
+            words = ref.rawtext.split()[:LOCATE_WORDS]
+            if len(words) == 0:
+                continue
+            match = re.search(r"\s+".join(re.escape(word) for word in words), document.text, pos=position)
+            if match is None:
+                continue
+            ref.page, ref.line = document.locate(match.start())
+            position = match.start()
 
     def get_pdf_info(self):
+        """Returns the document information dictionary of the pdf, or None"""
         try:
-            input = PdfFileReader(open(self.pdffile, "rb"))
-            input.getDocumentInfo()
+            with open(self.pdffile, "rb") as infile:
+                return backends.document_info(infile)
         except FileNotFoundError as e:
-            print("File not found")
-            print(e)
+            self.events.emit("error", "File not found: {error}", error=e)
 
     def get_references_plaintext(self, plaintext):
         self.indentation_parse(plaintext)
@@ -54,10 +157,7 @@ class Extractor(object):
         else:
             self.read()
             self.detect_headers_footers()
-            self.remove_headers_footers()
-            self.remove_document_margins()
-            self.detect_columns()
-            self.two_columns_to_one()
+            self.normalize_layout()
             self.detect_reference_start()
             self.detect_references_layout()
             if self.references_layout == "indentation":
@@ -69,8 +169,7 @@ class Extractor(object):
     def detect_semicolons(self):
         number_of_semicolons = 0
         for ref in self.references:
-            found_semicolons = re.findall(";", ref.rawtext)
-            number_of_semicolons += len(found_semicolons)
+            number_of_semicolons += ref.rawtext.count(";")
         if number_of_semicolons > len(self.references) / 4:
             self.reference_style["semicolons"] = True
             return True
@@ -78,46 +177,244 @@ class Extractor(object):
             self.reference_style["semicolons"] = False
             return False
         
-    def read(self):
-        """Read pdf from given file location into list of page strings"""
+    def read(self, streaming=False):
+        """
+        Read pdf from given file location into list of page strings.
+        With streaming, pages are decoded one by one starting from the last page. Reading stops
+        once the reference section heading has been found and enough pages are read for header
+        and footer detection. page_offset is the page number of the first page that was read.
+        If self.page_store is set to a path, pages are read from that page store file instead of
+        decoding the pdf. When the file does not exist yet, the pages that were read are written
+        there, so a store written by a streaming read is only used by streaming reads.
+        If self.ocr is set to a pdfmanipulate.OcrEngine, pages without text are OCRd. When streaming
+        only the pages that are read are OCRd.
+        The pdf is decoded with self.backend: a backends.Backend, a backend name or "auto" to probe
+        the backends on this document and use the fastest with usable text. The name of the backend
+        that was used is set to self.backend_used.
+        """
 
-        if self.pdffile:
+        if self.pdffile and self.is_text_input():
+            self.read_textfile(self.pdffile, streaming=streaming)
+        elif self.pdffile:
             try:
+                if self.page_store is not None and os.path.exists(self.page_store):
+                    try:
+                        with pagestore.PageStore(self.page_store) as pdf:
+                            # Stored pages are OCRd already. A store of a streaming read lacks the first pages.
+                            if streaming or pdf.page_offset == 0:
+                                self._read_pages(pdf, streaming)
+                                self.page_offset += pdf.page_offset
+                                return
+                    except pagestore.PageStoreError as e:
+                        self.events.emit("error", "Cannot use page store, decoding pdf again: {error}", error=e)
+
+                # The file stays open while the pages are decoded, it is not read into memory as a whole
                 with open(self.pdffile, "rb") as infile:
-                    self.pdf = [page for page in pdftotext.PDF(infile)]
+                    self._read_pages(self._with_ocr(self._open_pages(infile), lazy=streaming), streaming)
+                if self.page_store is not None:
+                    pagestore.write_pages(self.page_store, self.pdf, page_offset=self.page_offset)
             except FileNotFoundError:
-                print("Error: File not found")
+                self.events.emit("error", "Error: File not found: {filename}", filename=self.pdffile)
+
+    def _open_pages(self, infile):
+        """Returns the lazy page sequence of the pdf in the open file infile decoded by the backend of self.backend"""
+        if self.backend != backends.AUTO:
+            backend = backends.get_backend(self.backend)
+            self.backend_used = backend.name
+            return backend.pages(infile)
+
+        probe = backends.probe(infile)
+        timings = ", ".join(f"{name} {seconds * 1000:.1f} ms{'' if usable else ' unusable'}"
+                            for name, (seconds, usable) in probe.timings.items())
+        if probe.backend is None:
+            # Nothing gives text, most likely a scan: read it as usual and leave it to OCR
+            backend = backends.get_backend(backends.DEFAULT_BACKEND)
+            self.backend_used = backend.name
+            self.events.emit("backend", "No backend gives usable text of {filename} ({timings}), using {backend}",
+                             filename=self.pdffile, timings=timings, backend=backend.name)
+            infile.seek(0)
+            return backend.pages(infile)
+        self.backend_used = probe.backend.name
+        self.events.emit("backend", "Reading {filename} with {backend} ({timings})",
+                         filename=self.pdffile, timings=timings, backend=probe.backend.name)
+        return probe.pages
+
+    def triage(self):
+        """
+        Returns a Triage of the document for routing it before the full parse: image pdfs to OCR,
+        long documents to a queue of their own and documents without references to be skipped.
+        Only the document information, page count and the pages of triage_page_numbers are decoded.
+        Nothing is OCRd. Returns None if the file is not found, and a Triage with the error if the
+        backend cannot decode it.
+        """
+        if self.pdffile is None:
+            self.events.emit("error", "No file to triage")
+            return None
+        if self.is_text_input():
+            # Text is read as a whole, there is no decoding to save
+            self.read_textfile(self.pdffile)
+            if self.pdf is None:
+                return None
+            return self._triage_pages(self.pdf, None)
+
+        try:
+            infile = open(self.pdffile, "rb")
+        except FileNotFoundError:
+            self.events.emit("error", "Error: File not found: {filename}", filename=self.pdffile)
+            return None
+        with infile:
+            try:
+                pages = self._open_pages(infile)
+                info = None
+                try:
+                    info = backends.document_info(infile)
+                except Exception as e:
+                    self.events.emit("error", "Cannot read document info: {error}", error=e)
+                return self._triage_pages(pages, info)
+            except backends.DECODE_ERRORS as e:
+                self.events.emit("error", "Cannot decode {filename}: {error}", filename=self.pdffile, error=e)
+                return Triage(self.pdffile, os.path.getsize(self.pdffile), None, has_text=False, two_column=False,
+                              references_page=None, backend=self.backend_used, info=None, sampled_pages=[],
+                              error=f"{type(e).__name__}: {e}")
+
+    def _triage_pages(self, pages, info):
+        """Returns the Triage of the document from its page sequence and document information"""
+        file_size = os.path.getsize(self.pdffile) if self.pdffile != "-" else None
+
+        page_count = len(pages)
+        sampled = triage_page_numbers(page_count)
+        sample = {page_nr: pages[page_nr] for page_nr in sampled}
+        text_pages = [page_nr for page_nr in sampled if not pdfmanipulate.is_textless(sample[page_nr])]
+        splits = {page_nr: pagegrid.detect_column_splits(pagegrid.PageGrid.from_page(sample[page_nr]))
+                  for page_nr in text_pages}
+        multi_column = [page_nr for page_nr in text_pages if len(splits[page_nr]) > 0]
+        references_page = None
+        for page_nr in reversed(text_pages):
+            if has_reference_heading(sample[page_nr], splits[page_nr]):
+                references_page = page_nr
+                break
+
+        result = Triage(self.pdffile, file_size, page_count,
+                        has_text=len(text_pages) > 0 and 2 * len(text_pages) >= len(sampled),
+                        two_column=len(multi_column) > 0 and 2 * len(multi_column) > len(text_pages),
+                        references_page=references_page, backend=self.backend_used, info=info, sampled_pages=sampled)
+        self.events.emit("triage", "{pages} pages, text: {has_text}, two columns: {two_column}, "
+                                   "references heading on page {heading}", pages=page_count,
+                         has_text=result.has_text, two_column=result.two_column, heading=references_page)
+        return result
+
+    def _with_ocr(self, pdf, lazy=False):
+        """Returns pages of pdf with pages without text OCRd by self.ocr, or pdf as is if OCR is not used"""
+        if self.ocr is None:
+            return pdf
+        if lazy:
+            return pdfmanipulate.OcrPages(self.ocr, self.pdffile, pdf, self.events)
+        pages = self.ocr.fill_pages(self.pdffile, pdf, self.events)
+        self.events.emit("ocr", "OCR: {ocrd} pages recognized and {cached} taken from cache so far",
+                         ocrd=self.ocr.pages_ocrd, cached=self.ocr.cache_hits)
+        return pages
+
+    def is_text_input(self):
+        """
+        Whether pdffile is pre-extracted text instead of a pdf: "-" (stdin) or a file with text extension.
+        Set self.text_input to True or False to override the detection.
+        """
+        if self.text_input is not None:
+            return self.text_input
+        if self.pdffile is None:
+            return False
+        return self.pdffile == "-" or os.path.splitext(self.pdffile)[1].lower() in TEXT_EXTENSIONS
+
+    def read_textfile(self, filename, streaming=False):
+        """Read pages from a text file (or stdin if filename is "-") in pdftotext output format"""
+        try:
+            if filename == "-":
+                text = sys.stdin.read()
+            else:
+                with open(filename, "r", encoding="utf8", errors="replace") as infile:
+                    text = infile.read()
+        except FileNotFoundError:
+            self.events.emit("error", "Error: File not found: {filename}", filename=filename)
+            return
+        self.read_text(text, streaming=streaming)
+
+    def read_text(self, text, streaming=False):
+        """
+        Read pages from a string with form feeds between pages, like pdftotext command line output.
+        A form feed ending the last page does not start a new page.
+        """
+        pages = text.split(PAGE_BREAK)
+        if len(pages) > 1 and pages[-1] == "":
+            pages.pop()
+        self.read_pages(pages, streaming=streaming)
+
+    def read_pages(self, pages, streaming=False):
+        """Read pre-extracted page texts from any iterable of strings"""
+        if streaming and not isinstance(pages, (list, tuple)):
+            pages = list(pages)
+        self._read_pages(pages, streaming)
+
+    def _read_pages(self, pdf, streaming=False):
+        """Read pages from a sequence of page texts, such as the pages of a backend"""
+        if streaming:
+            self._read_from_end(pdf)
+        else:
+            self.pdf = [page for page in pdf]
+            self.page_offset = 0
+
+    def _read_from_end(self, pdf):
+        """Read pages backwards from a lazily decoding page sequence until references start is covered"""
+        pages = []
+        heading_page = None
+        first_page = len(pdf)
+        for page_nr in reversed(range(len(pdf))):
+            page = pdf[page_nr]
+            pages.append(page)
+            first_page = page_nr
+            if heading_page is None and has_reference_heading(page):
+                heading_page = page_nr
+            if heading_page is not None and len(pages) >= STREAMING_MIN_PAGES:
+                break
+
+        pages.reverse()
+        self.pdf = pages
+        self.page_offset = first_page
+        self.events.emit("read_streaming", "Read pages {first}-{last} of {total}, references heading on page {heading}",
+                         first=first_page, last=first_page + len(pages) - 1, total=len(pdf), heading=heading_page)
 
     def remove_document_margins(self):
         """ Remove margins from the whole document. Only allow fully succesful results."""
         try:
             newpdf = []
-            for page in self.pdf:
-                newpdf.append(self.remove_page_margins(page))
+            for page_nr, page in enumerate(self.pdf):
+                grid = self._page_grid(page_nr)
+                stripped_page = self.remove_page_margins(page, grid=grid)
+                newpdf.append(stripped_page)
+                if stripped_page is not None and stripped_page is not page:
+                    left_start, right_end = self.margin_info
+                    self._set_page_grid(page_nr, stripped_page, grid.slice_columns(left_start, right_end + 1))
             self.pdf = newpdf
         except:
             e = sys.exc_info()[0]
-            print("Something went wrong removing margins from whole document")
-            print(e) 
+            self.events.emit("error", "Something went wrong removing margins from whole document: {error}", error=e)
 
-    def remove_page_margins(self, page):
+    def remove_page_margins(self, page, grid=None):
         """ Removes margins from document"""
         try:
-            self.detect_margins(page, allow_junk=2)
+            self.detect_margins(page, allow_junk=2, grid=grid)
             left_start, right_end = (self.margin_info)
             stripped_page = "\n".join(row[left_start:right_end+1] for row in page.splitlines())
             #print(f"----- MARGIN INFO: {self.margin_info} STRIPPED PAGE:")
             #print(stripped_page)
             return stripped_page
         except TypeError as e:
-            print(e)
+            self.events.emit("error", "{error}", error=e)
         except:
             e = sys.exc_info()[0]
-            print("Something went wrong removing margins from page. Page unmodified")
-            print(e)
+            self.events.emit("error", "Something went wrong removing margins from page. Page unmodified: {error}", error=e)
             return page
 
-    def detect_margins(self, page, allow_junk=2):
+    def detect_margins(self, page, allow_junk=2, grid=None):
         """
         Detects margins on a page.
         Allowed levels of junk in the margin can vary:
@@ -125,169 +422,58 @@ class Extractor(object):
         1: margin can contain isolated numbers and punctuation (to match page numbers etc.)
         2: left margin can contain isolated text (to match small layout elements, such as names or keywords)
            and don't strip any text from right margin
+        Pass the character grid of the page if it is already available.
+        """
+        if grid is None:
+            grid = pagegrid.PageGrid.from_page(page)
+        self.margin_info = pagegrid.detect_margins(grid, allow_junk=allow_junk)
+        return self.margin_info
+
+    def _page_grid(self, page_nr):
+        """Returns character class grid of a page. The grid is built only once for each page text."""
+        page = self.pdf[page_nr]
+        cached = self._page_grids.get(page_nr)
+        if cached is None or cached[0] is not page:
+            cached = (page, pagegrid.PageGrid.from_page(page))
+            self._page_grids[page_nr] = cached
+        return cached[1]
+
+    def _set_page_grid(self, page_nr, page, grid):
+        """Stores a grid derived from an earlier grid when a stage rewrites the page text"""
+        # page.splitlines() does not produce the trailing empty row of a page ending with a newline
+        if page.endswith("\n") and grid.rows > 0:
+            grid = grid.slice_rows(0, -1)
+        self._page_grids[page_nr] = (page, grid)
+
+    def detect_headers_footers(self, page_parity=None):
         """
+        Detects the number of header and footer lines separately for even and odd pages
+        (headers and footers often vary between even and odd pages).
+        Stores {"even": (header_lines, footer_lines), "odd": (...)} in header_footer_info.
+        Set page_parity to "even" or "odd" to detect only one of them.
+        """
+        parities = [page_parity] if page_parity else ["even", "odd"]
+        if self.header_footer_info is None:
+            self.header_footer_info = {"even": (0, 0), "odd": (0, 0)}
 
-        rows = page.splitlines()
-        column_length = len(rows)
-        longest_row = max([len(row) for row in rows])
-        start_of_text = 0
-        end_of_text = longest_row -1
-
-        page_as_columns = [[] for _ in range(0, longest_row)]
-        for row in rows:
-            if len(row) < longest_row:
-                row = row + " " * (longest_row - len(row)) 
-            for index, char in enumerate(row):
-                page_as_columns[index].append(char)
-
-        columns_info = []
-        for column in page_as_columns:
-            column_data = {"spaces": 0, "numbers": 0, "punctuation": 0, "text": 0, "other": 0}
-            for char in column:
-                if char.isspace():
-                    column_data['spaces'] += 1
-                elif char.isnumeric():
-                    column_data['numbers'] += 1
-                elif char in [",", ";", "(", ")", ".", "{", "}", "[", "]"]:
-                    column_data['punctuation'] += 1
-                elif char.isalpha():
-                    column_data['text'] += 1
-                else:
-                    column_data['other'] += 1   
-            columns_info.append(column_data)
-
-        # left margin detection
-        for index, info in enumerate(columns_info):
-            if allow_junk == 0:
-                if info['spaces'] == column_length:
-                    start_of_text += 1
-                else: break
-            if allow_junk == 1:
-                if (info['spaces'] + info['numbers'] + info['punctuation']) == column_length:
-                    if info['numbers'] < 6:
-                        start_of_text += 1
-                    else: break
-                else: break
-            if allow_junk == 2:
-                if info['text'] < 6 and info['numbers'] < 6:
-                    start_of_text += 1
-                else: break
-
-        # right margin detection: since right can be unaligned, strip very carefully and no text at all
-        for index, info in reversed(list(enumerate(columns_info))):
-            if allow_junk == 0:
-                if info['spaces'] == column_length:
-                    end_of_text -= 1
-                else: break
-            if allow_junk == 1 or allow_junk == 2:
-                if (info['spaces'] + info['numbers'] + info['punctuation']) == column_length:
-                    if info['numbers'] < 2:
-                        end_of_text -= 1
-                    else: break
-                else: break
- 
-        self.margin_info = (start_of_text, end_of_text)
-
-    # TODO: Make work with matching but differenent even and odd page headers and footers
-    def detect_headers_footers(self, page_parity="even"):
-        """
-        Detects the number of header and footer lines from pdf_object
-        set page_parity for even or odd pages (headers and footers often vary between even and odd pages)
-        """
-        header_lines = 0
-        footer_lines = 0
-        line_to_investigate = 0
-        start_page = 0 if page_parity == "even" else 1
-
-        if len(self.pdf) < 5:
-            print("There should be at least 4 pages to identify header and footer by similarity.")
-            self.header_footer_info = (0 , 0)
-
-        while line_to_investigate != "stop":
-            page_number = start_page
-            lines_to_compare = []
-            while page_number < len(self.pdf):
-                print(f"Investingating page number {page_number} for headers and footers")
-                page = self.pdf[page_number]
-                # get the line in question, remove whitespace, add to list
-                lines_to_compare.append(re.sub(r"\s+", " ", page.splitlines()[line_to_investigate]))
-                page_number += 2
-
-            similarity_scores = []
-            line1 = lines_to_compare[0]
-            for line2 in lines_to_compare[1:]:
-                similarity_scores.append(SequenceMatcher(None, line1, line2).ratio())
-                #print(SequenceMatcher(None, line1, line2).ratio())
-                line1 = line2
-
-            print("For line {} the similarity score is {}".format(line_to_investigate, (sum(similarity_scores) / len(similarity_scores))))
-            if (sum(similarity_scores) / len(similarity_scores)) > 0.7:
-                if line_to_investigate >= 0:
-                    header_lines += 1
-                    line_to_investigate += 1
-                else:
-                    footer_lines += 1
-                    line_to_investigate -= 1
-            else:
-                if line_to_investigate >= 0:
-                    line_to_investigate = -1
-                else:
-                    line_to_investigate = "stop"
-        
-        self.header_footer_info = (header_lines, footer_lines)
+        for parity in parities:
+            page_numbers = [page_nr for page_nr in range(len(self.pdf)) if self._page_parity(page_nr) == parity]
+            self.header_footer_info[parity] = headers.detect_headers_footers(self.pdf, page_numbers)
+            self.events.emit("headers_footers", "Header and footer lines on {parity} pages: {lines}",
+                             parity=parity, lines=self.header_footer_info[parity])
+
+    def _page_parity(self, page_nr):
+        return "even" if (self.page_offset + page_nr) % 2 == 0 else "odd"
 
     def detect_columns(self):
         """
-        Detects if there are one or two columns
-        Stores second column start indexes in a list of integers
+        Detects the columns of every page
+        Stores a list of column start indexes (besides the first column) for every page in column_info
         """
 
-        second_columns_start_indexes = []
-
-        for page in self.pdf:
-            longest_line = max([len(row) for row in page.splitlines()])
-            print(f"Longest line = {longest_line} characters")
-            spaces = defaultdict(int)
-            rows = 0
-            try:
-                for row in page.splitlines():
-                    if len(row) < longest_line:
-                        row = row + (" " * (longest_line-len(row)))
-                        print(f"New row: {row}")
-                    rows += 1
-                    for space_location in re.finditer(r" ", row):
-                        position = space_location.start(0)
-                        midpoint = len(row) / 2 if len(row) > 40 else 0
-                        if abs(position - midpoint) < 20:
-                        #if len(row) > 40 and position > 19 and position < len(row) - 19:
-                            spaces[position] += 1
-            except:
-                e = sys.exc_info()[0]
-                print("Something went wrong trying to detect space locations for page")
-                print(e)
-
-            index_of_second_column = 0
-            try:
-                print(f"Ratio of highest whitespace to rows: {max(spaces.values())} / {rows} = {max(spaces.values()) / rows}")
-                if (max(spaces.values()) / rows) < 0.61:
-                    #second_columns_start_indexes.append(0)
-                    continue
-
-                highest_space_nr = 0
-                for position, value in sorted(spaces.items()):
-                    if value >= highest_space_nr:
-                        highest_space_nr = value
-                        index_of_second_column = position
-                        #print(f"Changing column start value to {position}")
-                index_of_second_column += 1
-
-            except ValueError as e:
-                print("Getting ValueError, which probably means there are no columns on this page")
-                print(e)
-            finally:
-                second_columns_start_indexes.append(index_of_second_column)
-
-        self.column_info = second_columns_start_indexes
+        self.column_info = []
+        for page_nr in range(len(self.pdf)):
+            self.column_info.append(pagegrid.detect_column_splits(self._page_grid(page_nr)))
 
     def detect_reference_start(self):
 
@@ -300,27 +486,28 @@ class Extractor(object):
         for title_wording in reference_regexes:
             potential_reference_starts += [r.end() for r in re.finditer(title_wording, pdftext, re.IGNORECASE)]
 
-        print("Found these starts of potential reference section")
-        for ref in potential_reference_starts:
-            print(f"MATCH: {pdftext[ref-1:ref+20]}... at location {ref}")
-
-        print(f"There are {len(potential_reference_starts)} potential reference start points")
+        if self.events.enabled:
+            for ref in potential_reference_starts:
+                self.events.emit("reference_start_candidate", "MATCH: {context}... at location {position}",
+                                 context=pdftext[ref-1:ref+20], position=ref)
+        self.events.emit("reference_start_candidates", "There are {count} potential reference start points",
+                         count=len(potential_reference_starts))
 
         if len(potential_reference_starts) == 0:
-            print("Could not detect references start point.")
+            self.events.emit("reference_start_missing", "Could not detect references start point.")
         elif len(potential_reference_starts) == 1:
             self.references_start_index = potential_reference_starts[0]
         else:
-            print("There were more than one probable reference section. Detecting the most probable one.")
+            self.events.emit("reference_start_ambiguous", "There were more than one probable reference section. Detecting the most probable one.")
             most_probable_start_point = 0
             most_year_mentions = 0
             # Test of correct reference point is based on how many year numbers are followed by the keyword
             # As it is more likely for references to be in the end of the self (although not always the case)
             # The number of year numbers is multiplied by index of the finding...
             for index, test_start in enumerate(potential_reference_starts):
-                test_text = pdftext[test_start:test_start+1000]
-                nr_year_mentions = (index +1) * len(re.findall(r"[\s\(\.,;]((?:19|20)\d\d)[\s\)\.,;]", test_text))
-                print(f"Position {test_start} is followed by {nr_year_mentions} year mentions.")
+                nr_year_mentions = (index +1) * len(patterns.YEAR_MENTION.findall(pdftext, test_start, test_start+1000))
+                self.events.emit("reference_start_score", "Position {position} is followed by {year_mentions} year mentions.",
+                                 position=test_start, year_mentions=nr_year_mentions)
                 if nr_year_mentions > most_year_mentions:
                     most_probable_start_point = test_start
                     most_year_mentions = nr_year_mentions
@@ -335,52 +522,60 @@ class Extractor(object):
         This also detects whether style "Author F, Author DI" or "Author, F., Author D. I." is used.
         """
         if len(self.references) < 1:
-            print("There are no references.")
+            self.events.emit("no_references", "There are no references.")
             return
         
         self.reference_style = {}
-        # Try to detect ISO 690 type references style based on location of year number
-        print("Try to detect ISO 690")
+        self.events.emit("reference_style", "Try to detect ISO 690")
+
+        # Single sweep over the references collecting everything the style decisions need
         year_positions = []
+        parenthesized = 0
+        number_of_semicolons = 0
+        author_counts = []
         for reference in self.references:
-            years = [r.end() for r in re.finditer(r"(?:19|20)\d\d", reference.rawtext)] 
-            for match in years: 
-                year_positions.append(match/len(reference))
-        
-        if sum(year_positions)/len(year_positions) > 0.6:
+            features = reference.features
+            for year in features.years:
+                year_positions.append(year.end/len(reference))
+                if year.end < len(reference) - 1 and reference.rawtext[year.end] == ")":
+                    parenthesized += 1
+            number_of_semicolons += reference.rawtext.count(";")
+            author_counts.append(self._score_author_styles(reference))
+
+        # Try to detect ISO 690 type references style based on location of year number
+        if len(year_positions) > 0 and sum(year_positions)/len(year_positions) > 0.6:
             self.reference_style['bibref'] = 'iso690'
         else:
             self.reference_style['bibref'] = 'apa'
 
-        
         # Detect use of semicolons
-        self.reference_style['semicolons'] = self.detect_semicolons()
+        self.reference_style['semicolons'] = number_of_semicolons > len(self.references) / 4
 
         # Detect if year numbers are parenthesized
-        parenthesized = 0
-        for reference in self.references:
-            years = [r.end() for r in re.finditer(r"(?:19|20)\d\d", reference.rawtext)] 
-            for match in years: 
-                if match < len(reference) - 1:
-                    if reference.rawtext[match] == ")":
-                        parenthesized += 1
-
         if parenthesized / len(self.references) > 0.5:
             self.reference_style['parenthesis'] = True
         else:
             self.reference_style['parenthesis'] = False
-        
+
         # Detect whether "Author F, Author DI" vs. "Author, F., Author, D.I." is used
-        self.reference_style['comma_inside_name'] = True
-        commas = 0
-        for reference in self.references:
-            commas += self.extract_authors(reference, just_count=True)
-        self.reference_style['comma_inside_name'] = False
-        nocommas = 0
-        for reference in self.references:
-            nocommas += self.extract_authors(reference, just_count=True)
-        if commas > nocommas:
-            self.reference_style['comma_inside_name'] = True
+        commas = sum(counts[self.reference_style['bibref']][True] for counts in author_counts)
+        nocommas = sum(counts[self.reference_style['bibref']][False] for counts in author_counts)
+        self.reference_style['comma_inside_name'] = commas > nocommas
+
+    def _score_author_styles(self, ref):
+        """
+        Counts authors matched with both name styles from the author text of reference.
+        Returns {bibref: {comma_inside_name: count}} for both apa and iso690 author texts.
+        """
+        scores = {}
+        for bibref in ["iso690", "apa"]:
+            try:
+                end = self._author_text_end(ref, bibref)
+                scores[bibref] = {True: len(ref.features.authors(end, True)),
+                                  False: len(ref.features.authors(end, False))}
+            except TypeError:
+                scores[bibref] = {True: 0, False: 0}
+        return scores
 
     def detect_references_layout(self):
         """
@@ -393,7 +588,7 @@ class Extractor(object):
         starting_lines = 0
         indented_lines = 0
         rows = 0
-        reference_section = self.get_fulltext()[self.references_start_index:self.references_start_index + 2000]
+        reference_section = self.get_document_text().slice(self.references_start_index, self.references_start_index + 2000)
         for row in reference_section.splitlines():
             rows += 1
             if len(row) == 0 or row.isspace():
@@ -408,99 +603,127 @@ class Extractor(object):
         else:
             self.references_layout = "not_detected"
 
-    def _trim_left_margin(self, page):
+    def _trim_left_margin(self, page, grid=None):
         """
         Removes any whitespace margin from the left side of the page
         param1: page as string (or any string)
         returns trimmed page as string
         Note: ignores first and last rows on the page (possible left-over headers, page numbers)
         """
+        if grid is None:
+            grid = pagegrid.PageGrid.from_page(page)
+        left_start = pagegrid.trim_left(grid)
+        return "\n".join(row[left_start:] for row in page.splitlines())
 
-        #print("-------------------TRIMMING THIS")
-        #print(page)
-        # Detect margin
-        total_rows = len(page.splitlines())
-        left_start = 500
-        for row_nr, row in enumerate(page.splitlines()):
-            if row_nr == 0 or row_nr == total_rows - 1:
-                continue
-            row_start = 0
-            for char_index, character in enumerate(row):
-                if character.isspace():
-                    row_start = char_index + 1
-                else:
-                    break
-            if row_start < left_start:
-                left_start = row_start
-        # Remove margin
-        newpage = []
-        for row in page.splitlines():
-            newpage.append(row[left_start:])
-        #print("---------------------------INTO THIS:")
-        #print("\n".join(newpage))
-
-        return "\n".join(newpage)
+    def normalize_layout(self):
+        """
+        Removes headers and footers, lays out columns into one and removes margins of every page in
+        a single pass (see layout.normalize_page). Same as calling remove_headers_footers,
+        detect_columns, columns_to_one and remove_document_margins, but every page is rebuilt only once.
+        If self.layout_executor is set to a thread or process pool, pages of long documents are
+        normalized in parallel there.
+        Stores the layouts of the pages in page_layouts.
+        """
+        trims = [self.header_footer_info[self._page_parity(page_nr)] for page_nr in range(len(self.pdf))]
+        if self.layout_executor is not None and len(self.pdf) >= layout.MIN_PARALLEL_PAGES:
+            results = [(text, None, page_layout) for text, page_layout
+                       in layout.normalize_pages(self.pdf, trims, self.layout_executor)]
+        else:
+            results = (layout.normalize_page(page, *trim) for page, trim in zip(self.pdf, trims))
+
+        self.column_info = []
+        self.page_layouts = []
+        for page_nr, (text, grid, page_layout) in enumerate(results):
+            page = self.pdf[page_nr]
+            self.events.dump("pages-raw", page)
+            if self.events.enabled:
+                lines = page.splitlines()
+                for line in lines[:page_layout.header_lines]:
+                    self.events.emit("header_removed", "DEL: {line}", line=line)
+                for line in lines[len(lines) - page_layout.footer_lines:][::-1]:
+                    self.events.emit("footer_removed", "DEL: {line}", line=line)
+
+            self.pdf[page_nr] = text
+            # Grids of pages normalized in a pool are built again only if a later stage needs them
+            if grid is not None:
+                self._set_page_grid(page_nr, text, grid)
+            self.column_info.append(page_layout.column_splits)
+            self.page_layouts.append(page_layout)
+            self.margin_info = page_layout.margins
+
+            if self.events.enabled:
+                self.events.dump("pages-layout", text + "\n" + "--- PAGE BREAK (only in this file) ---" + "\n")
 
     def remove_headers_footers(self):
         """
         Removes headers and footers from pages
         """
 
-        with open("temptext2.txt", "w") as outfile:                     # REMOVE THIS: For debugging
-            outfile.write("")
-
         # remove header and footer lines
         for page_nr, page in enumerate(self.pdf):
-            with open("temptext2.txt", "a") as outfile:
-                outfile.write(page)
+            self.events.dump("pages-raw", page)
             
             page_as_lines = page.splitlines()
-            header_lines, footer_lines = self.header_footer_info
+            header_lines, footer_lines = self.header_footer_info[self._page_parity(page_nr)]
+            # Pages without text (eg. scans that were not OCRd) have fewer lines than headers and footers
+            header_lines = min(header_lines, len(page_as_lines))
+            footer_lines = min(footer_lines, len(page_as_lines) - header_lines)
 
             for _ in range(header_lines):
-                print(f"DEL: {page_as_lines[0]}")
+                self.events.emit("header_removed", "DEL: {line}", line=page_as_lines[0])
                 del page_as_lines[0]
             
             for _ in range(footer_lines):
-                print(f"DEL: {page_as_lines[-1]}")
+                self.events.emit("footer_removed", "DEL: {line}", line=page_as_lines[-1])
                 del page_as_lines[-1]
 
             self.pdf[page_nr] = "\n".join(page_as_lines)
+            if page_nr in self._page_grids:
+                grid = self._page_grids[page_nr][1]
+                self._set_page_grid(page_nr, self.pdf[page_nr], grid.slice_rows(header_lines, grid.rows - footer_lines))
 
-    def two_columns_to_one(self):
+    def columns_to_one(self):
         """
-        Lays out two columns into one.
+        Lays out the columns of every page into one, one after another.
         """
 
-        with open("temptext-new-layout.txt", "w") as outfile:             ## REMOVE THIS: Only for debugging
-            outfile.write("")
-
         for page_number, page in enumerate(self.pdf):
-            
-            if self.column_info[page_number] != 0:
-                page_as_lines = page.splitlines()
+            grid = self._page_grid(page_number)
+            page_as_lines = page.splitlines()
+            columns = []
+            column_grids = []
+            for start, stop in pagegrid.column_bounds(self.column_info[page_number]):
+                column, column_grid = self._column_to_text(page_as_lines, grid, start, stop)
+                columns.append(column)
+                column_grids.append(column_grid)
 
-                singlestring = ""
-                single_column_lines = []
-                for row in page_as_lines:
-                    single_column_lines.append(row[:self.column_info[page_number]])
-                
-                #singlestring = self.remove_page_margins("\n".join(single_column_lines))
-                singlestring = self._trim_left_margin("\n".join(single_column_lines))
-                single_column_lines = []
+            singlestring = "\n".join(columns)
+            self.pdf[page_number] = singlestring
+            self._set_page_grid(page_number, singlestring, pagegrid.PageGrid.stack(column_grids))
 
-                for row in page_as_lines:
-                    single_column_lines.append(row[self.column_info[page_number]:])
+            if self.events.enabled:
+                self.events.dump("pages-layout", singlestring + "\n" + "--- PAGE BREAK (only in this file) ---" + "\n")
 
-                #singlestring += "\n" + self.remove_page_margins("\n".join(single_column_lines))
-                singlestring += "\n" + self._trim_left_margin("\n".join(single_column_lines))
-                self.pdf[page_number] = singlestring
-            else:
-                #self.pdf[page_number] = self.remove_page_margins(page)
-                self.pdf[page_number] = self._trim_left_margin(page)
-            
-            with open("temptext-new-layout.txt", "a") as outfile:
-                outfile.write(page + "\n" + "--- PAGE BREAK (only in this file) ---" + "\n")
+    # Name of columns_to_one from when only two columns were detected
+    two_columns_to_one = columns_to_one
+
+    def _column_to_text(self, page_as_lines, grid, start, stop):
+        """
+        Cuts a column from page lines and trims its left margin.
+        The margin is measured on the character grid, so every line is sliced only once.
+        Returns the column as string and the matching character grid.
+        """
+        column_grid = grid.slice_columns(start, stop)
+        rows = len(page_as_lines)
+        # Splitting the column text into lines would drop a trailing empty row, so drop it here too
+        if rows > 0 and page_as_lines[-1][start:stop] == "":
+            rows -= 1
+            column_grid = column_grid.slice_rows(0, -1)
+        if rows == 0:
+            return "", column_grid
+        left_start = pagegrid.trim_left(column_grid)
+        text_start = start + left_start
+        return "\n".join(row[text_start:stop] for row in page_as_lines[:rows]), column_grid.slice_columns(left_start)
 
     def _trim_numbering(self, reference):
         """
@@ -518,19 +741,17 @@ class Extractor(object):
         Returns a list of detected references as strings
         """
         if reference_string is not None:
-            print("Using a given reference string instead of parsed pdf text")
+            self.events.emit("reference_string_given", "Using a given reference string instead of parsed pdf text")
         elif self.references_start_index is None or self.references_start_index == 0:
-            print("There is no info on reference start index. Doing nothing.")
+            self.events.emit("reference_start_missing", "There is no info on reference start index. Doing nothing.")
             return
         else:
-            reference_string = self.get_fulltext()[self.references_start_index:]
+            reference_string = self.get_document_text().slice(self.references_start_index)
        
-        print("----------- FULL REFERENCE SECTION STARTS -----------")
-        print(reference_string)
-        print("----------- FULL REFERENCE SECTION ENDS -----------")
-        
-        print(f"Starting indentation parse on ref section on index {self.references_start_index} that looks like this:")
-        print(reference_string[:400])
+        self.events.dump("reference-section", reference_string)
+        if self.events.enabled:
+            self.events.emit("indentation_parse", "Starting indentation parse on ref section on index {index} that looks like this:\n{preview}",
+                             index=self.references_start_index, preview=reference_string[:400])
 
         MAX_LINES = 6     # MAX_LINES = how many consecutive lines with no indendation to tolerate before breaking
         current_reference = ""
@@ -554,8 +775,7 @@ class Extractor(object):
                 if unindented_lines > MAX_LINES:
                     break
         
-        print(f"Current: {current_reference}")
-        print(f"Value of beyond refernces = {self._is_beyond_references(current_reference)}")
+        self.events.emit("last_reference", "Current: {text}", text=current_reference)
         # If the self reached its end with the final reference, write the last reference
         if self._is_beyond_references(current_reference) == False:
             current_reference = self._trim_numbering(current_reference)
@@ -582,10 +802,10 @@ class Extractor(object):
     def author_year_parse(self):
 
         if self.references_start_index is None or self.references_start_index == 0:
-            print("There is no info on reference start index. Doing nothing.")
+            self.events.emit("reference_start_missing", "There is no info on reference start index. Doing nothing.")
             return
 
-        reference_string = self.get_fulltext()[self.references_start_index:]
+        reference_string = self.get_document_text().slice(self.references_start_index)
         reference_matcher = re.compile(r"\s*(\p{Lu}.+[\s\(\.,;]((?:19|20)\d\d)[\s\)\.,;abcdef])")
         reference_starts = [r.start() for r in re.finditer(reference_matcher, reference_string)]
 
@@ -626,13 +846,23 @@ class Extractor(object):
         # Try detect if the last references are actually trailing info and delete as needed
         last_unclear = True
         while last_unclear == True:
-            if len(re.findall(r"(?:19|20)\d\d", self.references[-1].rawtext)) == 0:
-                print("Deleting trailing text that does not seem to be a reference:")
-                print(self.references[-1])
+            if len(self.references[-1].features.years) == 0:
+                self.events.emit("trailing_text_removed", "Deleting trailing text that does not seem to be a reference: {text}",
+                                 text=self.references[-1].rawtext)
                 del self.references[-1]
             else:
                 last_unclear = False
 
+    def _author_text_end(self, ref, bibref=None):
+        """
+        Returns the end index of the part of reference text to search authors from.
+        For apa-style references the text is narrowed down to end at the publication year.
+        """
+        bibref = bibref or self.reference_style['bibref']
+        if bibref == "apa":
+            return ref.span_authors_end
+        return None
+
     # TODO: Distinguish authors of an edited book = ending with (eds.), "(ed.)" etc.
     def extract_authors(self, ref, just_count=False):
         """
@@ -640,129 +870,68 @@ class Extractor(object):
         Toggling just_count will not store anything, just return how many authors are matched
         """
         number_of_authors = 0
-        year_position = -1
-        author_splice = ref.rawtext.lstrip()
-        #print("Author-splice in the beginning is:")
-        #print(author_splice)
-        # Narrow down the searched string for apa-style references
-        if self.reference_style['bibref'] == "apa":
-            # if self.reference_style['parenthesis'] == True:
-            #     year_matcher = re.compile(r"\((?:19|20)\d\d[abcdef]{0,1}\)")
-            # else:
-            #     year_matcher = re.compile(r"(?:19|20)\d\d[abcdef]{0,1}")
-            try:
-                #year_position = re.search(year_matcher, ref.rawtext)
-                #print("We have APA-style reference, and now the splice is:")
-                #print(author_splice)
-                # Make sure there is whitespace in the end for regex purposes
-                author_splice = ref.rawtext[:ref.span_authors_end].lstrip() + " "
-            except AttributeError as e:
-                print("AttributeError getting year from reference")
-                print(e)
-            except IndexError as e:
-                print("IndexError splicing reference text.")
-                print(e)
-            except:
-                e = sys.exc_info()[0]
-                print(e)
-                print("Cannot find year in reference. Returning 0 authors found.")
-                return 0
-
-        # Adjust for "Dutch" style lastname: van Buuren, de Wiet etc.
-        author_string_list = []
-        for word in author_splice.split():
-            if word in ["de", "van", "von", "deb"]:
-                author_string_list.append(word.capitalize())
-            else:
-                author_string_list.append(word)
-        author_splice = " ".join(author_string_list)
-
-        print("\n-----------------Starting to extract authors from this text:")
-        print(author_splice)
-
-        if self.reference_style['comma_inside_name'] == True:
-            # Matches "Author, F.N." -style:
-            #author_matcher = re.compile(r"^([A-ZÅÖÄØŒÆØ].{0,25}?,(?:\s*[A-ZÅÖÄØŒÆØ-]?\.*)+\s*[;,.&])")
-            author_matcher = re.compile(r"^(\p{Lu}.{0,25}?,(?:\s*[\p{Lu}-]?\.*)+\s*[;,.&])")
-         
-        elif self.reference_style['comma_inside_name'] == False:
-            # Matches "Author FN" -style
-            #author_matcher = re.compile(r"^((?:[A-ZÖÄØŒÆ][\w-]+\s){1,3}[A-ZÖÄØŒÆ-]{1,3})[\s,.(]")
-            author_matcher = re.compile(r"^((?:\p{Lu}[\w-]+\s){1,3}[\p{Lu}-]{1,3})[\s,.(]")
-
-        more_to_parse = True
-        print(f"--------\n---->Starting to parse this: {author_splice} <--------")
-        
+        author_text_end = self._author_text_end(ref)
+        try:
+            author_splice = ref.features.author_text(author_text_end)
+        except TypeError as e:
+            self.events.emit("error", "Cannot find year in reference. Returning 0 authors found: {error}", error=e)
+            return 0
+
+        self.events.emit("author_text", "Starting to extract authors from this text: {text}", text=author_splice)
+
         try:
             # Search for formatted author names one by one
-            while more_to_parse:
-                author_match = re.search(author_matcher, author_splice)
-                if author_match is None:
-                    more_to_parse = False
+            for author_string in ref.features.authors(author_text_end, self.reference_style['comma_inside_name']):
+                number_of_authors += 1
+                self.events.emit("author_match", "Parsing author {text}", text=author_string)
+                if self.reference_style['comma_inside_name'] == True:
+                    comma = author_string.find(",")
+                    firstname = author_string[comma+1:].strip()
+                    lastname = author_string[:comma].strip()                    
                 else:
-                    number_of_authors += 1
-                    author_string = author_match.group()
-                    print(f"Parsing author {author_string}")
-                    if self.reference_style['comma_inside_name'] == True:
-                        comma = author_string.find(",")
-                        firstname = author_string[comma+1:].strip()
-                        lastname = author_string[:comma].strip()                    
+                    while author_string[-1] in ["&", ",", "(", ";", "."]:
+                        author_string = author_string[:-1]
+                    split_name = author_string.strip().split()
+                    lastname = " ".join(split_name[0:-1])
+                    firstname = ""
+                    firstname_part = split_name[-1]
+                    dash = firstname_part.find("-")
+                    if dash == -1:
+                        for letter in firstname_part:
+                            firstname = firstname + letter + "."
+                    elif dash > 0 and dash < len(firstname_part) - 2 and len(firstname_part) > 2:
+                        for index, letter in enumerate(firstname_part):
+                            if index not in [dash-1, dash, dash+1]:
+                                firstname = letter + "."
+                            else:
+                                firstname = firstname + letter
                     else:
-                        while author_string[-1] in ["&", ",", "(", ";", "."]:
-                            author_string = author_string[:-1]
-                        split_name = author_string.strip().split()
-                        lastname = " ".join(split_name[0:-1])
-                        firstname = ""
-                        firstname_part = split_name[-1]
-                        dash = firstname_part.find("-")
-                        if dash == -1:
-                            for letter in firstname_part:
-                                firstname = firstname + letter + "."
-                        elif dash > 0 and dash < len(firstname_part) - 2 and len(firstname_part) > 2:
-                            for index, letter in enumerate(firstname_part):
-                                if index not in [dash-1, dash, dash+1]:
-                                    firstname = letter + "."
-                                else:
-                                    firstname = firstname + letter
-                        else:
-                            print("Not prepared for this kind of firstname. Just store the full abbreviation")
-                            firstname = firstname_part.strip()
-
-                    
-                    while len(firstname) > 0 and firstname[-1] in ["&", ",", "(", ";"]:
-                        firstname = firstname[:-1].strip()
-                    if len(firstname) > 1 and firstname[-2:] == "..":
-                        firstname = firstname[:-1]
-                    while len(lastname) > 0 and lastname[-1] in ["&", ",", "(", ";"]:
-                        lastname = lastname[:-1].strip()
-                    
-                    if just_count == False:
-                        new_author = author.Author(firstname=firstname, lastname=lastname)
-                        ref.authors.append(new_author)
-                        print(f"Adding: {new_author}")
-                        if self.reference_style['bibref'] == "iso690":
-                            ref.span_authors_end = re.search(author_string, ref.rawtext).end()
-                            ref.span_title_start = ref.span_authors_end +1
-
-                    author_splice = author_splice[author_match.end():].lstrip()
-                    try:
-                        if author_splice.split()[0] == "and":
-                            author_splice = author_splice[3:].lstrip()
-                        elif author_splice.split()[0] == "&":
-                            author_splice = author_splice[1:].lstrip()
-                    except IndexError:
-                        pass # nothing more to parse
-                    print(f"Remaining string to parse into authors: {author_splice}")
+                        self.events.emit("author_firstname_unknown", "Not prepared for this kind of firstname. Just store the full abbreviation")
+                        firstname = firstname_part.strip()
+
+                
+                while len(firstname) > 0 and firstname[-1] in ["&", ",", "(", ";"]:
+                    firstname = firstname[:-1].strip()
+                if len(firstname) > 1 and firstname[-2:] == "..":
+                    firstname = firstname[:-1]
+                while len(lastname) > 0 and lastname[-1] in ["&", ",", "(", ";"]:
+                    lastname = lastname[:-1].strip()
+                
+                if just_count == False:
+                    new_author = author.Author(firstname=firstname, lastname=lastname)
+                    ref.authors.append(new_author)
+                    self.events.emit("author_added", "Adding: {author}", author=new_author)
+                    if self.reference_style['bibref'] == "iso690":
+                        ref.span_authors_end = re.search(author_string, ref.rawtext).end()
+                        ref.span_title_start = ref.span_authors_end +1
         except IndexError as e:
-            print("IndexError when extracting authors from string")
-            print(e)
+            self.events.emit("error", "IndexError when extracting authors from string: {error}", error=e)
         except AttributeError as e:
-            print("AttributeError when extracting authors from string")
-            print(e)
+            self.events.emit("error", "AttributeError when extracting authors from string: {error}", error=e)
         
         except:
             e = sys.exc_info()[0]
-            print(e) 
+            self.events.emit("error", "{error}", error=e)
 
         # If no people names are found, assume the author is an institution, anonymous report, software etc.
         if number_of_authors == 0:
@@ -782,7 +951,7 @@ class Extractor(object):
             if just_count == False:
                 new_author = author.Author(non_person_author=author_splice.strip())
                 ref.authors.append(new_author)
-                print(f"Adding non-person-author: {new_author}")
+                self.events.emit("author_added", "Adding non-person-author: {author}", author=new_author)
                 if self.reference_style['bibref'] == "iso690":
                     ref.span_authors_end = name_end
                     ref.span_title_start = title_start
@@ -794,32 +963,30 @@ class Extractor(object):
         """
         Extract publication year from reference text. Update reference year and year index span info
         """
-        year_matcher = re.compile(r"(?:19|20)\d\d[abcdef]{0,1}")         
         if self.reference_style['bibref'] == "apa":
             try:
-                year_position = re.search(year_matcher, ref.rawtext)
-                ref.year = int(year_position.group()[:4])
-                ref.span_year_start = year_position.start()
-                ref.span_year_end = year_position.end()
-                ref.span_authors_end = year_position.start()
+                year_position = ref.features.years[0]
+                ref.year = int(ref.rawtext[year_position.start:year_position.end])
+                ref.span_year_start = year_position.start
+                ref.span_year_end = year_position.suffix_end
+                ref.span_authors_end = year_position.start
                 ref.span_title_start = ref.span_year_end +1
             except:
-                print("Something went wrong extracting apa-year information. Returning with no success.")
+                self.events.emit("error", "Something went wrong extracting apa-year information. Returning with no success.")
                 return -1
 
         elif self.reference_style['bibref'] == "iso690":
             try:
-                year_positions = [r for r in re.finditer(year_matcher, ref.rawtext)]
-                ref.year = int(year_positions[-1].group()[:4])
-                ref.span_year_start = year_positions[-1].start()
-                ref.span_year_end = year_positions[-1].end()
+                year_position = ref.features.years[-1]
+                ref.year = int(ref.rawtext[year_position.start:year_position.end])
+                ref.span_year_start = year_position.start
+                ref.span_year_end = year_position.suffix_end
             except:
                 e = sys.exc_info()[0]
-                print(e)
-                print("Something went wrong extracting iso690-year information. Returning with no success.")
+                self.events.emit("error", "Something went wrong extracting iso690-year information. Returning with no success: {error}", error=e)
                 return -1
         else:
-            print("No reference style info exists. Cannot realiably detect publication year")
+            self.events.emit("reference_style_missing", "No reference style info exists. Cannot realiably detect publication year")
 
     def extract_title(self, ref):
         """
@@ -840,7 +1007,7 @@ class Extractor(object):
                     start_unclear = False
                 else:
                     if len(ref.rawtext) -1 <= start_of_title:
-                        print("Title search reached end of string. Returning None.")
+                        self.events.emit("title_missing", "Title search reached end of string. Returning None.")
                         return None
                     else:
                         start_of_title += 1
@@ -848,9 +1015,9 @@ class Extractor(object):
             title = ref.rawtext[start_of_title:]
             title_end = title.find(separator)
             ref.title = title[:title_end]
-            print(f"Found title: {ref.title}")
+            self.events.emit("title_found", "Found title: {title}", title=ref.title)
 
         else:
-            print("The start of title index is not set. Not able to detect title")
+            self.events.emit("title_missing", "The start of title index is not set. Not able to detect title")
             return None
  
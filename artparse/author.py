@@ -1,4 +1,8 @@
+from . import authorindex
+
 class Author(object):
+    __slots__ = ["firstname", "lastname", "non_person_author", "is_person_author"]
+
     def __init__(self,  firstname=None, lastname=None, non_person_author=None):
         self.firstname = firstname
         self.lastname = lastname
@@ -27,18 +31,28 @@ class Author(object):
             print("Missing author information")
             return ""
 
+    def to_dict(self):
+        return {"firstname": self.firstname, "lastname": self.lastname, "non_person_author": self.non_person_author}
+
+    @classmethod
+    def from_dict(cls, values):
+        return cls(firstname=values.get("firstname"), lastname=values.get("lastname"),
+                   non_person_author=values.get("non_person_author"))
+
     def get_author_fullname(self):
         return self
 
-    # TODO: Make this more fuzzy, ie. strip umlauts, check for full firstnames vs. initials etc.
+    def key(self):
+        """Normalized key of the name. Variants such as "Müller, T. S." and "Muller TS" share a key."""
+        return authorindex.author_key(self)
+
     def is_same(self, comparison):
-        they_match = False
+        """
+        Whether comparison is the same author. Names are compared ascii-folded, without particles
+        and with initials instead of full firstnames, so "Tom Sawyer" matches "T." as well as "T. S.".
+        """
         if self.is_person_author and comparison.is_person_author:
-            if self.lastname == comparison.lastname and self.firstname == comparison.firstname:
-                they_match = True
+            return authorindex.same_person(self, comparison)
         elif self.is_person_author == False and comparison.is_person_author == False:
-            if self.non_person_author == comparison.non_person_author:
-                they_match = True
-        else:
-            they_match = False       
-        return they_match
+            return self.key() == comparison.key()
+        return False
@@ -0,0 +1,157 @@
+import math
+import regex as re
+from .patterns import fold_text, NAME_PARTICLES
+
+# Author name normalization and an index resolving name variants to the same author.
+# Names are compared by a key of (lastname, initials):
+#   lastname: ascii-folded and lowercase, without particles, so "van Buuren" and "Buuren" are the same
+#   initials: "T. S.", "T.S.", "TS" and "Tom Sawyer" all become "ts"
+# Initials are compatible if one starts with the other: "J." matches "J. P." but not "K.".
+
+PARTICLES = NAME_PARTICLES + ["der", "den", "ter", "la", "le", "du", "da", "di", "del"]
+TRIGRAM_THRESHOLD = 0.6
+
+NAME_SEPARATORS = re.compile(r"[\s.\-]+")
+NON_LETTER = re.compile(r"[^a-z ]+")
+
+
+def normalize_lastname(lastname):
+    """Returns lowercase ascii lastname without particles and punctuation"""
+    words = NON_LETTER.sub(" ", fold_text(lastname or "").replace("-", " ")).split()
+    while len(words) > 1 and words[0] in PARTICLES:
+        del words[0]
+    return " ".join(words)
+
+
+def normalize_initials(firstname):
+    """Returns the initials of firstname as lowercase letters: "Tom S." -> "ts", "TS" -> "ts" """
+    initials = ""
+    for part in NAME_SEPARATORS.split(firstname or ""):
+        if len(part) == 0:
+            continue
+        if part.isupper() and len(part) <= 3:
+            initials += part
+        else:
+            initials += part[0]
+    return fold_text(initials).replace(" ", "")
+
+
+def author_key(author):
+    """Returns the hashable key of an Author. Person and non-person authors never share a key."""
+    if author.is_person_author == False:
+        return ("organization", fold_text(author.non_person_author or ""))
+    return ("person", normalize_lastname(author.lastname), normalize_initials(author.firstname))
+
+
+def initials_compatible(initials1, initials2):
+    """Whether two normalized initials can belong to the same person"""
+    if len(initials1) == 0 or len(initials2) == 0:
+        return True
+    return initials1.startswith(initials2) or initials2.startswith(initials1)
+
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def trigram_similarity(text1, text2):
+    trigrams1, trigrams2 = trigrams(text1), trigrams(text2)
+    return len(trigrams1 & trigrams2) / len(trigrams1 | trigrams2)
+
+
+def same_person(author1, author2, threshold=None):
+    """
+    Whether two person Authors are likely the same person: the lastnames are equal after normalization
+    (or trigram-similar above threshold, if given) and the initials are compatible.
+    """
+    _, lastname1, initials1 = author_key(author1)
+    _, lastname2, initials2 = author_key(author2)
+    if lastname1 != lastname2:
+        if threshold is None or trigram_similarity(lastname1, lastname2) < threshold:
+            return False
+    return initials_compatible(initials1, initials2)
+
+
+class AuthorIndex(object):
+    """
+    Interns authors: every distinct author gets an integer id, and name variants resolve to the id
+    of the first variant seen. An exact key is found with a dictionary lookup. Other lastnames are
+    looked up by shared trigrams, so resolving does not scan all known authors.
+    authors: first seen Author of every id
+    """
+    def __init__(self, threshold=TRIGRAM_THRESHOLD):
+        self.threshold = threshold
+        self.authors = []
+        self._ids = {}
+        self._by_lastname = {}
+        self._lastnames_by_trigram = {}
+
+    def __len__(self):
+        return len(self.authors)
+
+    def resolve(self, author):
+        """Returns the id of author, adding it to the index if no variant of it is known yet"""
+        key = author_key(author)
+        author_id = self._lookup_key(key)
+        if author_id is not None:
+            return author_id
+
+        author_id = len(self.authors)
+        self.authors.append(author)
+        self._ids[key] = author_id
+        if key[0] == "person":
+            _, lastname, initials = key
+            if lastname not in self._by_lastname:
+                self._by_lastname[lastname] = []
+                for trigram in trigrams(lastname):
+                    self._lastnames_by_trigram.setdefault(trigram, set()).add(lastname)
+            self._by_lastname[lastname].append((initials, author_id))
+        return author_id
+
+    def lookup(self, author):
+        """Returns the id of a known variant of author, or None"""
+        return self._lookup_key(author_key(author))
+
+    def _lookup_key(self, key):
+        author_id = self._ids.get(key)
+        if author_id is not None or key[0] != "person":
+            return author_id
+
+        _, lastname, initials = key
+        for candidate in self._candidate_lastnames(lastname):
+            for known_initials, known_id in self._by_lastname[candidate]:
+                if initials_compatible(initials, known_initials):
+                    return known_id
+        return None
+
+    def _candidate_lastnames(self, lastname):
+        """
+        Known lastnames similar to lastname, most similar first. The exact lastname comes first.
+        A lastname with trigram similarity of at least threshold has to share at least
+        ceil(threshold * n) of the n trigrams of lastname, so it shares at least one of any
+        n - ceil(threshold * n) + 1 of them. Only the rarest ones are looked up, which keeps
+        the long lists of common trigrams out of the search.
+        """
+        if lastname in self._by_lastname:
+            yield lastname
+        own_trigrams = trigrams(lastname)
+        prefix_length = len(own_trigrams) - math.ceil(self.threshold * len(own_trigrams)) + 1
+        rarest = sorted(own_trigrams, key=lambda trigram: len(self._lastnames_by_trigram.get(trigram, ())))
+        candidates = set()
+        for trigram in rarest[:prefix_length]:
+            candidates.update(self._lastnames_by_trigram.get(trigram, ()))
+        candidates.discard(lastname)
+
+        scored = []
+        for candidate in candidates:
+            # A lastname has len + 1 trigrams at most, which bounds the similarity by the lengths alone
+            if min(len(candidate), len(lastname)) + 1 < self.threshold * len(own_trigrams):
+                continue
+            candidate_trigrams = trigrams(candidate)
+            shared = len(own_trigrams & candidate_trigrams)
+            score = shared / (len(own_trigrams) + len(candidate_trigrams) - shared)
+            if score >= self.threshold:
+                scored.append((score, candidate))
+        for _, candidate in sorted(scored, reverse=True):
+            yield candidate
@@ -0,0 +1,189 @@
+import time
+import pdftotext
+try:
+    from PyPDF2 import PdfReader
+except ImportError:     # PyPDF2 before 1.28
+    from PyPDF2 import PdfFileReader as PdfReader
+try:
+    from PyPDF2.errors import PdfReadError
+except ImportError:     # PyPDF2 before 2.0
+    from PyPDF2.utils import PdfReadError
+
+# Text extraction backends. A backend turns a pdf file into a sequence of page texts that decodes
+# pages lazily, like pdftotext.PDF.
+#   pdftotext-layout    pdftotext default mode, keeps columns and indentation
+#   pdftotext-physical  pdftotext physical mode, keeps the physical layout of the text
+#   pdftotext-raw       pdftotext raw mode, text in content stream order, fast but without layout
+#   pypdf2              pure python PyPDF2, no layout, for documents pdftotext cannot decode
+#   stub                StubBackend returns given page texts, for tests
+# With the backend "auto", a probe decodes a few sample pages with every AUTO_BACKENDS backend and
+# the fastest one with usable text is used for the document. Raw mode and PyPDF2 are not tried: the
+# parser relies on the layout (columns and indentation) that they lose. PyPDF2 is the FALLBACK_BACKEND
+# for documents that no AUTO_BACKENDS backend can open.
+
+# Errors of the backends on pdfs they cannot open or decode
+DECODE_ERRORS = (pdftotext.Error, PdfReadError, NotImplementedError, KeyError, ValueError)
+
+DEFAULT_BACKEND = "pdftotext-layout"
+AUTO = "auto"
+AUTO_BACKENDS = ["pdftotext-layout", "pdftotext-physical"]
+FALLBACK_BACKEND = "pypdf2"
+PROBE_PAGES = 2
+# A backend later in the candidates is selected only if it is this many times faster than an earlier
+# usable one, so that timing noise does not switch between backends of about equal cost
+PROBE_SPEEDUP = 1.5
+# Sample pages need this many non-whitespace characters per page, mostly letters and no decoding junk
+MIN_USABLE_CHARS = 50
+MIN_LETTER_RATIO = 0.5
+MAX_REPLACEMENT_RATIO = 0.01
+
+
+class Backend(object):
+    """Base of text extraction backends"""
+    name = None
+
+    def pages(self, infile):
+        """
+        Returns a lazy sequence of page texts of the pdf in infile, a binary file object.
+        Keep the file open while pages are read.
+        """
+        raise NotImplementedError
+
+    def __repr__(self):
+        return f"<{type(self).__name__} {self.name}>"
+
+
+class PdftotextBackend(Backend):
+    def __init__(self, name, raw=False, physical=False):
+        self.name = name
+        self.raw = raw
+        self.physical = physical
+
+    def pages(self, infile):
+        return pdftotext.PDF(infile, raw=self.raw, physical=self.physical)
+
+
+class PyPDF2Backend(Backend):
+    name = "pypdf2"
+
+    def pages(self, infile):
+        return PyPDF2Pages(PdfReader(infile, strict=False))
+
+
+class PyPDF2Pages(object):
+    """Page texts of a PyPDF2 reader, extracted when accessed"""
+    def __init__(self, reader):
+        self.reader = reader
+
+    def __len__(self):
+        return len(self.reader.pages)
+
+    def __getitem__(self, page_nr):
+        if page_nr < 0:
+            page_nr += len(self)
+        if not 0 <= page_nr < len(self):
+            raise IndexError("page index out of range")
+        page = self.reader.pages[page_nr]
+        extract = getattr(page, "extract_text", None) or page.extractText
+        return extract() or ""
+
+    def __iter__(self):
+        for page_nr in range(len(self)):
+            yield self[page_nr]
+
+
+class StubBackend(Backend):
+    """Returns the given page texts for any pdf. Use it to test stages after reading without pdf files."""
+    def __init__(self, pages, name="stub"):
+        self.name = name
+        self.page_texts = list(pages)
+
+    def pages(self, infile):
+        return list(self.page_texts)
+
+
+BACKENDS = {backend.name: backend for backend in [PdftotextBackend("pdftotext-layout"),
+                                                  PdftotextBackend("pdftotext-physical", physical=True),
+                                                  PdftotextBackend("pdftotext-raw", raw=True),
+                                                  PyPDF2Backend()]}
+
+
+def get_backend(backend):
+    """Returns a Backend by name, or the backend itself if it already is one"""
+    if isinstance(backend, Backend):
+        return backend
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend: {backend}. Use one of {', '.join(list(BACKENDS) + [AUTO])}")
+    return BACKENDS[backend]
+
+
+def usable_text(pages):
+    """Whether sample page texts look like real text instead of nothing or undecoded glyphs"""
+    text = "".join("".join(page.split()) for page in pages)
+    if len(text) < MIN_USABLE_CHARS * max(1, len(pages)):
+        return False
+    letters = sum(1 for char in text if char.isalpha())
+    return letters / len(text) >= MIN_LETTER_RATIO and text.count("�") / len(text) <= MAX_REPLACEMENT_RATIO
+
+
+def probe_page_numbers(page_count, sample_pages=PROBE_PAGES):
+    """Sample pages of the probe: the last page (most likely references) and evenly spaced pages before it"""
+    numbers = [page_count - 1 - round(i * page_count / sample_pages) for i in range(sample_pages)]
+    return sorted({number for number in numbers if 0 <= number < page_count})
+
+
+class ProbeResult(object):
+    """
+    Outcome of probing backends on one document.
+    backend: the selected Backend, or None if no backend gave usable text
+    pages: page sequence of the selected backend, opened during the probe
+    timings: {backend name: (seconds to open and decode the sample pages, usable)}
+    """
+    def __init__(self, backend, pages, timings):
+        self.backend = backend
+        self.pages = pages
+        self.timings = timings
+
+
+def probe(infile, candidates=AUTO_BACKENDS, sample_pages=PROBE_PAGES, fallback=FALLBACK_BACKEND):
+    """
+    Decodes sample pages of the pdf in infile (a binary file object) with every candidate backend and
+    selects the fastest one with usable text. Candidates are in order of preference. The fallback
+    backend is tried only if no candidate can open the pdf.
+    """
+    timings = {}
+    opened = {}
+    for candidate in candidates:
+        _probe_backend(get_backend(candidate), infile, sample_pages, timings, opened)
+    if len(opened) == 0 and fallback is not None:
+        _probe_backend(get_backend(fallback), infile, sample_pages, timings, opened)
+
+    selected = None
+    for name in opened:
+        if timings[name][1] and (selected is None or timings[name][0] * PROBE_SPEEDUP < timings[selected][0]):
+            selected = name
+    if selected is None:
+        return ProbeResult(None, None, timings)
+    return ProbeResult(*opened[selected], timings)
+
+
+def _probe_backend(backend, infile, sample_pages, timings, opened):
+    """Times decoding the sample pages with backend into timings, and adds its pages to opened if it works"""
+    start = time.perf_counter()
+    try:
+        infile.seek(0)
+        pages = backend.pages(infile)
+        sample = [pages[page_nr] for page_nr in probe_page_numbers(len(pages), sample_pages)]
+    except Exception:
+        timings[backend.name] = (time.perf_counter() - start, False)
+        return
+    timings[backend.name] = (time.perf_counter() - start, usable_text(sample))
+    opened[backend.name] = (backend, pages)
+
+
+def document_info(infile):
+    """Returns the document information dictionary of the pdf in infile (a binary file object), or None"""
+    infile.seek(0)
+    reader = PdfReader(infile, strict=False)
+    info = getattr(reader, "metadata", None) if hasattr(reader, "metadata") else reader.getDocumentInfo()
+    return dict(info) if info is not None else None
@@ -0,0 +1,218 @@
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from . import synthetic
+from . import backends
+from .instrument import DocumentProfile
+from .parsecontrol import extract_text
+
+# Stage-level benchmark on synthetic articles. Usage: python -m artparse.benchmark --output results.json
+# Results of two runs can be compared with --compare to spot regressions between commits.
+# With --pdf, the cost of every text extraction backend is measured on real pdf files too.
+
+BENCHMARK_VERSION = 1
+
+
+def default_cases(pages=12, references=40, seed=0):
+    """Returns benchmark case settings: every reference style in one and two column layout"""
+    cases = []
+    for style in synthetic.REFERENCE_STYLES:
+        for two_columns in [False, True]:
+            name = f"{style}-{'two' if two_columns else 'one'}-column"
+            cases.append((name, {"pages": pages, "references": references, "style": style,
+                                 "two_columns": two_columns, "seed": seed}))
+    return cases
+
+
+def run_pipeline(pages, profile=None):
+    """Runs the full pipeline on given page texts and returns the references"""
+    return extract_text(pages, profile=profile)
+
+
+def score(references, truth):
+    """
+    Compares extracted references to SyntheticReferences.
+    A reference is found when its text equals a ground truth reference (whitespace collapsed).
+    Year and author accuracy are counted from the found references.
+    """
+    expected = {" ".join(ref.text.split()): ref for ref in truth}
+    found = years = authors = 0
+    for ref in references:
+        true_ref = expected.pop(" ".join(ref.rawtext.split()), None)
+        if true_ref is None:
+            continue
+        found += 1
+        if ref.year == true_ref.year:
+            years += 1
+        lastnames = [(author.lastname or "").casefold() for author in ref.authors]
+        if lastnames == [lastname.casefold() for lastname in true_ref.lastnames]:
+            authors += 1
+
+    return {"expected": len(truth), "extracted": len(references), "found": found,
+            "recall": found / len(truth) if truth else None,
+            "precision": found / len(references) if references else None,
+            "year_accuracy": years / found if found else None,
+            "author_accuracy": authors / found if found else None}
+
+
+def run_case(name, settings, repeat=5):
+    """
+    Generates the article of a case and parses it repeat times.
+    Reports the median time of every stage and of the whole pipeline with throughput.
+    If parsing fails, the error is reported with the timings of the stages that were run.
+    """
+    article = synthetic.generate_article(**settings)
+    stage_times = {}
+    total_times = []
+    references = []
+    error = None
+    for _ in range(repeat):
+        profile = DocumentProfile(name)
+        try:
+            references = run_pipeline(article.pages, profile)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        total_times.append(profile.wall_time)
+        for record in profile.stages:
+            stage_times.setdefault(record.name, []).append(record.wall_time)
+        if error:
+            break
+
+    pages = len(article.pages)
+    expected = len(article.references)
+    stages = {}
+    for stage, times in stage_times.items():
+        stages[stage] = _throughput(statistics.median(times), pages, expected)
+    return {"name": name, "settings": settings, "pages": pages, "chars": sum(len(page) for page in article.pages),
+            "repeat": repeat, "error": error, "total": _throughput(statistics.median(total_times), pages, expected),
+            "stages": stages, "accuracy": score(references, article.references)}
+
+
+def _throughput(wall_time, pages, references):
+    return {"wall_time": wall_time,
+            "pages_per_second": pages / wall_time if wall_time > 0 else None,
+            "references_per_second": references / wall_time if wall_time > 0 else None}
+
+
+def run(cases, repeat=5):
+    return {"benchmark_version": BENCHMARK_VERSION, "python": platform.python_version(),
+            "cases": [run_case(name, settings, repeat=repeat) for name, settings in cases]}
+
+
+def backend_costs(pdffile, repeat=5, candidates=None):
+    """
+    Decodes every page of pdffile with every backend repeat times and reports the median time per page,
+    whether the text is usable and which backend the probe of the "auto" backend selects.
+    """
+    costs = {}
+    with open(pdffile, "rb") as infile:
+        for name in candidates or backends.BACKENDS:
+            times = []
+            error = None
+            pages = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                try:
+                    infile.seek(0)
+                    pages = [page for page in backends.get_backend(name).pages(infile)]
+                except Exception as e:
+                    error = f"{type(e).__name__}: {e}"
+                    break
+                times.append(time.perf_counter() - start)
+            wall_time = statistics.median(times) if times else None
+            costs[name] = {"wall_time": wall_time, "pages": len(pages), "error": error,
+                           "ms_per_page": wall_time * 1000 / len(pages) if wall_time is not None and pages else None,
+                           "usable": error is None and backends.usable_text(
+                               [pages[page_nr] for page_nr in backends.probe_page_numbers(len(pages))])}
+        selected = backends.probe(infile).backend
+    return {"name": pdffile, "backends": costs, "selected": selected.name if selected is not None else None}
+
+
+def compare(previous, current):
+    """Returns lines describing the change of time and accuracy of every case present in both results"""
+    previous_cases = {case["name"]: case for case in previous["cases"]}
+    lines = []
+    for case in current["cases"]:
+        old = previous_cases.get(case["name"])
+        if old is None:
+            continue
+        ratio = case["total"]["wall_time"] / old["total"]["wall_time"] if old["total"]["wall_time"] else None
+        line = f"{case['name']:<24} time x{ratio:.2f}" if ratio is not None else f"{case['name']:<24} time n/a"
+        if case["error"] != old.get("error"):
+            line += f"  error: {old.get('error')} -> {case['error']}"
+        for measure in ["recall", "precision", "year_accuracy", "author_accuracy"]:
+            if case["accuracy"][measure] != old["accuracy"][measure]:
+                line += f"  {measure} {_percent(old['accuracy'][measure])} -> {_percent(case['accuracy'][measure])}"
+        slowest = max(case["stages"], key=lambda stage: _stage_ratio(old, case, stage))
+        if _stage_ratio(old, case, slowest) > 1.1:
+            line += f"  slowest change: {slowest} x{_stage_ratio(old, case, slowest):.2f}"
+        lines.append(line)
+    return lines
+
+
+def _stage_ratio(old, new, stage):
+    if stage not in old["stages"] or not old["stages"][stage]["wall_time"]:
+        return 0
+    return new["stages"][stage]["wall_time"] / old["stages"][stage]["wall_time"]
+
+
+def _percent(value):
+    return "n/a" if value is None else f"{value * 100:.1f}%"
+
+
+def print_results(results, stream=None):
+    stream = stream or sys.stdout
+    print(f"{'case':<24} {'ms':>8} {'pages/s':>9} {'refs/s':>9} {'recall':>7} {'prec.':>7} {'year':>7} {'author':>7}",
+          file=stream)
+    for case in results["cases"]:
+        total, accuracy = case["total"], case["accuracy"]
+        print(f"{case['name']:<24} {total['wall_time'] * 1000:>8.1f} {total['pages_per_second'] or 0:>9.0f} "
+              f"{total['references_per_second'] or 0:>9.0f} {_percent(accuracy['recall']):>7} "
+              f"{_percent(accuracy['precision']):>7} {_percent(accuracy['year_accuracy']):>7} "
+              f"{_percent(accuracy['author_accuracy']):>7}", file=stream)
+        if case["error"]:
+            print(f"{'':<24} FAILED: {case['error']}", file=stream)
+
+    for document in results.get("backends", []):
+        print(f"\n{document['name']} (auto selects {document['selected']})", file=stream)
+        print(f"{'backend':<24} {'ms':>8} {'ms/page':>9} {'usable':>7}", file=stream)
+        for name, cost in document["backends"].items():
+            if cost["error"]:
+                print(f"{name:<24} FAILED: {cost['error']}", file=stream)
+                continue
+            print(f"{name:<24} {cost['wall_time'] * 1000:>8.1f} {cost['ms_per_page'] or 0:>9.2f} "
+                  f"{'yes' if cost['usable'] else 'no':>7}", file=stream)
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser(prog="benchmark.py", description="Benchmark parsing stages on synthetic articles")
+    argparser.add_argument("--pages", type=int, default=12, help="number of pages in each generated article")
+    argparser.add_argument("--references", type=int, default=40, help="number of references in each article")
+    argparser.add_argument("--repeat", type=int, default=5, help="parse every article this many times")
+    argparser.add_argument("--seed", type=int, default=0, help="seed of the article generator")
+    argparser.add_argument("--style", action="append", choices=synthetic.REFERENCE_STYLES,
+                           help="only run cases of this reference style (can be repeated)")
+    argparser.add_argument("--pdf", action="append", metavar="file",
+                           help="also measure the cost of every text extraction backend on this pdf (can be repeated)")
+    argparser.add_argument("--output", "-o", metavar="file", help="write results as JSON")
+    argparser.add_argument("--compare", metavar="file", help="compare to results JSON of an earlier run")
+    args = argparser.parse_args()
+
+    cases = default_cases(pages=args.pages, references=args.references, seed=args.seed)
+    if args.style:
+        cases = [(name, settings) for name, settings in cases if settings["style"] in args.style]
+    results = run(cases, repeat=args.repeat)
+    if args.pdf:
+        results["backends"] = [backend_costs(pdffile, repeat=args.repeat) for pdffile in args.pdf]
+    print_results(results)
+
+    if args.output:
+        with open(args.output, "w") as outfile:
+            json.dump(results, outfile, indent=2)
+    if args.compare:
+        with open(args.compare) as infile:
+            for line in compare(json.load(infile), results):
+                print(line)
@@ -0,0 +1,222 @@
+import hashlib
+import json
+import os.path
+import sqlite3
+import time
+import zlib
+from collections import Counter
+from contextlib import contextmanager
+from functools import lru_cache
+from .reference import Reference
+
+# On-disk cache of extraction results, keyed by the contents of the pdf file.
+# Bump CACHE_FORMAT_VERSION when the stored format changes. Changes in parsing are covered by
+# a digest of the source of the parsing modules, which is part of every result key.
+CACHE_FORMAT_VERSION = 2
+DEFAULT_MAX_SIZE = 512 * 1024 * 1024
+# Modules whose code decides the extracted references
+PARSER_MODULES = ["artparser", "author", "headers", "layout", "pagegrid", "patterns", "reference", "textstore"]
+# Access times and hit counts of reads are written in one transaction after this many reads
+FLUSH_READS = 100
+# Total size of the stored data, kept up to date on every write and eviction
+STORED_SIZE = "stored_size"
+
+PAGES = "pages"
+REFERENCES = "references"
+OCR = "ocr"
+
+
+def file_digest(filename, chunk_size=1024 * 1024):
+    """Returns sha256 hex digest of file contents"""
+    digest = hashlib.sha256()
+    with open(filename, "rb") as infile:
+        for chunk in iter(lambda: infile.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@lru_cache(maxsize=None)
+def parser_version():
+    """Returns a digest of the source of PARSER_MODULES, so that any change in parsing gives new result keys"""
+    digest = hashlib.sha256()
+    directory = os.path.dirname(os.path.abspath(__file__))
+    for module in PARSER_MODULES:
+        with open(os.path.join(directory, module + ".py"), "rb") as infile:
+            digest.update(infile.read())
+    return digest.hexdigest()[:16]
+
+
+class ResultCache(object):
+    """
+    SQLite cache of decoded page texts, OCR texts of single pages and extracted references.
+    Pages are stored by pdf digest only, so a new parser version can reuse them without decoding
+    the pdf again. References are stored by pdf digest, parser version and parsing options.
+    version: parser version in the result keys, by default a digest of the parser source (parser_version)
+    When the stored data grows over max_size bytes, least recently used entries are evicted.
+    Hit and miss counts are kept in the database, so they add up over processes of a batch.
+    Reads only update access times and counts in memory. They are written with the next write,
+    after FLUSH_READS reads, or by flush(), stats() and close().
+    The cache can be passed to worker processes: every process opens its own connection.
+    """
+    def __init__(self, path, max_size=DEFAULT_MAX_SIZE, version=None):
+        self.path = path
+        self.max_size = max_size
+        self.version = version if version is not None else parser_version()
+        self._connection = None
+        self._accessed = {}
+        self._counts = Counter()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_connection"] = None
+        state["_accessed"] = {}
+        state["_counts"] = Counter()
+        return state
+
+    @property
+    def connection(self):
+        if self._connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._connection = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, kind TEXT NOT NULL, "
+                                     "data BLOB NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL)")
+            self._connection.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)")
+            self._connection.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            self._connection.execute("INSERT OR IGNORE INTO counters (name, value) "
+                                     "SELECT ?, COALESCE(SUM(size), 0) FROM entries", (STORED_SIZE,))
+        return self._connection
+
+    def close(self):
+        if self._connection is not None:
+            self.flush()
+            self._connection.close()
+            self._connection = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def flush(self):
+        """Writes the access times and counts of reads since the last write"""
+        if len(self._accessed) == 0 and len(self._counts) == 0:
+            return
+        with self._transaction():
+            self._write_reads()
+
+    def _write_reads(self):
+        self.connection.executemany("UPDATE entries SET last_access = ? WHERE key = ?",
+                                    [(access, key) for key, access in self._accessed.items()])
+        for name, amount in self._counts.items():
+            self._count(name, amount)
+        self._accessed = {}
+        self._counts = Counter()
+
+    @contextmanager
+    def _transaction(self):
+        """Runs the statements of the with block in one write transaction, rolled back on errors"""
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+        self.connection.execute("COMMIT")
+
+    def result_key(self, digest, options=None):
+        """Returns the key of references extracted from pdf of digest with given parsing options"""
+        config = json.dumps({"format": CACHE_FORMAT_VERSION, "version": self.version, "options": options or {}},
+                            sort_keys=True)
+        return f"{REFERENCES}:{digest}:{hashlib.sha256(config.encode('utf8')).hexdigest()[:16]}"
+
+    def get_pages(self, digest):
+        """Returns (pages, page_offset) stored for pdf of digest, or None"""
+        value = self._get(PAGES, f"{PAGES}:{digest}")
+        if value is None:
+            return None
+        return value["pages"], value["page_offset"]
+
+    def put_pages(self, digest, pages, page_offset=0):
+        self._put(PAGES, f"{PAGES}:{digest}", {"pages": pages, "page_offset": page_offset})
+
+    def get_ocr_text(self, key):
+        """Returns OCR text of the page stored with key (see pdfmanipulate.OcrEngine), or None"""
+        return self._get(OCR, f"{OCR}:{key}")
+
+    def put_ocr_text(self, key, text):
+        self._put(OCR, f"{OCR}:{key}", text)
+
+    def get_references(self, key):
+        """Returns list of References stored with key, or None"""
+        value = self._get(REFERENCES, key)
+        if value is None:
+            return None
+        return [Reference.from_dict(ref) for ref in value]
+
+    def put_references(self, key, references):
+        self._put(REFERENCES, key, [ref.to_dict() for ref in references])
+
+    def stats(self):
+        """Returns hit and miss counts per kind of entry and the size of stored data"""
+        self.flush()
+        stats = {name: value for name, value in self.connection.execute("SELECT name, value FROM counters")}
+        entries = self.connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        stats.update({"entries": entries, "size": stats.pop(STORED_SIZE, 0), "max_size": self.max_size})
+        return stats
+
+    def clear(self):
+        with self._transaction():
+            self.connection.execute("DELETE FROM entries")
+            self.connection.execute("DELETE FROM counters")
+            self.connection.execute("INSERT INTO counters (name, value) VALUES (?, 0)", (STORED_SIZE,))
+        self._accessed = {}
+        self._counts = Counter()
+
+    def _get(self, kind, key):
+        row = self.connection.execute("SELECT data FROM entries WHERE key = ?", (key,)).fetchone()
+        self._counts[f"{kind}_{'misses' if row is None else 'hits'}"] += 1
+        if row is not None:
+            self._accessed[key] = time.time()
+        if sum(self._counts.values()) >= FLUSH_READS:
+            self.flush()
+        if row is None:
+            return None
+        return json.loads(zlib.decompress(row[0]).decode("utf8"))
+
+    def _put(self, kind, key, value):
+        data = zlib.compress(json.dumps(value).encode("utf8"))
+        if len(data) > self.max_size:
+            return
+        with self._transaction():
+            # Pending reads go along, so that eviction sees current access times
+            self._write_reads()
+            old = self.connection.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+            self.connection.execute("INSERT OR REPLACE INTO entries (key, kind, data, size, last_access) "
+                                    "VALUES (?, ?, ?, ?, ?)", (key, kind, data, len(data), time.time()))
+            self._count(STORED_SIZE, len(data) - (old[0] if old is not None else 0))
+            self._evict()
+
+    def _evict(self):
+        """Deletes least recently used entries until the stored data fits in max_size"""
+        size = self.connection.execute("SELECT value FROM counters WHERE name = ?", (STORED_SIZE,)).fetchone()[0]
+        if size <= self.max_size:
+            return
+        evicted = []
+        freed = 0
+        for key, entry_size in self.connection.execute("SELECT key, size FROM entries ORDER BY last_access"):
+            evicted.append((key,))
+            freed += entry_size
+            if size - freed <= self.max_size:
+                break
+        self.connection.executemany("DELETE FROM entries WHERE key = ?", evicted)
+        self._count(STORED_SIZE, -freed)
+        self._count("evictions", len(evicted))
+
+    def _count(self, name, amount=1):
+        self.connection.execute("INSERT INTO counters (name, value) VALUES (?, ?) "
+                                "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value", (name, amount))
+
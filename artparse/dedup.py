@@ -0,0 +1,163 @@
+import zlib
+from collections import namedtuple
+from difflib import SequenceMatcher
+import regex as re
+from .patterns import fold_text
+
+# Corpus level deduplication of references.
+# References are only compared inside blocks of candidates sharing a blocking key:
+#   year + first author lastname
+#   year + hash of the first significant title words
+# Two keys let a reference find its duplicate even if either the author or the title was extracted
+# differently. Duplicates are merged into clusters with union-find.
+
+TITLE_PREFIX_WORDS = 4
+TITLE_COMPARE_LENGTH = 120
+STOPWORDS = ["a", "an", "the", "of", "on", "in", "and", "for", "to", "with", "at", "by"]
+
+NON_LETTER = re.compile(r"[^a-z0-9 ]+")
+
+# Compact comparable form of a reference. Only these are kept in memory, not the references.
+Signature = namedtuple("Signature", ["year", "lastname", "title"])
+
+
+def signature(ref):
+    """Returns the Signature of a Reference"""
+    year = ref.year
+    if year is None and len(ref.features.years) > 0:
+        year_span = ref.features.years[0]
+        year = int(ref.rawtext[year_span.start:year_span.end])
+
+    lastname = ""
+    if len(ref.authors) > 0:
+        lastname = ref.authors[0].lastname or ref.authors[0].non_person_author
+    lastname = NON_LETTER.sub("", fold_text(lastname or "")).replace(" ", "")
+
+    if ref.title:
+        title = ref.title
+    elif isinstance(ref.span_title_start, int):
+        title = ref.rawtext[ref.span_title_start:]
+    else:
+        title = ref.rawtext
+    title = " ".join(NON_LETTER.sub(" ", fold_text(title)).split())[:TITLE_COMPARE_LENGTH]
+    return Signature(year, lastname, title)
+
+
+def blocking_keys(sig):
+    """Returns the blocking keys of a Signature. References without a year are not blocked at all."""
+    if sig.year is None:
+        return []
+    keys = []
+    if sig.lastname:
+        keys.append(("author", sig.year, sig.lastname))
+    prefix = [word for word in sig.title.split() if word not in STOPWORDS][:TITLE_PREFIX_WORDS]
+    if len(prefix) > 0:
+        keys.append(("title", sig.year, zlib.crc32(" ".join(prefix).encode("utf8"))))
+    return keys
+
+
+def similarity(text1, text2, threshold=0.0):
+    """
+    SequenceMatcher ratio of two strings. The cheap upper bounds of the ratio are checked first: if one
+    is below threshold, it is returned without computing the ratio.
+    """
+    matcher = SequenceMatcher(None, text1, text2, autojunk=False)
+    bound = matcher.real_quick_ratio()
+    if bound < threshold:
+        return bound
+    bound = matcher.quick_ratio()
+    if bound < threshold:
+        return bound
+    return matcher.ratio()
+
+
+class Deduplicator(object):
+    """
+    Incremental deduplicator. Add references one by one and read clusters of duplicates at the end.
+    Every block keeps at most max_block_size representatives, each standing for a group of
+    duplicates, so one reference is compared to at most 2 * max_block_size others. Memory use is
+    one integer per added reference plus the signatures of the representatives.
+    threshold: title similarity (0-1) needed for duplicates, whose years always have to be equal
+    """
+    def __init__(self, threshold=0.85, lastname_threshold=0.8, max_block_size=100):
+        self.threshold = threshold
+        self.lastname_threshold = lastname_threshold
+        self.max_block_size = max_block_size
+        self.comparisons = 0
+        self.full_blocks = set()
+        self._parents = []
+        self._blocks = {}
+        self._signatures = {}
+
+    def __len__(self):
+        return len(self._parents)
+
+    def add(self, ref):
+        """Adds a Reference and returns its index"""
+        return self.add_signature(signature(ref))
+
+    def add_all(self, references):
+        for ref in references:
+            self.add(ref)
+        return self
+
+    def add_signature(self, sig):
+        index = len(self._parents)
+        self._parents.append(index)
+        for key in blocking_keys(sig):
+            representatives = self._blocks.setdefault(key, [])
+            if self._match(index, sig, representatives):
+                continue
+            if len(representatives) < self.max_block_size:
+                representatives.append(index)
+                self._signatures[index] = sig
+            else:
+                # Later references of a full block are only matched to the existing representatives
+                self.full_blocks.add(key)
+        return index
+
+    def _match(self, index, sig, representatives):
+        """Joins index to the cluster of the first matching representative. Returns whether one matched."""
+        for other in representatives:
+            if self.find(other) == self.find(index):
+                return True
+            self.comparisons += 1
+            if self.is_same(sig, self._signatures[other]):
+                self._union(other, index)
+                return True
+        return False
+
+    def is_same(self, sig1, sig2):
+        """Whether two Signatures are the same work"""
+        if sig1.year != sig2.year:
+            return False
+        if sig1.lastname and sig2.lastname and sig1.lastname != sig2.lastname:
+            if similarity(sig1.lastname, sig2.lastname, self.lastname_threshold) < self.lastname_threshold:
+                return False
+        return similarity(sig1.title, sig2.title, self.threshold) >= self.threshold
+
+    def find(self, index):
+        """Returns the index representing the cluster of index"""
+        root = index
+        while self._parents[root] != root:
+            root = self._parents[root]
+        while self._parents[index] != root:
+            self._parents[index], index = root, self._parents[index]
+        return root
+
+    def _union(self, index1, index2):
+        root1, root2 = self.find(index1), self.find(index2)
+        if root1 != root2:
+            self._parents[max(root1, root2)] = min(root1, root2)
+
+    def clusters(self, min_size=2):
+        """Returns lists of indexes of references that are the same work, in order of first appearance"""
+        clusters = {}
+        for index in range(len(self._parents)):
+            clusters.setdefault(self.find(index), []).append(index)
+        return [members for members in clusters.values() if len(members) >= min_size]
+
+
+def deduplicate(references, **settings):
+    """Returns clusters of duplicate references as lists of indexes into references. See Deduplicator."""
+    return Deduplicator(**settings).add_all(references).clusters()
@@ -0,0 +1,83 @@
+import json
+import os
+import os.path
+import sys
+import tempfile
+import time
+
+
+class EventSink(object):
+    """
+    Receives structured events from the parsing stages. The base class ignores everything,
+    so a disabled sink costs one method call. Messages are format strings that are only
+    filled in with the event fields if the sink actually writes them.
+    """
+    enabled = False
+
+    def emit(self, event, message="", **fields):
+        pass
+
+    def dump(self, name, text):
+        """Store a piece of intermediate text, such as page text between stages"""
+        pass
+
+    def close(self):
+        pass
+
+    def format(self, event, message, fields):
+        if message:
+            try:
+                return message.format(**fields)
+            except (KeyError, IndexError, ValueError):
+                pass
+        return f"{event}: {fields}"
+
+NULL_SINK = EventSink()
+
+
+class PrintSink(EventSink):
+    """Prints event messages to console (or other stream). Used for verbose runs."""
+    enabled = True
+
+    def __init__(self, stream=None):
+        self.stream = stream
+
+    def emit(self, event, message="", **fields):
+        print(self.format(event, message, fields), file=self.stream or sys.stdout)
+
+
+class DebugBundle(EventSink):
+    """
+    Writes all events of one document as JSON lines to events.jsonl and dumped texts to
+    <name>.txt files, all inside a directory of its own.
+    """
+    enabled = True
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._events = open(os.path.join(directory, "events.jsonl"), "a", encoding="utf8")
+        self._dumps = {}
+
+    @classmethod
+    def for_document(cls, root, filename):
+        """Creates a new uniquely named bundle directory for the document under root"""
+        os.makedirs(root, exist_ok=True)
+        prefix = os.path.splitext(os.path.basename(filename))[0] + "-"
+        return cls(tempfile.mkdtemp(prefix=prefix, dir=root))
+
+    def emit(self, event, message="", **fields):
+        record = {"time": time.time(), "event": event, "message": self.format(event, message, fields)}
+        record.update(fields)
+        self._events.write(json.dumps(record, default=str, ensure_ascii=False) + "\n")
+
+    def dump(self, name, text):
+        if name not in self._dumps:
+            self._dumps[name] = open(os.path.join(self.directory, name + ".txt"), "w", encoding="utf8")
+        self._dumps[name].write(text)
+
+    def close(self):
+        self._events.close()
+        for dumpfile in self._dumps.values():
+            dumpfile.close()
+        self._dumps = {}
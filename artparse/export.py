@@ -0,0 +1,195 @@
+import json
+import os.path
+import sys
+from .reference import Reference
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# Streaming writers of extracted references for analytics jobs.
+# Every reference becomes one flat record: source document, index of the reference in the document,
+# page and line where it starts, parsed fields, character spans and the list of authors.
+# Writers take the references of one document at a time, so memory use stays flat in large batches.
+#   JsonlWriter    one JSON object per line, flushed after every document
+#   ParquetWriter  row groups of about row_group_size records, written at document boundaries (needs pyarrow)
+
+RECORD_FIELDS = ["source", "index", "page", "line", "rawtext", "year", "title", "reference_style"] + \
+                Reference.SPAN_FIELDS + ["authors"]
+FORMATS = {".jsonl": "jsonl", ".ndjson": "jsonl", ".parquet": "parquet"}
+DEFAULT_ROW_GROUP_SIZE = 10000
+
+
+def reference_record(ref, source=None, index=None):
+    """Returns a Reference as a flat dictionary of RECORD_FIELDS. source defaults to the pdffile of the reference."""
+    record = {"source": source if source is not None else (ref.pdffile or None), "index": index,
+              "page": ref.page, "line": ref.line, "rawtext": ref.rawtext, "year": ref.year, "title": ref.title or None,
+              "reference_style": str(ref.reference_style) if ref.reference_style is not None else None}
+    for field in Reference.SPAN_FIELDS:
+        record[field] = getattr(ref, field)
+    record["authors"] = [aut.to_dict() for aut in ref.authors]
+    return record
+
+
+class ReferenceWriter(object):
+    """
+    Base of the writers. Counts written documents and references. Use as a context manager or call close().
+    path: the output file
+    durable_documents: whether a document is complete in the output as soon as write() returns,
+                       otherwise only after close()
+    """
+    durable_documents = True
+
+    def __init__(self, path=None):
+        self.path = path
+        self.documents = 0
+        self.references = 0
+
+    def write(self, references, source=None):
+        """Writes the references of one document. Returns the number of written references."""
+        for index, ref in enumerate(references):
+            self._write_record(reference_record(ref, source, index))
+        self.documents += 1
+        self.references += len(references)
+        self._document_done()
+        return len(references)
+
+    def write_result(self, result):
+        """Writes the references of a parsecontrol.ExtractionResult. Failed documents are skipped."""
+        if not result.ok:
+            return 0
+        return self.write(result.references, source=result.filename)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _write_record(self, record):
+        raise NotImplementedError
+
+    def _document_done(self):
+        pass
+
+
+class JsonlWriter(ReferenceWriter):
+    """Writes JSON Lines to a file path, "-" for stdout, or an open text file. With append, an existing file is continued."""
+    def __init__(self, output, append=False):
+        if output == "-":
+            super().__init__("-")
+            self._file, self._owns_file = sys.stdout, False
+        elif isinstance(output, str):
+            super().__init__(output)
+            self._file, self._owns_file = open(output, "a" if append else "w", encoding="utf8"), True
+        else:
+            super().__init__(getattr(output, "name", None))
+            self._file, self._owns_file = output, False
+
+    def _write_record(self, record):
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def _document_done(self):
+        self._file.flush()
+
+    def close(self):
+        if self._file is None:
+            return
+        if self._owns_file:
+            self._file.close()
+        else:
+            self._file.flush()
+        self._file = None
+
+
+def parquet_schema():
+    author = pyarrow.struct([("firstname", pyarrow.string()), ("lastname", pyarrow.string()),
+                             ("non_person_author", pyarrow.string())])
+    fields = [("source", pyarrow.string()), ("index", pyarrow.int32()), ("page", pyarrow.int32()),
+              ("line", pyarrow.int32()), ("rawtext", pyarrow.string()), ("year", pyarrow.int32()),
+              ("title", pyarrow.string()), ("reference_style", pyarrow.string())]
+    fields += [(field, pyarrow.int32()) for field in Reference.SPAN_FIELDS]
+    fields.append(("authors", pyarrow.list_(author)))
+    return pyarrow.schema(fields)
+
+
+class ParquetWriter(ReferenceWriter):
+    """
+    Writes a Parquet file of RECORD_FIELDS columns. Records are buffered until row_group_size of
+    them are waiting and then written as one row group, so at most one row group is kept in memory.
+    The file is only readable after close(), which writes the remaining records and the footer.
+    Parquet files cannot be continued, so with append an existing path is left as is and the
+    records go to the first free name path-1.parquet, path-2.parquet, ... instead.
+    """
+    durable_documents = False
+
+    def __init__(self, path, row_group_size=DEFAULT_ROW_GROUP_SIZE, compression="zstd", append=False):
+        if pyarrow is None:
+            raise ImportError("Writing Parquet files needs pyarrow: pip install pyarrow")
+        if append:
+            path = _free_path(path)
+        super().__init__(path)
+        self.row_group_size = row_group_size
+        self.schema = parquet_schema()
+        self._writer = pyarrow.parquet.ParquetWriter(path, self.schema, compression=compression)
+        self._columns = {name: [] for name in self.schema.names}
+        self._buffered = 0
+
+    def _write_record(self, record):
+        for name, values in self._columns.items():
+            values.append(record[name])
+        self._buffered += 1
+
+    def _document_done(self):
+        if self._buffered >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        """Writes the buffered records as a row group"""
+        if self._buffered == 0:
+            return
+        table = pyarrow.Table.from_pydict(self._columns, schema=self.schema)
+        self._writer.write_table(table, row_group_size=self._buffered)
+        self._columns = {name: [] for name in self.schema.names}
+        self._buffered = 0
+
+    def close(self):
+        if self._writer is None:
+            return
+        self.flush()
+        self._writer.close()
+        self._writer = None
+
+
+def _free_path(path):
+    """Returns path, or the first of path-1, path-2, ... (before the extension) that does not exist"""
+    body, extension = os.path.splitext(path)
+    number = 0
+    while os.path.exists(path):
+        number += 1
+        path = f"{body}-{number}{extension}"
+    return path
+
+
+def writer_class(output, format=None):
+    """
+    Returns the writer class for output. The format ("jsonl" or "parquet") is detected from the file
+    extension unless given. "-" writes JSON Lines to stdout.
+    """
+    if format is None:
+        format = "jsonl" if output == "-" else FORMATS.get(os.path.splitext(output)[1].lower())
+    if format == "jsonl":
+        return JsonlWriter
+    elif format == "parquet":
+        return ParquetWriter
+    raise ValueError(f"Unknown output format for {output}, use one of: {', '.join(FORMATS)}")
+
+
+def open_writer(output, format=None, **settings):
+    """Returns a writer for output, see writer_class(). Settings are passed to the writer."""
+    return writer_class(output, format)(output, **settings)
@@ -0,0 +1,74 @@
+import regex as re
+
+MAX_SAMPLE_PAGES = 8        # How many pages of the same parity are compared at most
+MAX_LINES = 4               # How many lines from top and bottom can be headers or footers at most
+MIN_PAGES = 3               # Less pages than this is not enough to detect repetition
+SIMILARITY_THRESHOLD = 0.7
+SHINGLE_SIZE = 3
+
+
+def normalize_line(line):
+    """Lowercase line, collapse whitespace and mask numbers so that page numbers still match"""
+    line = re.sub(r"\d+", "#", line)
+    return re.sub(r"\s+", " ", line).strip().lower()
+
+
+def fingerprint(line):
+    """Returns set of hashed character shingles of the normalized line"""
+    normalized = normalize_line(line)
+    if len(normalized) <= SHINGLE_SIZE:
+        return frozenset([hash(normalized)])
+    return frozenset(hash(normalized[i:i + SHINGLE_SIZE]) for i in range(len(normalized) - SHINGLE_SIZE + 1))
+
+
+def similarity(fingerprint1, fingerprint2):
+    """Jaccard similarity of two fingerprints. Missing lines (None) never match."""
+    if fingerprint1 is None or fingerprint2 is None:
+        return 0.0
+    return len(fingerprint1 & fingerprint2) / len(fingerprint1 | fingerprint2)
+
+
+def sample_page_numbers(page_numbers, max_pages=MAX_SAMPLE_PAGES):
+    """Returns at most max_pages evenly spaced page numbers"""
+    if len(page_numbers) <= max_pages:
+        return list(page_numbers)
+    step = (len(page_numbers) - 1) / (max_pages - 1)
+    return [page_numbers[round(i * step)] for i in range(max_pages)]
+
+
+def count_repeating_lines(pages_as_lines, from_end=False, max_lines=MAX_LINES):
+    """
+    Counts how many consecutive lines from the top (or bottom) of the pages repeat on every page.
+    param1: list of pages as lists of lines
+    """
+    repeating = 0
+    for offset in range(max_lines):
+        line_index = -1 - offset if from_end else offset
+        fingerprints = []
+        for lines in pages_as_lines:
+            if offset < len(lines):
+                fingerprints.append(fingerprint(lines[line_index]))
+            else:
+                fingerprints.append(None)
+
+        scores = [similarity(fp1, fp2) for fp1, fp2 in zip(fingerprints, fingerprints[1:])]
+        if sum(scores) / len(scores) > SIMILARITY_THRESHOLD:
+            repeating += 1
+        else:
+            break
+    return repeating
+
+
+def detect_headers_footers(pages, page_numbers):
+    """
+    Detects the number of header and footer lines on given pages, which should share the same parity.
+    Returns (header_lines, footer_lines). Cost depends on the sample size, not the document length.
+    """
+    sampled = sample_page_numbers(page_numbers)
+    if len(sampled) < MIN_PAGES:
+        return (0, 0)
+
+    pages_as_lines = [pages[page_nr].splitlines() for page_nr in sampled]
+    header_lines = count_repeating_lines(pages_as_lines)
+    footer_lines = count_repeating_lines([lines[header_lines:] for lines in pages_as_lines], from_end=True)
+    return (header_lines, footer_lines)
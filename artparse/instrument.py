@@ -0,0 +1,138 @@
+import cProfile
+import io
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+
+class StageRecord(object):
+    """Measurements of one pipeline stage for one document"""
+    def __init__(self, name):
+        self.name = name
+        self.wall_time = 0.0
+        self.cpu_time = 0.0
+        self.peak_memory = None
+        self.pages = 0
+        self.chars = 0
+        self.references = 0
+
+    def measure_sizes(self, article):
+        """Record input sizes from the state of an Extractor after the stage"""
+        pages = article.pdf or []
+        self.pages = len(pages)
+        self.chars = sum(len(page) for page in pages)
+        self.references = len(article.references)
+
+    def to_dict(self):
+        return {"stage": self.name, "wall_time": self.wall_time, "cpu_time": self.cpu_time,
+                "peak_memory": self.peak_memory, "pages": self.pages, "chars": self.chars,
+                "references": self.references}
+
+
+class DocumentProfile(object):
+    """
+    Per-stage timings of one document.
+    track_memory: record peak allocations per stage with tracemalloc (slows down parsing)
+    profile_threshold: run cProfile for the document and keep the statistics if parsing
+                       took longer than this many seconds
+    """
+    def __init__(self, filename=None, track_memory=False, profile_threshold=None):
+        self.filename = filename
+        self.track_memory = track_memory
+        self.profile_threshold = profile_threshold
+        self.stages = []
+        self.profile_stats = None
+        self._profiler = None
+        self._started_tracemalloc = False
+
+    @property
+    def wall_time(self):
+        return sum(stage.wall_time for stage in self.stages)
+
+    @property
+    def cpu_time(self):
+        return sum(stage.cpu_time for stage in self.stages)
+
+    def start(self):
+        if self.track_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        if self.profile_threshold is not None:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def stop(self):
+        if self._profiler is not None:
+            self._profiler.disable()
+            if self.wall_time > self.profile_threshold:
+                output = io.StringIO()
+                pstats.Stats(self._profiler, stream=output).sort_stats("cumulative").print_stats(30)
+                self.profile_stats = output.getvalue()
+            self._profiler = None
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    @contextmanager
+    def stage(self, name, article=None):
+        """Measures the code run inside the with-block as one stage"""
+        record = StageRecord(name)
+        if self.track_memory and tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+            memory_at_start = tracemalloc.get_traced_memory()[0]
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield record
+        finally:
+            record.wall_time = time.perf_counter() - wall_start
+            record.cpu_time = time.process_time() - cpu_start
+            if self.track_memory and tracemalloc.is_tracing():
+                record.peak_memory = tracemalloc.get_traced_memory()[1] - memory_at_start
+            if article is not None:
+                record.measure_sizes(article)
+            self.stages.append(record)
+
+    def to_dict(self):
+        return {"filename": self.filename, "wall_time": self.wall_time, "cpu_time": self.cpu_time,
+                "stages": [stage.to_dict() for stage in self.stages], "profile_stats": self.profile_stats}
+
+
+class BatchProfile(object):
+    """Aggregates stage measurements over the documents of a batch"""
+    def __init__(self, slowest=10):
+        self.documents = 0
+        self.stages = {}
+        self.slowest = []
+        self.max_slowest = slowest
+
+    def add(self, profile):
+        if profile is None:
+            return
+        self.documents += 1
+        for record in profile.stages:
+            totals = self.stages.setdefault(record.name, {"count": 0, "wall_time": 0.0, "cpu_time": 0.0,
+                                                          "max_wall_time": 0.0, "max_peak_memory": None,
+                                                          "pages": 0, "chars": 0, "references": 0})
+            totals["count"] += 1
+            totals["wall_time"] += record.wall_time
+            totals["cpu_time"] += record.cpu_time
+            totals["max_wall_time"] = max(totals["max_wall_time"], record.wall_time)
+            if record.peak_memory is not None:
+                totals["max_peak_memory"] = max(totals["max_peak_memory"] or 0, record.peak_memory)
+            totals["pages"] += record.pages
+            totals["chars"] += record.chars
+            totals["references"] += record.references
+
+        self.slowest.append((profile.wall_time, profile.filename, profile.profile_stats))
+        self.slowest.sort(key=lambda item: item[0], reverse=True)
+        del self.slowest[self.max_slowest:]
+
+    def to_dict(self):
+        stages = {}
+        for name, totals in self.stages.items():
+            stages[name] = dict(totals, mean_wall_time=totals["wall_time"] / totals["count"])
+        return {"documents": self.documents, "stages": stages,
+                "slowest": [{"filename": filename, "wall_time": wall_time, "profile_stats": stats}
+                            for wall_time, filename, stats in self.slowest]}
@@ -0,0 +1,158 @@
+import math
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from . import pagegrid
+
+# Layout normalization of single pages in one pass:
+#   drop header and footer lines, split the columns and lay them out one after another,
+#   trim the left margin of every column and finally the margins of the whole page.
+# Every decision is made on one list of the page lines and one character grid, and the final
+# page text is joined only once. The result is the same as running Extractor.remove_headers_footers,
+# detect_columns, columns_to_one and remove_document_margins in this order.
+
+# Pages of a document are independent here, so normalize_pages can run them in a pool of threads or
+# processes. Processes read the page texts from one shared memory block instead of getting them pickled.
+# get_executor keeps one process pool per process, so that every document of a batch worker uses the same pool.
+
+# Documents with fewer pages are not worth sending to a pool
+MIN_PARALLEL_PAGES = 8
+# Pages are sent to the pool in this many chunks per worker, to balance the load without a task per page
+CHUNKS_PER_WORKER = 4
+
+# {jobs: ProcessPoolExecutor} of get_executor, and the process that created them
+_executors = {}
+_executors_pid = None
+
+# header_lines, footer_lines: lines removed from the top and bottom of the page
+# column_splits: start indexes of the columns after the first one
+# margins: (start_of_text, end_of_text) of the page after its columns were laid out
+PageLayout = namedtuple("PageLayout", ["header_lines", "footer_lines", "column_splits", "margins"])
+
+
+def normalize_page(page, header_lines=0, footer_lines=0, allow_junk=2):
+    """
+    Returns (text, grid, layout) of a page: the normalized page text, its character grid and the
+    PageLayout that was applied. Pure function of its arguments, so pages can be normalized in any order.
+    """
+    lines = page.splitlines()
+    header_lines = min(header_lines, len(lines))
+    footer_lines = min(footer_lines, len(lines) - header_lines)
+    lines = lines[header_lines:len(lines) - footer_lines]
+    # Like splitting the page text joined from these lines, which has no final empty line
+    if len(lines) > 0 and lines[-1] == "":
+        lines.pop()
+    grid = pagegrid.PageGrid.from_lines(lines)
+    splits = pagegrid.detect_column_splits(grid)
+
+    # (first character, end) of every column in the page lines, and how many rows of lines it has
+    columns = []
+    column_grids = []
+    for start, stop in pagegrid.column_bounds(splits):
+        column_grid = grid.slice_columns(start, stop)
+        rows = len(lines)
+        # A column ending with an empty row loses it when the laid out text is split into lines again
+        if rows > 0 and lines[-1][start:stop] == "":
+            rows -= 1
+            column_grid = column_grid.slice_rows(0, -1)
+        left_start = pagegrid.trim_left(column_grid) if rows > 0 else 0
+        columns.append((start + left_start, stop, rows))
+        column_grids.append(column_grid.slice_columns(left_start))
+
+    # The laid out lines end with an empty line that splitting the joined text would drop
+    text_start, stop, rows = columns[-1]
+    trailing_empty = rows == 0 or lines[rows - 1][text_start:stop] == ""
+    stacked = pagegrid.PageGrid.stack(column_grids)
+    if trailing_empty and stacked.rows > 0:
+        stacked = stacked.slice_rows(0, -1)
+    margins = pagegrid.detect_margins(stacked, allow_junk=allow_junk)
+    margin_start, margin_end = margins
+
+    output = []
+    for text_start, stop, rows in columns:
+        if rows == 0:
+            # An empty column still separates its neighbours with an empty line
+            output.append("")
+            continue
+        start = text_start + margin_start
+        end = text_start + margin_end + 1
+        if stop is not None:
+            end = min(end, stop)
+        output += [line[start:end] for line in lines[:rows]]
+    if trailing_empty and len(output) > 0:
+        output.pop()
+
+    text = "\n".join(output)
+    layout = PageLayout(header_lines, footer_lines, splits, margins)
+    return text, stacked.slice_columns(margin_start, margin_end + 1), layout
+
+
+def get_executor(jobs):
+    """
+    Returns a process pool of jobs workers for normalize_pages. The pool is created on first use and
+    reused by later documents in the same process, and replaced if a worker died.
+    """
+    global _executors_pid
+    # Pools are not shared with forked processes
+    if _executors_pid != os.getpid():
+        _executors.clear()
+        _executors_pid = os.getpid()
+    executor = _executors.get(jobs)
+    if executor is None or executor._broken:
+        executor = _executors[jobs] = ProcessPoolExecutor(max_workers=jobs)
+    return executor
+
+
+def normalize_pages(pages, trims, executor=None, workers=None):
+    """
+    Normalizes every page. trims: (header_lines, footer_lines) of every page.
+    executor: concurrent.futures executor to normalize chunks of pages in parallel
+    workers: number of workers of the executor, to size the chunks. Default: the max_workers of the executor.
+    Returns a list of (text, layout) of the pages in order.
+    """
+    if executor is None:
+        return _normalize_chunk(pages, trims)
+
+    workers = workers or getattr(executor, "_max_workers", None) or os.cpu_count() or 1
+    chunk_size = max(1, math.ceil(len(pages) / (CHUNKS_PER_WORKER * workers)))
+    chunks = [range(start, min(start + chunk_size, len(pages))) for start in range(0, len(pages), chunk_size)]
+    if not isinstance(executor, ProcessPoolExecutor):
+        futures = [executor.submit(_normalize_chunk, pages[chunk.start:chunk.stop], trims[chunk.start:chunk.stop])
+                   for chunk in chunks]
+        return [result for future in futures for result in future.result()]
+
+    encoded = [page.encode("utf8") for page in pages]
+    block = shared_memory.SharedMemory(create=True, size=max(1, sum(len(page) for page in encoded)))
+    try:
+        spans = []
+        position = 0
+        for page in encoded:
+            block.buf[position:position + len(page)] = page
+            spans.append((position, position + len(page)))
+            position += len(page)
+        del encoded
+        futures = [executor.submit(_normalize_shared, block.name, spans[chunk.start:chunk.stop],
+                                   trims[chunk.start:chunk.stop]) for chunk in chunks]
+        return [result for future in futures for result in future.result()]
+    finally:
+        block.close()
+        block.unlink()
+
+
+def _normalize_chunk(pages, trims):
+    results = []
+    for page, (header_lines, footer_lines) in zip(pages, trims):
+        text, _, page_layout = normalize_page(page, header_lines, footer_lines)
+        results.append((text, page_layout))
+    return results
+
+
+def _normalize_shared(name, spans, trims):
+    """Worker entry point: normalizes pages at spans (byte offsets) of the shared memory block name"""
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        pages = [bytes(block.buf[start:end]).decode("utf8") for start, end in spans]
+    finally:
+        block.close()
+    return _normalize_chunk(pages, trims)
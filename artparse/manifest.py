@@ -0,0 +1,131 @@
+import os
+import os.path
+import sqlite3
+import time
+from collections import namedtuple
+from . import __version__
+from .cache import file_digest
+
+# Checkpoint manifest of corpus runs: one row per input document with its path, size, mtime,
+# content digest, parser version, status and the output its references were written to.
+# A rerun with the same manifest skips documents that are done and unchanged, so a batch that
+# died halfway continues where it stopped. A document counts as changed when its size or mtime
+# differs and its content digest differs too, so touched or copied files are not parsed again.
+
+DONE = "done"
+FAILED = "failed"
+
+# State of a document file when it was read
+Fingerprint = namedtuple("Fingerprint", ["size", "mtime", "digest"])
+
+
+def file_fingerprint(path, digest=None):
+    """Returns the Fingerprint of a file, or None if it cannot be read. digest: cache.file_digest, if known"""
+    try:
+        stat = os.stat(path)
+        return Fingerprint(stat.st_size, stat.st_mtime, digest or file_digest(path))
+    except OSError:
+        return None
+
+
+class Manifest(object):
+    """
+    SQLite manifest of processed documents. Works like cache.ResultCache: the database is opened
+    lazily and every process opens its own connection.
+    version: parser version; documents done with another version are processed again
+    """
+    def __init__(self, path, version=__version__):
+        self.path = path
+        self.version = version
+        self._connection = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_connection"] = None
+        return state
+
+    @property
+    def connection(self):
+        if self._connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._connection = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("CREATE TABLE IF NOT EXISTS documents (path TEXT PRIMARY KEY, size INTEGER, "
+                                     "mtime REAL, digest TEXT, version TEXT, status TEXT NOT NULL, "
+                                     "reference_count INTEGER, output TEXT, error TEXT, finished REAL NOT NULL)")
+        return self._connection
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def get(self, path):
+        """Returns the row of path as a dictionary, or None"""
+        cursor = self.connection.execute("SELECT * FROM documents WHERE path = ?", (_key(path),))
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        return dict(zip([column[0] for column in cursor.description], row))
+
+    def is_done(self, path, retry_failed=True):
+        """
+        Whether path was already processed with this parser version and has not changed since.
+        Failed documents count as done only without retry_failed.
+        """
+        row = self.get(path)
+        if row is None or row["version"] != self.version:
+            return False
+        if row["status"] != DONE and (retry_failed or row["status"] != FAILED):
+            return False
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        if stat.st_size == row["size"] and stat.st_mtime == row["mtime"]:
+            return True
+        if stat.st_size != row["size"] or file_digest(path) != row["digest"]:
+            return False
+        # Same content with a new mtime: remember the mtime to skip hashing next time
+        self.connection.execute("UPDATE documents SET mtime = ? WHERE path = ?", (stat.st_mtime, _key(path)))
+        return True
+
+    def pending(self, paths, retry_failed=True):
+        """Returns the paths that are not done, in the given order"""
+        return [path for path in paths if not self.is_done(path, retry_failed)]
+
+    def record(self, filename, error=None, reference_count=0, output=None, fingerprint=None):
+        """
+        Records a processed document as done, or failed if error is given. Call this only after the
+        references are stored in output, so that a crash in between makes the document run again
+        instead of getting lost.
+        fingerprint: Fingerprint of the file taken before it was read. A file that changes while it is
+                     being parsed is then recorded as its old version and parsed again. Without it, the
+                     file is fingerprinted now.
+        """
+        if fingerprint is None:
+            fingerprint = file_fingerprint(filename)
+        size, mtime, digest = fingerprint if fingerprint is not None else (None, None, None)
+        status = DONE if error is None else FAILED
+        self.connection.execute("INSERT OR REPLACE INTO documents (path, size, mtime, digest, version, status, "
+                                "reference_count, output, error, finished) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                (_key(filename), size, mtime, digest, self.version, status, reference_count, output,
+                                 error, time.time()))
+
+    def record_result(self, result, output=None):
+        """Records a parsecontrol.ExtractionResult"""
+        self.record(result.filename, result.error, len(result.references), output, result.fingerprint)
+
+    def stats(self):
+        """Returns the number of documents per status"""
+        return {status: count for status, count
+                in self.connection.execute("SELECT status, COUNT(*) FROM documents GROUP BY status")}
+
+
+def _key(path):
+    return os.path.abspath(path)
@@ -0,0 +1,232 @@
+import numpy as np
+
+# Character classes used by layout analysis
+SPACE = 0
+DIGIT = 1
+PUNCT = 2
+ALPHA = 3
+OTHER = 4
+NUMBER_OF_CLASSES = 5
+
+PUNCTUATION = [",", ";", "(", ")", ".", "{", "}", "[", "]"]
+
+
+def classify_char(char):
+    """Returns the character class of a single character"""
+    if char.isspace():
+        return SPACE
+    elif char.isnumeric():
+        return DIGIT
+    elif char in PUNCTUATION:
+        return PUNCT
+    elif char.isalpha():
+        return ALPHA
+    else:
+        return OTHER
+
+# Lookup table for ascii. Code point 0 is the padding numpy uses for short rows, so it counts as space.
+_ASCII_CLASSES = np.array([classify_char(chr(code)) for code in range(128)], dtype=np.uint8)
+_ASCII_CLASSES[0] = SPACE
+
+
+class PageGrid(object):
+    """
+    Page text as a two-dimensional array of character classes (rows x columns).
+    Rows shorter than the longest row are padded with spaces.
+    The grid is built once per page and stages slice it instead of re-reading the text.
+    """
+    def __init__(self, classes, lengths):
+        self.classes = classes
+        self.lengths = lengths
+
+    @classmethod
+    def from_page(cls, page):
+        return cls.from_lines(page.splitlines())
+
+    @classmethod
+    def from_lines(cls, rows):
+        lengths = np.fromiter((len(row) for row in rows), dtype=np.int64, count=len(rows))
+        width = int(lengths.max()) if len(rows) > 0 else 0
+        if width == 0:
+            return cls(np.zeros((len(rows), 0), dtype=np.uint8), lengths)
+
+        codes = np.array(rows, dtype=f"<U{width}").view(np.uint32).reshape(len(rows), width)
+        ascii_mask = codes < 128
+        classes = np.empty(codes.shape, dtype=np.uint8)
+        classes[ascii_mask] = _ASCII_CLASSES[codes[ascii_mask]]
+        if not ascii_mask.all():
+            # Classify each distinct non-ascii character only once
+            unique_codes, inverse = np.unique(codes[~ascii_mask], return_inverse=True)
+            unique_classes = np.array([classify_char(chr(code)) for code in unique_codes], dtype=np.uint8)
+            classes[~ascii_mask] = unique_classes[inverse]
+        return cls(classes, lengths)
+
+    @property
+    def rows(self):
+        return self.classes.shape[0]
+
+    @property
+    def width(self):
+        return self.classes.shape[1]
+
+    def class_counts(self):
+        """Returns an array of shape (NUMBER_OF_CLASSES, width): count of each class per column"""
+        counts = np.zeros((NUMBER_OF_CLASSES, self.width), dtype=np.int64)
+        for char_class in range(NUMBER_OF_CLASSES):
+            counts[char_class] = (self.classes == char_class).sum(axis=0)
+        return counts
+
+    def leading_spaces(self):
+        """
+        Returns the number of leading whitespace characters for every row.
+        Rows with only whitespace count all their characters, empty rows count zero.
+        """
+        if self.width == 0:
+            return np.zeros(self.rows, dtype=np.int64)
+        text = self.classes != SPACE
+        has_text = text.any(axis=1)
+        return np.where(has_text, text.argmax(axis=1), self.lengths)
+
+    def slice_rows(self, start=None, stop=None):
+        """Returns grid of given rows, like page.splitlines()[start:stop]"""
+        return self._trimmed(self.classes[start:stop], self.lengths[start:stop])
+
+    def slice_columns(self, start=0, stop=None):
+        """Returns grid of given columns, like [row[start:stop] for row in rows]"""
+        stop = self.width if stop is None else min(stop, self.width)
+        start = min(start, stop)
+        lengths = np.clip(self.lengths, start, stop) - start
+        return self._trimmed(self.classes[:, start:stop], lengths)
+
+    @classmethod
+    def stack(cls, grids):
+        """Returns grid of given grids on top of each other, like "\\n".join() of the pages"""
+        if len(grids) == 0:
+            return cls(np.zeros((0, 0), dtype=np.uint8), np.zeros(0, dtype=np.int64))
+        width = max(grid.width for grid in grids)
+        classes = np.full((sum(grid.rows for grid in grids), width), SPACE, dtype=np.uint8)
+        row = 0
+        for grid in grids:
+            classes[row:row + grid.rows, :grid.width] = grid.classes
+            row += grid.rows
+        return cls._trimmed(classes, np.concatenate([grid.lengths for grid in grids]))
+
+    @classmethod
+    def _trimmed(cls, classes, lengths):
+        """Drops padding columns beyond the longest row"""
+        width = int(lengths.max()) if len(lengths) > 0 else 0
+        return cls(classes[:, :width], lengths)
+
+
+def _count_leading(mask):
+    """Returns the number of consecutive True values in the beginning of boolean array"""
+    failing = np.flatnonzero(~mask)
+    return int(failing[0]) if len(failing) > 0 else len(mask)
+
+
+def detect_margins(grid, allow_junk=2):
+    """
+    Detects margins on a page grid. Returns (start_of_text, end_of_text) column indexes.
+    See Extractor.detect_margins for the levels of allowed junk.
+    """
+    column_length = grid.rows
+    counts = grid.class_counts()
+    spaces, numbers, punctuation, text = counts[SPACE], counts[DIGIT], counts[PUNCT], counts[ALPHA]
+    only_junk = (spaces + numbers + punctuation) == column_length
+
+    # left margin detection
+    if allow_junk == 0:
+        left_margin = spaces == column_length
+    elif allow_junk == 1:
+        left_margin = only_junk & (numbers < 6)
+    else:
+        left_margin = (text < 6) & (numbers < 6)
+
+    # right margin detection: since right can be unaligned, strip very carefully and no text at all
+    if allow_junk == 0:
+        right_margin = spaces == column_length
+    else:
+        right_margin = only_junk & (numbers < 2)
+
+    start_of_text = _count_leading(left_margin)
+    end_of_text = grid.width - 1 - _count_leading(right_margin[::-1])
+    return (start_of_text, end_of_text)
+
+
+# Column detection: a gutter is a run of at least MIN_GUTTER character positions that are whitespace
+# on GUTTER_RATIO of the rows with text. Its widest block of most whitespace has to separate text on
+# its both sides on at least SEPARATED_RATIO of those rows. Lines of a single column cross such a run, so ragged line ends and
+# wide word spaces do not count as gutters. Columns are at least MIN_COLUMN_WIDTH characters wide.
+MIN_GUTTER = 2
+GUTTER_RATIO = 0.61
+SEPARATED_RATIO = 0.25
+MIN_COLUMN_WIDTH = 15
+
+
+def detect_column_splits(grid, min_gutter=MIN_GUTTER, min_column_width=MIN_COLUMN_WIDTH):
+    """
+    Detects any number of columns on a page grid with a whitespace projection profile.
+    Returns the start indexes of the columns after the first one, an empty list for single column pages.
+    """
+    blank = grid.classes == SPACE
+    text_rows = ~blank.all(axis=1)
+    number_of_text_rows = int(text_rows.sum())
+    if number_of_text_rows == 0 or grid.width < 2 * min_column_width + min_gutter:
+        return []
+    blank = blank[text_rows]
+
+    # Share of text rows that are whitespace at every position, and runs of positions that can be gutters
+    profile = blank.sum(axis=0) / number_of_text_rows
+    candidate = np.concatenate(([False], profile >= GUTTER_RATIO, [False]))
+    edges = np.flatnonzero(candidate[1:] != candidate[:-1])
+    runs = [(int(start), int(stop)) for start, stop in zip(edges[::2], edges[1::2])
+            if stop - start >= min_gutter and start > 0 and stop < grid.width]
+    if len(runs) == 0:
+        return []
+
+    # For every row and position: whether the row has text at or before / at or after the position
+    text = ~blank
+    text_before = np.logical_or.accumulate(text, axis=1)
+    text_after = np.logical_or.accumulate(text[:, ::-1], axis=1)[:, ::-1]
+
+    splits = []
+    column_start = 0
+    for start, stop in runs:
+        start, split = _widest_whitespace(profile, start, stop)
+        if start - column_start < min_column_width or grid.width - split < min_column_width:
+            continue
+        separated = text_before[:, start - 1] & text_after[:, split] & blank[:, start:split].all(axis=1)
+        if separated.sum() / number_of_text_rows < SEPARATED_RATIO:
+            continue
+        splits.append(split)
+        column_start = split
+    return splits
+
+
+def _widest_whitespace(profile, start, stop):
+    """
+    Returns (start, stop) of the widest block of positions with the most whitespace in profile[start:stop].
+    A gutter run can continue into aligned gaps of the next column, such as the space after reference
+    numbers, so the column starts after the widest block instead of after the last one.
+    """
+    is_max = np.concatenate(([False], profile[start:stop] == profile[start:stop].max(), [False]))
+    edges = np.flatnonzero(is_max[1:] != is_max[:-1])
+    widths = edges[1::2] - edges[::2]
+    widest = int(np.argmax(widths))
+    return start + int(edges[2 * widest]), start + int(edges[2 * widest + 1])
+
+
+def column_bounds(splits):
+    """Returns (start, stop) of every column from column split indexes. The last column has stop None."""
+    return list(zip([0] + list(splits), list(splits) + [None]))
+
+
+def trim_left(grid, ignore_edge_rows=True):
+    """
+    Returns the number of whitespace columns to trim from the left side of the page.
+    Ignores first and last rows (possible left-over headers, page numbers).
+    """
+    leading = grid.leading_spaces()
+    if ignore_edge_rows:
+        leading = leading[1:-1]
+    return int(min(500, leading.min())) if len(leading) > 0 else 500
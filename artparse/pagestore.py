@@ -0,0 +1,135 @@
+import mmap
+import os
+import os.path
+import struct
+import sys
+import zlib
+from array import array
+from .cache import file_digest
+
+# Page text file format, all integers little-endian:
+#   header: magic (8 bytes), format version (uint16), flags (uint16), number of pages (uint32),
+#           number of the first page in the document (uint32)
+#   offset table: number of pages + 1 uint64 offsets of page data, relative to the end of the table
+#   page data: utf-8 text of every page one after another, each zlib compressed if FLAG_COMPRESSED is set
+
+MAGIC = b"ARTPAGES"
+FORMAT_VERSION = 1
+FLAG_COMPRESSED = 1
+HEADER = struct.Struct("<8sHHII")
+EXTENSION = ".pages"
+
+
+class PageStoreError(Exception):
+    pass
+
+
+def write_pages(path, pages, compress=False, page_offset=0):
+    """
+    Writes page texts into a page store file. The file is written under a temporary name
+    and renamed, so readers never see a partial file.
+    """
+    encoded = []
+    for page in pages:
+        data = page.encode("utf8")
+        encoded.append(zlib.compress(data) if compress else data)
+
+    offsets = array("Q", [0])
+    for data in encoded:
+        offsets.append(offsets[-1] + len(data))
+    if sys.byteorder == "big":
+        offsets.byteswap()
+
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    with open(temporary_path, "wb") as outfile:
+        outfile.write(HEADER.pack(MAGIC, FORMAT_VERSION, FLAG_COMPRESSED if compress else 0, len(encoded), page_offset))
+        outfile.write(offsets.tobytes())
+        for data in encoded:
+            outfile.write(data)
+    os.replace(temporary_path, path)
+
+
+def store_path(directory, pdffile, variant=None, digest=None):
+    """
+    Returns the path of the page store of a pdf file in directory, named by the digest of the pdf.
+    variant: name of another way of decoding the pdf (such as a text extraction backend), stored separately
+    digest: cache.file_digest of the pdf, if already known
+    """
+    if digest is None:
+        digest = file_digest(pdffile)
+    name = digest if variant is None else f"{digest}-{variant}"
+    return os.path.join(directory, name + EXTENSION)
+
+
+class PageStore(object):
+    """
+    Read-only sequence of page texts in a page store file. The file is memory-mapped and
+    a page is decoded only when it is accessed, so opening a store is cheap regardless of size.
+    Can be used in place of pdftotext.PDF.
+    page_offset is the number of the first stored page in the document. Stores written by a
+    streaming read only have the last pages.
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as infile:
+            # An empty file cannot be mapped
+            if os.fstat(infile.fileno()).st_size < HEADER.size:
+                raise PageStoreError(f"Not a page store file: {self.path}")
+            self._map = mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._read_header()
+        except Exception:
+            self._map.close()
+            raise
+
+    def _read_header(self):
+        if len(self._map) < HEADER.size:
+            raise PageStoreError(f"Not a page store file: {self.path}")
+        magic, version, flags, page_count, page_offset = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise PageStoreError(f"Not a page store file: {self.path}")
+        if version != FORMAT_VERSION:
+            raise PageStoreError(f"Unsupported page store version {version}: {self.path}")
+
+        table_end = HEADER.size + (page_count + 1) * 8
+        if table_end > len(self._map):
+            raise PageStoreError(f"Truncated page store file: {self.path}")
+        offsets = array("Q")
+        offsets.frombytes(self._map[HEADER.size:table_end])
+        if sys.byteorder == "big":
+            offsets.byteswap()
+        if table_end + offsets[-1] > len(self._map):
+            raise PageStoreError(f"Truncated page store file: {self.path}")
+
+        self.compressed = bool(flags & FLAG_COMPRESSED)
+        self.page_offset = page_offset
+        self._offsets = offsets
+        self._data_start = table_end
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[page_nr] for page_nr in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("page index out of range")
+        data = self._map[self._data_start + self._offsets[index]:self._data_start + self._offsets[index + 1]]
+        if self.compressed:
+            data = zlib.decompress(data)
+        return data.decode("utf8")
+
+    def __iter__(self):
+        for page_nr in range(len(self)):
+            yield self[page_nr]
+
+    def close(self):
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
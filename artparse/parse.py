@@ -1,19 +1,189 @@
+import argparse
+import json
+import os.path
 import sys
-from parsecontrol import extract
+from .parsecontrol import extract, batch_extract, watch_folder, triage, find_documents, document_extensions
+from .instrument import BatchProfile
+from .cache import ResultCache, DEFAULT_MAX_SIZE
+from .export import open_writer, writer_class
+from .pdfmanipulate import OcrEngine
+from .manifest import Manifest
+from .backends import BACKENDS, AUTO, DEFAULT_BACKEND
 
-def main(source_pdf=None):
+def main(source_pdf=None, **options):
     """Main entry to the script"""
     if source_pdf is None:
         print("Please provide path to source pdf for parsing.")
         return
     else:
-        print("Starting non-interactive parsing.")
-        return extract(source_pdf)
+        print("Starting non-interactive parsing.", file=sys.stderr)
+        return extract(source_pdf, **options)
+
+def batch_main(paths, jobs=None, instrument=None, profile_out=None, writer=None, manifest=None, watch=None,
+               retry_failed=True, **options):
+    """
+    Parse all given pdf files and directories, printing results as documents finish.
+    With profile_out, stage measurements of the whole batch are written there as JSON.
+    With an export writer, references are written there instead of printed. The writer is closed at the end.
+    With a manifest, documents that are done and unchanged are skipped and finished ones are recorded.
+    With watch (seconds), the paths are checked for new documents that often until interrupted. Watching
+    needs a writer whose documents are complete once written, since it is only closed when interrupted.
+    """
+    if watch is not None and writer is not None and not writer.durable_documents:
+        raise ValueError(f"Cannot watch with output {writer.path}, it is only complete once closed")
+    failures = 0
+    batch_profile = BatchProfile()
+    # Documents of a writer that completes its file only when closed are recorded after that
+    unrecorded = []
+    if profile_out and instrument is None:
+        instrument = {}
+    if watch is not None:
+        results = watch_folder(paths, manifest, interval=watch, jobs=jobs, instrument=instrument,
+                               retry_failed=retry_failed, **options)
+    else:
+        results = batch_extract(paths, jobs=jobs, instrument=instrument, manifest=manifest,
+                                retry_failed=retry_failed, **options)
+    try:
+        for result in results:
+            batch_profile.add(result.profile)
+            if result.ok and writer is not None:
+                writer.write_result(result)
+            elif result.ok:
+                print_references(result.references, source=result.filename)
+            else:
+                failures += 1
+                print(f"Error parsing {result.filename}: {result.error}", file=sys.stderr)
+
+            if manifest is None:
+                continue
+            output = writer.path if writer is not None and result.ok else None
+            if output is not None and not writer.durable_documents:
+                unrecorded.append((result.filename, len(result.references), result.fingerprint))
+            else:
+                manifest.record_result(result, output)
+    except KeyboardInterrupt:
+        if watch is None:
+            raise
+    finally:
+        if writer is not None:
+            writer.close()
+        for filename, reference_count, fingerprint in unrecorded:
+            manifest.record(filename, reference_count=reference_count, output=writer.path, fingerprint=fingerprint)
+
+    if profile_out:
+        with open(profile_out, "w") as outfile:
+            json.dump(batch_profile.to_dict(), outfile, indent=2)
+    if options.get("cache") is not None:
+        print(f"Cache: {options['cache'].stats()}", file=sys.stderr)
+    if manifest is not None:
+        print(f"Manifest: {manifest.stats()}", file=sys.stderr)
+    return failures
+
+def triage_main(paths, **options):
+    """
+    Prints the triage of every document as a line of JSON, without parsing them.
+    Returns the number of documents that could not be triaged.
+    """
+    failures = 0
+    for filename in find_documents(paths, document_extensions(options.get("text_input"))):
+        result = triage(filename, **options)
+        if result is None:
+            failures += 1
+            print(f"Error: File not found: {filename}", file=sys.stderr)
+            continue
+        if result.error is not None:
+            failures += 1
+            print(f"Error triaging {filename}: {result.error}", file=sys.stderr)
+        print(json.dumps(result._asdict(), default=str))
+    return failures
+
+def print_references(references, source=None):
+    if source:
+        print(f"== {source}")
+    print(f"Number of detected references: {len(references)}")
+    for ref in references:
+        print(f"- {ref}")
 
 if __name__ == '__main__':
-    if len(sys.argv) == 1:
-        print("syntax: parse.py [path_to_pdf]")
-        sys.exit(1)
+    argparser = argparse.ArgumentParser(prog="parse.py", description="Extract references from scientific articles")
+    argparser.add_argument("paths", nargs="+", metavar="path",
+                           help="pdf or text file, directory of them, or - to read text from stdin")
+    argparser.add_argument("--text", action="store_true",
+                           help="read given files as text with form feeds between pages (pdftotext output)")
+    argparser.add_argument("--jobs", "-j", type=int, default=None,
+                           help="number of parallel worker processes (enables batch mode)")
+    argparser.add_argument("--streaming", action="store_true",
+                           help="decode pages from the end and stop once the references are found")
+    argparser.add_argument("--verbose", "-v", action="store_true", help="print progress of every parsing stage")
+    argparser.add_argument("--debug-dir", metavar="dir",
+                           help="write events and intermediate texts of each document into a directory under dir")
+    argparser.add_argument("--profile-out", metavar="file", help="write per-stage timings of the batch as JSON")
+    argparser.add_argument("--track-memory", action="store_true", help="record peak allocations of every stage")
+    argparser.add_argument("--cprofile-threshold", type=float, metavar="seconds",
+                           help="keep cProfile statistics of documents slower than this")
+    argparser.add_argument("--cache", metavar="file", help="cache page texts and references in this database")
+    argparser.add_argument("--cache-size", type=int, default=DEFAULT_MAX_SIZE // (1024 * 1024), metavar="MB",
+                           help="evict least recently used cache entries beyond this size")
+    argparser.add_argument("--page-store", metavar="dir",
+                           help="keep decoded page texts of every pdf in this directory and reuse them")
+    argparser.add_argument("--layout-jobs", type=int, metavar="n",
+                           help="number of processes laying out the pages of each document in parallel (for long documents)")
+    argparser.add_argument("--backend", choices=list(BACKENDS) + [AUTO], default=DEFAULT_BACKEND,
+                           help="text extraction backend decoding the pdfs; auto probes the backends on every "
+                                "document and uses the fastest one with usable text (default: %(default)s)")
+    argparser.add_argument("--ocr", action="store_true", help="OCR pages without text with gs and tesseract")
+    argparser.add_argument("--ocr-jobs", type=int, metavar="n",
+                           help="number of pages OCRd in parallel per document (default: cpus per worker process)")
+    argparser.add_argument("--output", "-o", metavar="file",
+                           help="write references with source, location and spans to a .jsonl or .parquet file "
+                                "(- for JSON Lines on stdout) instead of printing them")
+    argparser.add_argument("--output-format", choices=["jsonl", "parquet"],
+                           help="format of --output when it cannot be detected from the file extension")
+    argparser.add_argument("--manifest", metavar="file",
+                           help="record finished documents in this database and skip them when run again")
+    argparser.add_argument("--skip-failed", action="store_true",
+                           help="with --manifest, do not retry unchanged documents that failed before")
+    argparser.add_argument("--watch", type=float, metavar="seconds",
+                           help="keep watching the paths for new documents, checking this often (needs --manifest)")
+    argparser.add_argument("--triage", action="store_true",
+                           help="only print page count, text layer, columns and references page of every document as JSON")
+    args = argparser.parse_args()
+    if args.triage:
+        failures = triage_main(args.paths, backend=args.backend, verbose=args.verbose,
+                               text_input=True if args.text else None)
+        sys.exit(1 if failures else 0)
+    if args.watch is not None and not args.manifest:
+        argparser.error("--watch needs --manifest")
+    if args.watch is not None and args.output and not writer_class(args.output, args.output_format).durable_documents:
+        argparser.error("--watch needs an --output that is complete after every document, like .jsonl")
+    options = {"streaming": args.streaming, "verbose": args.verbose, "debug_dir": args.debug_dir,
+               "page_store_dir": args.page_store, "layout_jobs": args.layout_jobs,
+               "backend": args.backend}
+    if args.text:
+        options["text_input"] = True
+    if args.cache:
+        options["cache"] = ResultCache(args.cache, max_size=args.cache_size * 1024 * 1024)
+    if args.ocr:
+        ocr_jobs = args.ocr_jobs or max(1, (os.cpu_count() or 1) // (args.jobs or os.cpu_count() or 1))
+        options["ocr"] = OcrEngine(jobs=ocr_jobs, cache=options.get("cache"))
+    instrument = None
+    if args.profile_out or args.track_memory or args.cprofile_threshold is not None:
+        instrument = {"track_memory": args.track_memory, "profile_threshold": args.cprofile_threshold}
+
+    manifest = Manifest(args.manifest) if args.manifest else None
+    # A resumed run adds to the output of the earlier runs
+    writer = open_writer(args.output, args.output_format, append=manifest is not None) if args.output else None
+
+    if (args.jobs is None and instrument is None and manifest is None and len(args.paths) == 1
+            and not os.path.isdir(args.paths[0])):
+        results = main(args.paths[0], **options)
+        if writer is not None:
+            writer.write(results, source=args.paths[0])
+            writer.close()
+        else:
+            print_references(results)
     else:
-        results = main(sys.argv[1])
-        print(results)
\ No newline at end of file
+        failures = batch_main(args.paths, jobs=args.jobs, instrument=instrument, profile_out=args.profile_out,
+                              writer=writer, manifest=manifest, watch=args.watch, retry_failed=not args.skip_failed,
+                              **options)
+        sys.exit(1 if failures else 0)
@@ -1,48 +1,414 @@
+import os
 import os.path
-from artparser import Extractor
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+from .artparser import Extractor, TEXT_EXTENSIONS
+from .events import DebugBundle, PrintSink, NULL_SINK
+from .instrument import DocumentProfile
+from .cache import ResultCache, file_digest
+from .manifest import file_fingerprint
+from . import layout
+from . import pagestore
+from . import pdfmanipulate
+from . import backends
 
 # TODO: Create datamodel
 
-def extract(filename):
-
-    # pdf = None
-    # has_content = False
-    # while has_content == False:
-    #     with open(filename, "rb") as pdf_file:
-    #         pdf = pdftotext.PDF(pdf_file)
-    #     if len(pdf[0]) == 0:
-    #         file_body, file_extension = os.path.splitext(filename)
-    #         ocr_filename = file_body + "-ocr" + file_extension
-    #         if os.path.isfile(ocr_filename) == True:
-    #             print("OCRd file found. Using it.")
-    #             filename = ocr_filename
-    #         else:
-    #             print("No OCRd file found. Generating searchable PDF")
-    #             pdfmanipulate.scan(filename, len(pdf))
-    #             filename = ocr_filename
-    #     else:
-    #         has_content = True
-
-    article = Extractor(filename)
-    article.read()
-    article.detect_headers_footers()
-    article.remove_headers_footers()
-    article.detect_columns()
-    article.two_columns_to_one()
-    article.remove_document_margins()
-    article.detect_reference_start()
-    article.detect_references_layout()
-    if article.references_layout == "indentation":
-        article.indentation_parse()
+class ExtractionResult(object):
+    """
+    Outcome of extracting references from a single document in a batch.
+    fingerprint: manifest.Fingerprint of the file taken before it was read, if asked for
+    """
+    def __init__(self, filename, references=None, error=None, profile=None, fingerprint=None):
+        self.filename = filename
+        self.references = references if references is not None else []
+        self.error = error
+        self.profile = profile
+        self.fingerprint = fingerprint
+
+    def __str__(self):
+        if self.error:
+            return f"{self.filename}: FAILED ({self.error})"
+        return f"{self.filename}: {len(self.references)} references"
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+def extract(filename, streaming=False, verbose=False, debug_dir=None, profile=None, cache=None, page_store_dir=None,
+            text_input=None, ocr=None, layout_jobs=None, backend=None, digest=None):
+    """
+    Run the full Extractor pipeline on a pdf file and return the detected references.
+    Files with a text extension (.txt) and "-" (stdin) are read as pre-extracted text with
+    form feeds between pages. Set text_input to True or False to override the detection.
+    With streaming, only the last pages needed for the reference section are decoded.
+    Parsing is silent unless verbose is set. With debug_dir, all events and intermediate
+    texts of the document are written to a new directory of its own under debug_dir.
+    Pass an instrument.DocumentProfile as profile to record measurements of every stage.
+    cache: cache.ResultCache or path of the cache database. Cached references are returned
+           without parsing, and cached page texts are parsed without decoding the pdf again.
+    page_store_dir: directory of page store files. Decoded pages are written there and later
+                    runs read them with mmap instead of decoding the pdf.
+    ocr: pdfmanipulate.OcrEngine, or True for a default engine, to OCR pages that have no text.
+         OCR texts of pages are stored in the cache, if given.
+    layout_jobs: number of processes normalizing the page layouts of this document in parallel.
+                 Pays off for long documents such as books and theses. The pool of processes is kept
+                 and reused by later documents (see layout.get_executor).
+    backend: text extraction backend (name or backends.Backend) decoding the pdf, or "auto" to pick
+             the fastest backend that gives usable text for every document. Default: pdftotext layout mode.
+    digest: cache.file_digest of the file, if already known. Otherwise the file is hashed once when
+            needed by the cache or page store.
+    """
+    # A cache given as a path is opened for this document only
+    own_cache = cache is not None and not isinstance(cache, ResultCache)
+    if own_cache:
+        cache = ResultCache(cache)
+
+    article = Extractor(filename, events=_event_sink(filename, verbose, debug_dir))
+    article.profile = profile
+    article.text_input = text_input
+    if backend is not None:
+        article.backend = backend if backend == backends.AUTO else backends.get_backend(backend)
+    if ocr and not article.is_text_input():
+        article.ocr = ocr if isinstance(ocr, pdfmanipulate.OcrEngine) else pdfmanipulate.OcrEngine(cache=cache)
+        if not article.ocr.available():
+            article.events.emit("ocr_unavailable", "OCR needs {tools} installed, reading pages without OCR",
+                                tools=", ".join(pdfmanipulate.OCR_TOOLS))
+            article.ocr = None
+    if article.is_text_input():
+        digest = None
+    elif digest is None and (cache is not None or page_store_dir is not None):
+        try:
+            digest = file_digest(filename)
+        except OSError:
+            pass
+    if page_store_dir is not None and digest is not None:
+        os.makedirs(page_store_dir, exist_ok=True)
+        article.page_store = pagestore.store_path(page_store_dir, filename, "-".join(_pages_variant(article)) or None,
+                                                  digest=digest)
+
+    if layout_jobs is not None and layout_jobs > 1:
+        article.layout_executor = layout.get_executor(layout_jobs)
+    try:
+        if cache is not None:
+            return _run_profiled(article, filename, lambda: _run_cached(article, streaming, cache, digest))
+        return _run_profiled(article, filename, lambda: _run_pipeline(article, streaming))
+    finally:
+        if own_cache:
+            cache.close()
+
+
+def extract_text(text, streaming=False, verbose=False, debug_dir=None, profile=None, name="text"):
+    """
+    Run the full Extractor pipeline on pre-extracted text and return the detected references.
+    text: string with form feeds between pages (like pdftotext output) or an iterable of page strings
+    name: name of the text in events and debug directories
+    Other arguments are as in extract().
+    """
+    article = Extractor(events=_event_sink(name, verbose, debug_dir))
+    article.profile = profile
+
+    def read_and_parse():
+        with article.stage("read"):
+            if isinstance(text, str):
+                article.read_text(text, streaming=streaming)
+            else:
+                article.read_pages(text, streaming=streaming)
+        return _run_pipeline(article, streaming)
+
+    return _run_profiled(article, name, read_and_parse)
+
+
+def triage(filename, backend=None, verbose=False, text_input=None):
+    """
+    Returns an artparser.Triage of a document without parsing it: page count, whether it has text,
+    whether it is likely two-column and the page of the references heading, from a sample of pages.
+    Returns None if the file is not found, and a Triage with its error set if the pdf cannot be decoded.
+    backend and text_input are as in extract().
+    """
+    article = Extractor(filename, events=_event_sink(filename, verbose, None))
+    article.text_input = text_input
+    if backend is not None:
+        article.backend = backend if backend == backends.AUTO else backends.get_backend(backend)
+    try:
+        return article.triage()
+    finally:
+        article.events.close()
+
+
+def _event_sink(name, verbose, debug_dir):
+    if debug_dir:
+        return DebugBundle.for_document(debug_dir, name)
+    elif verbose:
+        return PrintSink()
+    return NULL_SINK
+
+
+def _run_profiled(article, name, run):
+    """Calls run() measured by the profile of the article. Reports failures and closes the event sink."""
+    if article.profile is not None:
+        article.profile.start()
+    try:
+        return run()
+    except Exception as e:
+        article.events.emit("failed", "Parsing {filename} failed: {error}", filename=name, error=e)
+        raise
+    finally:
+        if article.profile is not None:
+            article.profile.stop()
+        article.events.close()
+
+
+def _run_cached(article, streaming, cache, digest):
+    """Runs the pipeline unless the references of the pdf of digest are cached. Stores the results."""
+    if digest is None:
+        return _run_pipeline(article, streaming)
+
+    options = {"streaming": streaming, "ocr": article.ocr is not None}
+    # Only other backends than the default one change the key, to keep earlier cached results valid
+    if _backend_variant(article) is not None:
+        options["backend"] = _backend_variant(article)
+    key = cache.result_key(digest, options)
+    references = cache.get_references(key)
+    if references is not None:
+        article.events.emit("cache_hit", "Using cached references of {filename}", filename=article.pdffile)
+        article.references = references
+        cache.flush()
+        return references
+
+    pages_digest = ":".join([digest] + _pages_variant(article))
+    cached_pages = cache.get_pages(pages_digest)
+    # Pages of a streaming read do not cover the whole document
+    if cached_pages is not None and (streaming or cached_pages[1] == 0):
+        article.events.emit("cache_hit", "Using cached page texts of {filename}", filename=article.pdffile)
+        article.pdf, article.page_offset = cached_pages
     else:
-        article.author_year_parse()
+        with article.stage("read"):
+            article.read(streaming=streaming)
+        if article.pdf is not None:
+            cache.put_pages(pages_digest, article.pdf, article.page_offset)
 
-    article.detect_reference_style()
+    references = _run_pipeline(article, streaming)
+    cache.put_references(key, references)
+    return references
 
-    for ref in article.references:
-        article.extract_year(ref)
-        article.extract_authors(ref)
 
-    print(f"Number of detected references: {len(article.references)}")
+def _backend_variant(article):
+    """Name of the backend setting of the article for cache keys, or None for the default backend"""
+    name = article.backend if article.backend == backends.AUTO else backends.get_backend(article.backend).name
+    return None if name == backends.DEFAULT_BACKEND else name
+
+
+def _pages_variant(article):
+    """
+    Parts of the page cache key and page store name besides the pdf digest. Pages read with OCR are
+    stored separately, so that runs with and without OCR do not get each other's pages, and so are
+    pages decoded by another backend than the default one.
+    """
+    parts = ["ocr"] if article.ocr is not None else []
+    if _backend_variant(article) is not None:
+        parts.append(_backend_variant(article))
+    return parts
+
+
+def _run_pipeline(article, streaming):
+    """Runs all Extractor stages in order and returns the references. Pages that are already read are used as is."""
+    if article.pdf is None:
+        with article.stage("read"):
+            article.read(streaming=streaming)
+    with article.stage("detect_headers_footers"):
+        article.detect_headers_footers()
+    with article.stage("normalize_layout"):
+        article.normalize_layout()
+    with article.stage("detect_reference_start"):
+        article.detect_reference_start()
+    with article.stage("detect_references_layout"):
+        article.detect_references_layout()
+    with article.stage("parse"):
+        if article.references_layout == "indentation":
+            article.indentation_parse()
+        else:
+            article.author_year_parse()
+
+    with article.stage("detect_reference_style"):
+        article.detect_reference_style()
+
+    with article.stage("extract_year"):
+        for ref in article.references:
+            article.extract_year(ref)
+    with article.stage("extract_authors"):
+        for ref in article.references:
+            article.extract_authors(ref)
+    with article.stage("locate_references"):
+        article.locate_references()
+
+    # The caches are several times larger than the reference itself
     for ref in article.references:
-        print(f"- {ref}")
+        ref.clear_caches()
+    return article.references
+
+
+def _extract_result(filename, options, instrument=None, fingerprint=False):
+    """
+    Worker entry point: never raises, failures are returned in the result.
+    With fingerprint, the file is fingerprinted for the manifest before it is read, and its digest is
+    reused by the cache and page store.
+    """
+    profile = DocumentProfile(filename, **instrument) if instrument is not None else None
+    result = ExtractionResult(filename, profile=profile)
+    if fingerprint:
+        result.fingerprint = file_fingerprint(filename, options.get("digest"))
+        if result.fingerprint is not None:
+            options = dict(options, digest=result.fingerprint.digest)
+    try:
+        result.references = extract(filename, profile=profile, **options)
+    except Exception as e:
+        result.error = f"{type(e).__name__}: {e}"
+    return result
+
+
+def document_extensions(text_input=None):
+    """
+    Extensions of documents searched from directories: pdf files, and text files too when text input
+    is asked for. Text files in pdf corpora are usually readmes and logs, not pre-extracted text.
+    """
+    return (".pdf",) + tuple(TEXT_EXTENSIONS) if text_input else (".pdf",)
+
+
+def find_documents(paths, extensions=(".pdf",)):
+    """
+    Expand given files and directories (recursively) into a sorted list of document paths.
+    Directories are searched for files with given extensions, files are used as given.
+    """
+    documents = []
+    for path in paths:
+        if os.path.isdir(path):
+            found = []
+            for dirpath, _, filenames in os.walk(path):
+                for filename in filenames:
+                    if os.path.splitext(filename)[1].lower() in extensions:
+                        found.append(os.path.join(dirpath, filename))
+            documents += sorted(found)
+        else:
+            documents.append(path)
+    return documents
+
+
+def batch_extract(paths, jobs=None, instrument=None, manifest=None, retry_failed=True, fingerprint=False, **options):
+    """
+    Extract references from many documents using a pool of worker processes.
+    param1: iterable of pdf files and/or directories containing pdf files
+    param2: number of worker processes (None = number of cpus, 1 = run in this process)
+    param3: dict of DocumentProfile settings to measure every document, eg. {"track_memory": True}.
+            The measurements are in the profile attribute of each result.
+    manifest: manifest.Manifest of an earlier run. Documents it has as done and unchanged are skipped
+              (and failed ones too without retry_failed). Record the results in it once they are stored.
+    fingerprint: fingerprint every document before reading it (see ExtractionResult), as with a manifest
+    Other keyword arguments are passed to extract() for every document.
+    Yields an ExtractionResult for every document in completion order. Failing documents
+    are yielded with the error set instead of stopping the batch.
+    """
+    documents = find_documents(paths, document_extensions(options.get("text_input")))
+    if manifest is not None:
+        documents = manifest.pending(documents, retry_failed)
+        fingerprint = True
+
+    if jobs == 1:
+        for filename in documents:
+            yield _extract_result(filename, options, instrument, fingerprint)
+        return
+
+    jobs = jobs or os.cpu_count() or 1
+    max_pending = jobs * 4      # Bound the number of submitted documents to keep memory flat on large corpora
+    remaining = iter(documents)
+    executor = ProcessPoolExecutor(max_workers=jobs)
+    pending = {}
+    try:
+        while True:
+            for filename in remaining:
+                pending[executor.submit(_extract_result, filename, options, instrument, fingerprint)] = filename
+                if len(pending) >= max_pending:
+                    break
+            if not pending:
+                break
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            suspects = []
+            for future in done:
+                filename = pending.pop(future)
+                try:
+                    yield future.result()
+                except BrokenProcessPool:
+                    suspects.append(filename)
+                except Exception as e:
+                    yield ExtractionResult(filename, error=f"{type(e).__name__}: {e}")
+
+            # A crashing worker (eg. segfault in pdf decoding) breaks the whole pool and every document
+            # in flight with it. Continue with a fresh pool and run those documents once more, each in
+            # a process of its own, so that only the document that crashes again is reported as failed.
+            if suspects:
+                suspects += pending.values()
+                pending = {}
+                executor.shutdown(wait=False)
+                executor = ProcessPoolExecutor(max_workers=jobs)
+                yield from _extract_isolated(suspects, options, instrument, jobs, fingerprint)
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
+
+
+def _extract_isolated(documents, options, instrument, jobs, fingerprint=False):
+    """Extracts documents in single-process pools, up to jobs at a time, so a crash fails only its own document"""
+    for start in range(0, len(documents), jobs):
+        running = []
+        try:
+            for filename in documents[start:start + jobs]:
+                executor = ProcessPoolExecutor(max_workers=1)
+                running.append((filename, executor, executor.submit(_extract_result, filename, options, instrument,
+                                                                      fingerprint)))
+            for filename, _, future in running:
+                try:
+                    yield future.result()
+                except BrokenProcessPool as e:
+                    yield ExtractionResult(filename, error=f"Worker process died: {e}")
+                except Exception as e:
+                    yield ExtractionResult(filename, error=f"{type(e).__name__}: {e}")
+        finally:
+            for _, executor, future in running:
+                future.cancel()
+                executor.shutdown(wait=True)
+
+
+def watch_folder(paths, manifest, interval=10.0, jobs=None, instrument=None, retry_failed=False, **options):
+    """
+    Watches files and directories and extracts references from documents that arrive or change.
+    Documents that are done in the manifest are skipped, so record every yielded result in it.
+    A new file is processed only once its size and mtime stayed the same over one interval, so
+    files that are still being copied are not read half-way. Checks every interval seconds until
+    interrupted. Other arguments are as in batch_extract().
+    retry_failed: retry documents that failed before once. Unchanged documents that failed are not
+                  parsed again in later checks either way, changed ones are.
+    """
+    seen = {}
+    attempted = set()
+    while True:
+        stable = []
+        current = {}
+        for filename in find_documents(paths, document_extensions(options.get("text_input"))):
+            if manifest.is_done(filename, retry_failed and filename not in attempted):
+                continue
+            try:
+                stat = os.stat(filename)
+            except OSError:
+                continue
+            current[filename] = (stat.st_size, stat.st_mtime)
+            if seen.get(filename) == current[filename]:
+                stable.append(filename)
+        seen = current
+        if len(stable) > 0:
+            attempted.update(stable)
+            yield from batch_extract(stable, jobs=jobs, instrument=instrument, fingerprint=True, **options)
+        time.sleep(interval)
@@ -0,0 +1,78 @@
+from unicodedata import normalize
+import regex as re
+
+# Precompiled patterns shared by the parsing stages
+
+YEAR = re.compile(r"(?:19|20)\d\d")
+YEAR_WITH_SUFFIX = re.compile(r"(?:19|20)\d\d[abcdef]{0,1}")
+# Year surrounded by whitespace or punctuation, used to score potential reference section starts
+YEAR_MENTION = re.compile(r"[\s\(\.,;]((?:19|20)\d\d)[\s\)\.,;]")
+# Reference section title on a line of its own, possibly numbered, eg. "7. References"
+REFERENCE_HEADING = re.compile(r"^[ \t]*(?:\d+\.?[ \t]*)?(?:references|literature cited)[ \t]*$", re.IGNORECASE | re.MULTILINE)
+# The title words anywhere, to tell which pages can have the title in one of their columns
+REFERENCE_HEADING_WORDS = re.compile(r"references|literature cited", re.IGNORECASE)
+
+# Author name patterns are used with pattern.match(text, position), which anchors them to position
+# Matches "Author, F.N." -style:
+#AUTHOR_COMMA_INSIDE_NAME = re.compile(r"([A-ZÅÖÄØŒÆØ].{0,25}?,(?:\s*[A-ZÅÖÄØŒÆØ-]?\.*)+\s*[;,.&])")
+AUTHOR_COMMA_INSIDE_NAME = re.compile(r"(\p{Lu}.{0,25}?,(?:\s*[\p{Lu}-]?\.*)+\s*[;,.&])")
+# Matches "Author FN" -style
+#AUTHOR_NO_COMMA = re.compile(r"((?:[A-ZÖÄØŒÆ][\w-]+\s){1,3}[A-ZÖÄØŒÆ-]{1,3})[\s,.(]")
+AUTHOR_NO_COMMA = re.compile(r"((?:\p{Lu}[\w-]+\s){1,3}[\p{Lu}-]{1,3})[\s,.(]")
+AUTHOR_PATTERNS = {True: AUTHOR_COMMA_INSIDE_NAME, False: AUTHOR_NO_COMMA}
+
+# "Dutch" style lastname particles: van Buuren, de Wiet etc.
+NAME_PARTICLES = ["de", "van", "von", "deb"]
+AUTHOR_CONNECTORS = ["and", "&"]
+
+
+def prepare_author_text(text):
+    """Normalizes whitespace and capitalizes lastname particles so that author patterns match them"""
+    words = []
+    for word in text.split():
+        if word in NAME_PARTICLES:
+            words.append(word.capitalize())
+        else:
+            words.append(word)
+    return " ".join(words)
+
+
+def fold_text(text):
+    """Returns lowercase ascii-folded text (accents stripped) with whitespace collapsed, for comparisons"""
+    ascii_text = normalize("NFD", text).encode("ascii", "ignore").decode("utf8")
+    return " ".join(ascii_text.lower().split())
+
+
+def _skip_whitespace(text, position):
+    while position < len(text) and text[position].isspace():
+        position += 1
+    return position
+
+
+def _skip_connector(text, position):
+    """Moves position over whitespace and an "and" or "&" word between two authors"""
+    position = _skip_whitespace(text, position)
+    for connector in AUTHOR_CONNECTORS:
+        end = position + len(connector)
+        if text.startswith(connector, position) and (end == len(text) or text[end].isspace()):
+            return _skip_whitespace(text, end)
+    return position
+
+
+def iter_author_matches(text, comma_inside_name):
+    """Yields consecutive author name matches from the start of prepared author text"""
+    author_matcher = AUTHOR_PATTERNS[comma_inside_name]
+    position = 0
+    while True:
+        author_match = author_matcher.match(text, position)
+        if author_match is None:
+            return
+        yield author_match
+        position = _skip_connector(text, author_match.end())
+
+
+def count_authors(text, comma_inside_name):
+    number_of_authors = 0
+    for _ in iter_author_matches(text, comma_inside_name):
+        number_of_authors += 1
+    return number_of_authors
@@ -1,27 +1,240 @@
+import hashlib
+import json
+import os
 import os.path
+import shutil
 import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from .backends import PdfReader, PdfReadError
+from .cache import file_digest
+from .events import NULL_SINK
 
-# Create images from PDF file
-# NOTE: Currently does not yield satisfactory results and this is not used by the parser.Extractor
+# OCR of scanned pdf pages with Ghostscript (gs) and tesseract.
+# Only pages without a text layer are OCRd. Every page is rendered and recognized in a temporary
+# directory of its own, so pages and concurrent scans never share files. Pages run in parallel in
+# threads, each waiting for its own gs and tesseract processes. With a cache.ResultCache, the text
+# of every page is stored as soon as it is recognized, keyed by a hash of the page contents, so an
+# interrupted document continues from the pages that are not done yet.
 
-def pdf2images(pdfimage):
+# Pages with fewer non-whitespace characters than this are treated as having no text layer
+MIN_PAGE_CHARS = 20
+OCR_TOOLS = ["gs", "tesseract"]
+# Errors of reading the objects of one page. Streams are hashed undecoded, but a broken page can still
+# fail on its objects, and PyPDF2 raises NotImplementedError for filters it does not support.
+PAGE_READ_ERRORS = (PdfReadError, NotImplementedError, KeyError, ValueError)
+
+
+def is_textless(page, min_chars=MIN_PAGE_CHARS):
+    return len("".join(page.split())) < min_chars
+
+
+def textless_pages(pages, min_chars=MIN_PAGE_CHARS):
+    """Returns numbers (counting from zero) of the pages without a text layer"""
+    return [page_nr for page_nr, page in enumerate(pages) if is_textless(page, min_chars)]
+
+
+def tools_available():
+    return all(shutil.which(tool) is not None for tool in OCR_TOOLS)
+
+
+def page_digests(pdffile, page_numbers, events=NULL_SINK):
+    """
+    Returns sha256 hex digests of pages: their raw content streams and the raw data of the images
+    they draw. Streams are not decoded, so pages in any encoding (such as JBIG2 scans) get a digest.
+    Equal scans in different files get the same digest. If the pdf cannot be read that way, the
+    digests are of the file contents and page number instead. Pages whose objects cannot be read
+    get no digest.
+    """
+    digests = {}
+    try:
+        with open(pdffile, "rb") as infile:
+            pdf = PdfReader(infile, strict=False)
+            for page_nr in page_numbers:
+                try:
+                    digests[page_nr] = _page_digest(pdf.pages[page_nr])
+                except PAGE_READ_ERRORS as e:
+                    events.emit("error", "Cannot hash page {page} of {filename}, its OCR text is not cached: "
+                                         "{error}", page=page_nr, filename=pdffile, error=e)
+        return digests
+    except PdfReadError as e:
+        events.emit("error", "Cannot read the pages of {filename}, OCR texts are cached by file digest: {error}",
+                    filename=pdffile, error=e)
+        digest = file_digest(pdffile)
+        return {page_nr: hashlib.sha256(f"{digest}:{page_nr}".encode("utf8")).hexdigest() for page_nr in page_numbers}
+
+
+def _page_digest(page):
+    digest = hashlib.sha256()
+    if "/Contents" in page:
+        digest.update(_raw_data(page["/Contents"]))
+    xobjects = page["/Resources"].get_object().get("/XObject", {}) if "/Resources" in page else {}
+    for name in sorted(xobjects):
+        digest.update(_raw_data(xobjects[name]))
+    return digest.hexdigest()
+
+
+def _raw_data(stream):
+    """Undecoded bytes of a stream, or of all streams of an array (contents can be split into several)"""
+    stream = stream.get_object()
+    if isinstance(stream, list):
+        return b"".join(_raw_data(item) for item in stream)
+    data = stream._data
+    return data.encode("latin-1") if isinstance(data, str) else data or b""
+
+
+def render_page(pdffile, page_nr, directory, dpi=300):
+    """Renders one page (counting from zero) into a grayscale png in directory and returns its path"""
+    image = os.path.join(directory, f"page_{page_nr}.png")
+    subprocess.run(["gs", "-q", "-dNOPAUSE", "-dBATCH", "-dSAFER", "-sDEVICE=pnggray", f"-r{dpi}",
+                    f"-dFirstPage={page_nr + 1}", f"-dLastPage={page_nr + 1}", f"-sOutputFile={image}", pdffile],
+                   check=True, capture_output=True)
+    return image
+
+
+def _tesseract(image, output, language, timeout=None, extra=()):
+    # Parallelism comes from running pages side by side, so every tesseract is kept on one thread
+    environment = dict(os.environ, OMP_THREAD_LIMIT="1")
+    return subprocess.run(["tesseract", image, output, "-l", language, "-c", "preserve_interword_spaces=1", *extra],
+                          check=True, capture_output=True, timeout=timeout, env=environment)
+
+
+def ocr_page(pdffile, page_nr, language="eng", dpi=300, timeout=None):
+    """Returns the text of one page (counting from zero) recognized by tesseract"""
+    with tempfile.TemporaryDirectory(prefix="artparse-ocr-") as directory:
+        image = render_page(pdffile, page_nr, directory, dpi)
+        result = _tesseract(image, "stdout", language, timeout)
+    return result.stdout.decode("utf8", errors="replace")
+
+
+class OcrEngine(object):
+    """
+    OCRs pages without text in parallel.
+    jobs: number of pages recognized at the same time (None = number of cpus)
+    cache: cache.ResultCache for recognized page texts
+    timeout: seconds allowed for tesseract on one page
+    Pages that fail to OCR keep their original text, and the errors are collected in self.errors.
+    The engine can be passed to worker processes.
+    """
+    def __init__(self, jobs=None, language="eng", dpi=300, cache=None, min_chars=MIN_PAGE_CHARS, timeout=None):
+        self.jobs = jobs or os.cpu_count() or 1
+        self.language = language
+        self.dpi = dpi
+        self.cache = cache
+        self.min_chars = min_chars
+        self.timeout = timeout
+        self.pages_ocrd = 0
+        self.cache_hits = 0
+        self.errors = []
+
+    def available(self):
+        return tools_available()
+
+    def ocr_pages(self, pdffile, page_numbers, events=NULL_SINK):
+        """
+        Returns {page_nr: text} of the given pages. Cached pages are not OCRd again.
+        Problems of reading the pages for their cache keys are reported to events.
+        """
+        texts = {}
+        keys = {}
+        if self.cache is not None and len(page_numbers) > 0:
+            settings = json.dumps({"language": self.language, "dpi": self.dpi}, sort_keys=True)
+            for page_nr, digest in page_digests(pdffile, page_numbers, events).items():
+                keys[page_nr] = hashlib.sha256(f"{digest}:{settings}".encode("utf8")).hexdigest()
+                text = self.cache.get_ocr_text(keys[page_nr])
+                if text is not None:
+                    texts[page_nr] = text
+                    self.cache_hits += 1
+
+        missing = [page_nr for page_nr in page_numbers if page_nr not in texts]
+        if len(missing) == 0:
+            return texts
+        with ThreadPoolExecutor(max_workers=min(self.jobs, len(missing))) as executor:
+            futures = {executor.submit(ocr_page, pdffile, page_nr, self.language, self.dpi, self.timeout): page_nr
+                       for page_nr in missing}
+            for future in as_completed(futures):
+                page_nr = futures[future]
+                try:
+                    texts[page_nr] = future.result()
+                except (subprocess.SubprocessError, OSError) as e:
+                    self.errors.append((pdffile, page_nr, str(e)))
+                    continue
+                self.pages_ocrd += 1
+                # Stored right away (in this thread, which owns the cache connection) to resume from here
+                if page_nr in keys:
+                    self.cache.put_ocr_text(keys[page_nr], texts[page_nr])
+        return texts
+
+    def fill_pages(self, pdffile, pages, events=NULL_SINK):
+        """Returns a list of page texts where pages without text are replaced by their OCR text"""
+        pages = [page for page in pages]
+        for page_nr, text in self.ocr_pages(pdffile, textless_pages(pages, self.min_chars), events).items():
+            pages[page_nr] = text
+        return pages
+
+
+class OcrPages(object):
+    """
+    Page sequence that OCRs pages without text when they are accessed, for reading a document
+    partially. Streaming reads pages from the last one backwards, so a textless page is OCRd
+    together with up to jobs - 1 textless pages before it.
+    """
+    def __init__(self, engine, pdffile, pages, events=NULL_SINK):
+        self.engine = engine
+        self.pdffile = pdffile
+        self.pages = pages
+        self.events = events
+        self._texts = {}
+
+    def __len__(self):
+        return len(self.pages)
+
+    def __getitem__(self, page_nr):
+        if page_nr < 0:
+            page_nr += len(self.pages)
+        if page_nr in self._texts:
+            return self._texts[page_nr]
+        page = self.pages[page_nr]
+        if not is_textless(page, self.engine.min_chars):
+            return page
+
+        batch = [page_nr]
+        for previous in range(page_nr - 1, -1, -1):
+            if len(batch) >= self.engine.jobs:
+                break
+            if previous not in self._texts and is_textless(self.pages[previous], self.engine.min_chars):
+                batch.append(previous)
+        texts = self.engine.ocr_pages(self.pdffile, batch, self.events)
+        for nr in batch:
+            self._texts[nr] = texts.get(nr, self.pages[nr])
+        return self._texts[page_nr]
+
+    def __iter__(self):
+        for page_nr in range(len(self)):
+            yield self[page_nr]
+
+
+# Create a searchable pdf of a scanned pdf
+# NOTE: The parser does not use this, it OCRs pages with OcrEngine and reads the text directly
+
+def pdf2images(pdfimage, directory):
+    """Converts every page of pdfimage into tiff images scan_<page>.tif in directory"""
     print("Converting image pdf to tiff-images")
-    convertoutput = subprocess.run(["gs", "-dNOPAUSE", "-dBATCH", "-sDEVICE=tiffg4", r"-sOutputFile=tmp/scan_%d.tif", pdfimage])
+    convertoutput = subprocess.run(["gs", "-dNOPAUSE", "-dBATCH", "-sDEVICE=tiffg4",
+                                    "-sOutputFile=" + os.path.join(directory, "scan_%d.tif"), pdfimage])
     if convertoutput.returncode == 0:
         print("Successfully converted pdf to images.")
     else:
         print("No images created")
 
-def scan(pdfimage, number_of_pages):
-
-    pdf2images(pdfimage)
-
-    for page in range(1, number_of_pages +1):
-        subprocess.run(["tesseract", f"tmp/scan_{page}.tif", f"tmp/scan_{page}", "pdf"])
+def scan(pdfimage, number_of_pages, jobs=None, language="eng"):
+    """Writes a searchable copy of pdfimage next to it, named <name>-ocr.pdf. Pages are OCRd in parallel."""
+    with tempfile.TemporaryDirectory(prefix="artparse-scan-") as directory:
+        pdf2images(pdfimage, directory)
+        page_names = [os.path.join(directory, f"scan_{nr}") for nr in range(1, number_of_pages + 1)]
+        with ThreadPoolExecutor(max_workers=jobs or os.cpu_count() or 1) as executor:
+            list(executor.map(lambda name: _tesseract(name + ".tif", name, language, extra=["pdf"]), page_names))
 
-    page_names = ["tmp/scan_" + str(nr) + ".pdf" for nr in range(1, number_of_pages +1)]
-    
-    file_body, file_extension = os.path.splitext(pdfimage)
-    output_filename = file_body + "-ocr" + file_extension
-    subprocess.run(["pdfunite", *page_names, output_filename])
-    subprocess.run(["rm", "tmp/scan*"])
+        file_body, file_extension = os.path.splitext(pdfimage)
+        output_filename = file_body + "-ocr" + file_extension
+        subprocess.run(["pdfunite", *[name + ".pdf" for name in page_names], output_filename])
@@ -0,0 +1,199 @@
+import sys
+from array import array
+from bisect import bisect_right
+from .reference import Reference, ReferenceFeatures
+
+# Columnar storage of many references. Instead of one object per reference and author:
+#   rawtexts are offsets into a shared text buffer. Texts appended since the last read are joined
+#   into a new chunk of the buffer when a rawtext is read, so building and reading stay linear.
+#   years, locations and spans are integer arrays, MISSING (-1) standing for None
+#   authors are interned: every distinct author is stored once and references keep author ids
+# Indexing the batch returns a ReferenceView with the attribute API of Reference.
+
+MISSING = -1
+INTEGER_FIELDS = ["year"] + Reference.LOCATION_FIELDS + Reference.SPAN_FIELDS
+
+
+class ReferenceBatch(object):
+    """
+    Append-only columnar collection of references.
+    Authors with equal names share one Author object, which views return as is, so treat
+    authors of views as read-only.
+    """
+    def __init__(self, references=None):
+        self._chunks = []
+        self._chunk_starts = array("q")
+        self._pending_text = []
+        self._text_length = 0
+        self._text_starts = array("q")
+        self._text_ends = array("q")
+        self._columns = {field: array("q") for field in INTEGER_FIELDS}
+        self._author_starts = array("q", [0])
+        self._author_ids = array("q")
+        self.authors = []
+        self._author_lookup = {}
+        self._strings = []
+        self._string_lookup = {}
+        self._pdffiles = array("q")
+        # title and reference_style are rarely set, so they are kept only for the references that have them
+        self._titles = {}
+        self._reference_styles = {}
+        if references is not None:
+            self.extend(references)
+
+    def __len__(self):
+        return len(self._text_starts)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [ReferenceView(self, i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("reference index out of range")
+        return ReferenceView(self, index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield ReferenceView(self, index)
+
+    def append(self, ref):
+        """Adds a Reference (or anything with the same attributes) and returns its index"""
+        index = len(self)
+        rawtext = ref.rawtext
+        self._pending_text.append(rawtext)
+        self._text_starts.append(self._text_length)
+        self._text_length += len(rawtext)
+        self._text_ends.append(self._text_length)
+
+        for field in INTEGER_FIELDS:
+            value = getattr(ref, field)
+            self._columns[field].append(value if isinstance(value, int) else MISSING)
+
+        for aut in ref.authors:
+            self._author_ids.append(self._intern_author(aut))
+        self._author_starts.append(len(self._author_ids))
+
+        self._pdffiles.append(self._intern_string(ref.pdffile or ""))
+        if ref.title:
+            self._titles[index] = ref.title
+        if ref.reference_style is not None:
+            self._reference_styles[index] = ref.reference_style
+        return index
+
+    def extend(self, references):
+        for ref in references:
+            self.append(ref)
+
+    def reference(self, index):
+        """Returns a full Reference object of the reference in index"""
+        return Reference.from_dict(self[index].to_dict())
+
+    def memory_usage(self):
+        """Approximate bytes used by the columns and the text buffer, excluding interned authors"""
+        arrays = [self._text_starts, self._text_ends, self._author_starts, self._author_ids, self._pdffiles,
+                  self._chunk_starts]
+        arrays += list(self._columns.values())
+        texts = self._chunks + self._pending_text
+        return sum(column.itemsize * len(column) for column in arrays) + sum(sys.getsizeof(text) for text in texts)
+
+    def text(self):
+        """The shared text buffer of all rawtexts, joined into one chunk"""
+        self._join_pending()
+        if len(self._chunks) > 1:
+            self._chunks = ["".join(self._chunks)]
+            self._chunk_starts = array("q", [0])
+        return self._chunks[0] if self._chunks else ""
+
+    def rawtext(self, index):
+        """The rawtext of the reference in index"""
+        self._join_pending()
+        start, end = self._text_starts[index], self._text_ends[index]
+        chunk_nr = bisect_right(self._chunk_starts, start) - 1
+        if chunk_nr < 0:
+            return ""
+        chunk_start = self._chunk_starts[chunk_nr]
+        return self._chunks[chunk_nr][start - chunk_start:end - chunk_start]
+
+    def _join_pending(self):
+        if self._pending_text:
+            self._chunk_starts.append(self._text_length - sum(len(text) for text in self._pending_text))
+            self._chunks.append("".join(self._pending_text))
+            self._pending_text = []
+
+    def _intern_author(self, aut):
+        key = (aut.firstname, aut.lastname, aut.non_person_author)
+        author_id = self._author_lookup.get(key)
+        if author_id is None:
+            author_id = len(self.authors)
+            self.authors.append(aut)
+            self._author_lookup[key] = author_id
+        return author_id
+
+    def _intern_string(self, text):
+        string_id = self._string_lookup.get(text)
+        if string_id is None:
+            string_id = len(self._strings)
+            self._strings.append(text)
+            self._string_lookup[text] = string_id
+        return string_id
+
+
+def _integer_column(field):
+    def get(view):
+        value = view._batch._columns[field][view._index]
+        return None if value == MISSING else value
+
+    def set(view, value):
+        view._batch._columns[field][view._index] = value if isinstance(value, int) else MISSING
+
+    return property(get, set)
+
+
+class ReferenceView(object):
+    """
+    One reference of a ReferenceBatch with the attribute API of Reference.
+    Year, location and span fields can be assigned, the other fields are read-only.
+    """
+    __slots__ = ["_batch", "_index"]
+
+    FIELDS = Reference.FIELDS
+    to_dict = Reference.to_dict
+    get_normalized_authors = Reference.get_normalized_authors
+    __len__ = Reference.__len__
+    __str__ = Reference.__str__
+
+    def __init__(self, batch, index):
+        self._batch = batch
+        self._index = index
+
+    @property
+    def rawtext(self):
+        return self._batch.rawtext(self._index)
+
+    @property
+    def features(self):
+        """ReferenceFeatures of the rawtext. Views are not cached, so keep the result if it is needed repeatedly."""
+        return ReferenceFeatures(self.rawtext)
+
+    @property
+    def authors(self):
+        batch = self._batch
+        author_ids = batch._author_ids[batch._author_starts[self._index]:batch._author_starts[self._index + 1]]
+        return [batch.authors[author_id] for author_id in author_ids]
+
+    @property
+    def pdffile(self):
+        return self._batch._strings[self._batch._pdffiles[self._index]]
+
+    @property
+    def title(self):
+        return self._batch._titles.get(self._index, "")
+
+    @property
+    def reference_style(self):
+        return self._batch._reference_styles.get(self._index)
+
+
+for _field in INTEGER_FIELDS:
+    setattr(ReferenceView, _field, _integer_column(_field))
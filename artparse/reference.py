@@ -1,15 +1,110 @@
+from collections import namedtuple
 from difflib import SequenceMatcher
 from unicodedata import normalize, name
 import sys
+import regex as re
+from . import patterns
+from .author import Author
+
+# Span of a year number in reference text. end is after the four digits, suffix_end after a possible "a"-"f" suffix
+YearSpan = namedtuple("YearSpan", ["start", "end", "suffix_end"])
+
+CAPITALIZED_TOKEN = re.compile(r"\p{Lu}[\w'-]*")
+PUNCTUATION = ".,;:()[]&"
+PUNCTUATION_CHARACTER = re.compile("[" + re.escape(PUNCTUATION) + "]")
+
+
+class ReferenceFeatures(object):
+    """
+    Token level features of reference text, computed lazily on first use.
+    Reference discards its features whenever rawtext changes, so stages can rely on them.
+    """
+    __slots__ = ["text", "_years", "_punctuation", "_capitalized_tokens", "_normalized_text", "_author_texts",
+                 "_authors"]
+
+    def __init__(self, text):
+        self.text = text
+        self._years = None
+        self._punctuation = None
+        self._capitalized_tokens = None
+        self._normalized_text = None
+        self._author_texts = {}
+        self._authors = {}
+
+    @property
+    def years(self):
+        """List of YearSpans of all year numbers"""
+        if self._years is None:
+            self._years = [YearSpan(match.start(), match.start() + 4, match.end())
+                           for match in patterns.YEAR_WITH_SUFFIX.finditer(self.text)]
+        return self._years
+
+    @property
+    def punctuation(self):
+        """
+        Dictionary of punctuation character -> list of offsets.
+        To only count a character, use str.count on the text instead.
+        """
+        if self._punctuation is None:
+            self._punctuation = {char: [] for char in PUNCTUATION}
+            for match in PUNCTUATION_CHARACTER.finditer(self.text):
+                self._punctuation[match.group()].append(match.start())
+        return self._punctuation
+
+    @property
+    def capitalized_tokens(self):
+        """List of (start, end) spans of tokens starting with a capital letter"""
+        if self._capitalized_tokens is None:
+            self._capitalized_tokens = [match.span() for match in CAPITALIZED_TOKEN.finditer(self.text)]
+        return self._capitalized_tokens
+
+    @property
+    def normalized_text(self):
+        """Lowercase ascii-folded text with whitespace collapsed, for comparisons between references"""
+        if self._normalized_text is None:
+            self._normalized_text = patterns.fold_text(self.text)
+        return self._normalized_text
+
+    def author_text(self, end=None):
+        """Text before end prepared for author patterns"""
+        if end not in self._author_texts:
+            self._author_texts[end] = patterns.prepare_author_text(self.text[:end])
+        return self._author_texts[end]
+
+    def authors(self, end, comma_inside_name):
+        """List of author name matches in author text before end, using the given name style"""
+        key = (end, comma_inside_name)
+        if key not in self._authors:
+            self._authors[key] = [match.group() for match in
+                                  patterns.iter_author_matches(self.author_text(end), comma_inside_name)]
+        return self._authors[key]
+
 
 class Reference(object):
+    # Character offsets of reference parts in rawtext, None when not detected
+    SPAN_FIELDS = ["span_authors_start", "span_authors_end", "span_title_start", "span_title_end",
+                   "span_year_start", "span_year_end", "span_journal_start", "span_journal_end"]
+    # Page and line (counting from zero) where the reference starts in the processed page texts
+    LOCATION_FIELDS = ["page", "line"]
+    # Attributes stored by to_dict, besides rawtext and authors
+    FIELDS = ["reference_style", "title", "pdffile", "year"] + LOCATION_FIELDS + SPAN_FIELDS
+
+    # Millions of references are kept in memory in large batches, so no per-instance __dict__
+    __slots__ = ["_rawtext", "_features", "reference_style", "title", "authors", "_author_keys", "_keyed_authors",
+                 "pdffile", "year"] + LOCATION_FIELDS + SPAN_FIELDS
+
     def __init__(self, rawtext="", reference_style=None):
         self.rawtext = rawtext
         self.reference_style = reference_style
         self.title = ""
         self.authors = []
+        # Keys of the first _keyed_authors authors, built by the first add_author
+        self._author_keys = None
+        self._keyed_authors = 0
         self.pdffile = ""
         self.year = None
+        self.page = None
+        self.line = None
         self.span_authors_start = 0
         self.span_authors_end = None
         self.span_title_start = None
@@ -19,6 +114,44 @@ class Reference(object):
         self.span_journal_start = None
         self.span_journal_end = None
 
+    @property
+    def rawtext(self):
+        return self._rawtext
+
+    @rawtext.setter
+    def rawtext(self, text):
+        self._rawtext = text
+        self._features = None
+
+    @property
+    def features(self):
+        """Cached ReferenceFeatures of the current rawtext"""
+        if self._features is None:
+            self._features = ReferenceFeatures(self._rawtext)
+        return self._features
+
+    def clear_caches(self):
+        """Drops the cached features and author keys, which are built again when needed"""
+        self._features = None
+        self._author_keys = None
+        self._keyed_authors = 0
+
+    def to_dict(self):
+        """Returns the reference as a dictionary of plain values (for JSON etc.)"""
+        values = {"rawtext": self.rawtext, "authors": [aut.to_dict() for aut in self.authors]}
+        for field in self.FIELDS:
+            values[field] = getattr(self, field)
+        return values
+
+    @classmethod
+    def from_dict(cls, values):
+        ref = cls(values["rawtext"])
+        ref.authors = [Author.from_dict(aut) for aut in values.get("authors", [])]
+        for field in cls.FIELDS:
+            if field in values:
+                setattr(ref, field, values[field])
+        return ref
+
     def __len__(self):
         return len(self.rawtext)
     
@@ -27,8 +160,17 @@ class Reference(object):
 
     def add_author(self, author):
         """ Add author to list of authors for this reference. If author (name matching) already exists, return -1"""
-        if str(author) not in [str(a) for a in self.authors]:
+        # Authors may also be appended to the list directly, so the keys of those are added when it falls behind
+        if self._author_keys is None or self._keyed_authors > len(self.authors):
+            self._author_keys = set()
+            self._keyed_authors = 0
+        self._author_keys.update(aut.key() for aut in self.authors[self._keyed_authors:])
+        self._keyed_authors = len(self.authors)
+        key = author.key()
+        if key not in self._author_keys:
             self.authors.append(author)
+            self._author_keys.add(key)
+            self._keyed_authors += 1
         else:
             print("This author already exists in authors for this reference")
             return -1   ## TODO: Convert this to custom Exception
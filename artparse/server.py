@@ -0,0 +1,356 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from urllib.parse import urlsplit, parse_qs
+from .parsecontrol import extract, extract_text
+
+# HTTP service for extracting references. Usage: python -m artparse.server --port 8080
+#   POST /extract   body is a pdf file or text (pdftotext output), returns the references as JSON.
+#                   Query parameters: streaming=1 to read only the last pages, text=1 to read body as text.
+#                   The body is read as text with a text/* Content-Type and as pdf with application/pdf.
+#                   Without either, a body starting with %PDF is a pdf and one in UTF-8 is text.
+#                   Other bodies are rejected with 415.
+#   GET /metrics    queue depth, counters and latency percentiles as JSON
+#   GET /health     {"status": "ok"}
+# Requests are parsed in a pool of warm worker processes. When max_queue requests are already
+# waiting for a worker, new requests are rejected with 503. Requests that take longer than
+# timeout seconds get 504. Clients that do not send the request head and body within read_timeout
+# seconds get 408.
+
+MAX_HEADER_LINES = 100
+LATENCY_WINDOW = 1000
+
+STATUS_TEXTS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+                408: "Request Timeout", 411: "Length Required", 413: "Payload Too Large", 415: "Unsupported Media Type",
+                422: "Unprocessable Entity", 500: "Internal Server Error", 503: "Service Unavailable",
+                504: "Gateway Timeout"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _warm_up():
+    """Run once in every worker so that processes are started and modules imported before requests"""
+    return os.getpid()
+
+
+def _pool_context():
+    """
+    Workers are started by a fork server, which is started with the first pool before the server accepts
+    connections. Workers forked from the server process would inherit the sockets of open connections and
+    keep them open after the server closes them, when a broken pool is replaced.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context()
+
+
+def _extract_document(data, is_text, options):
+    """Worker entry point: returns references of a pdf (bytes) or text (str) as dictionaries"""
+    if is_text:
+        references = extract_text(data, **options)
+    else:
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as pdf_file:
+            pdf_file.write(data)
+        try:
+            references = extract(pdf_file.name, **options)
+        finally:
+            os.remove(pdf_file.name)
+    return [ref.to_dict() for ref in references]
+
+
+class ServerMetrics(object):
+    """Counters and latencies of the server. Latency percentiles are over the latest requests."""
+    def __init__(self, window=LATENCY_WINDOW):
+        self.requests = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.queued = 0
+        self.running = 0
+        self.latencies = deque(maxlen=window)
+        self.queue_waits = deque(maxlen=window)
+
+    def to_dict(self, workers, max_queue):
+        return {"workers": workers, "max_queue": max_queue, "queue_depth": self.queued, "running": self.running,
+                "requests": self.requests, "completed": self.completed, "failed": self.failed,
+                "rejected": self.rejected, "timeouts": self.timeouts,
+                "latency": _percentiles(self.latencies), "queue_wait": _percentiles(self.queue_waits)}
+
+
+def _body_is_text(content_type, body):
+    """Whether a request body is text (True) or a pdf (False). Raises HTTPError for other bodies."""
+    media_type = content_type.partition(";")[0].strip().lower()
+    if media_type.startswith("text/"):
+        return True
+    if media_type == "application/pdf":
+        return False
+    if media_type not in ("", "application/octet-stream"):
+        raise HTTPError(415, f"Unsupported Content-Type {media_type}, send application/pdf or text/plain")
+    if body.startswith(b"%PDF"):
+        return False
+    try:
+        body.decode("utf8")
+    except UnicodeDecodeError:
+        raise HTTPError(415, "Body is neither a pdf nor UTF-8 text")
+    if b"\0" in body:
+        raise HTTPError(415, "Body is neither a pdf nor UTF-8 text")
+    return True
+
+
+def _percentiles(values):
+    if len(values) == 0:
+        return {"count": 0}
+    ordered = sorted(values)
+    def percentile(p):
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+    return {"count": len(ordered), "mean": sum(ordered) / len(ordered), "p50": percentile(50),
+            "p95": percentile(95), "p99": percentile(99), "max": ordered[-1]}
+
+
+class ExtractionServer(object):
+    """
+    Asyncio HTTP server with a pool of extraction worker processes.
+    jobs: number of worker processes (None = number of cpus)
+    max_queue: number of requests allowed to wait for a free worker
+    timeout: seconds a request may wait and run before it is answered with 504
+    max_body: largest accepted request body in bytes
+    read_timeout: seconds a client may take to send the request head, and then the body
+    Use port 0 to bind to a free port; the bound port is in self.port after start().
+    """
+    def __init__(self, host="127.0.0.1", port=8080, jobs=None, max_queue=32, timeout=60.0,
+                 max_body=100 * 1024 * 1024, read_timeout=30.0):
+        self.host = host
+        self.port = port
+        self.jobs = jobs or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.max_body = max_body
+        self.read_timeout = read_timeout
+        self.metrics = ServerMetrics()
+        self._executor = None
+        self._server = None
+        self._slots = None
+        self._pool_lock = None
+
+    async def start(self):
+        self._slots = asyncio.Semaphore(self.jobs)
+        self._pool_lock = asyncio.Lock()
+        self._executor = await self._start_pool()
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            try:
+                method, target, headers = await self._read_request(self._read_head(reader))
+                status, response = await self._route(method, target, headers, reader)
+            except HTTPError as e:
+                status, response = e.status, {"error": e.message}
+            await self._respond(writer, status, response)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, read):
+        """Await a read of the request, a client that sends nothing must not hold the connection forever"""
+        try:
+            return await asyncio.wait_for(read, self.read_timeout)
+        except asyncio.TimeoutError:
+            raise HTTPError(408, f"Request was not received in {self.read_timeout} seconds")
+
+    async def _read_head(self, reader):
+        request_line = (await reader.readline()).decode("latin-1").strip()
+        parts = request_line.split()
+        if len(parts) != 3:
+            raise HTTPError(400, "Malformed request line")
+        headers = {}
+        for _ in range(MAX_HEADER_LINES):
+            line = (await reader.readline()).decode("latin-1")
+            if line in ("\r\n", "\n", ""):
+                return parts[0].upper(), parts[1], headers
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        raise HTTPError(400, "Too many headers")
+
+    async def _route(self, method, target, headers, reader):
+        url = urlsplit(target)
+        if url.path == "/health":
+            return 200, {"status": "ok"}
+        elif url.path == "/metrics":
+            return 200, self.metrics.to_dict(self.jobs, self.max_queue)
+        elif url.path != "/extract":
+            raise HTTPError(404, f"Unknown path {url.path}")
+        if method != "POST":
+            raise HTTPError(405, "Use POST to extract references")
+
+        if "content-length" not in headers:
+            raise HTTPError(411, "Content-Length is required")
+        try:
+            length = int(headers["content-length"])
+        except ValueError:
+            raise HTTPError(400, "Invalid Content-Length")
+        if length < 0:
+            raise HTTPError(400, "Invalid Content-Length")
+        if length > self.max_body:
+            raise HTTPError(413, f"Request body is larger than {self.max_body} bytes")
+        body = await self._read_request(reader.readexactly(length))
+
+        query = parse_qs(url.query)
+        options = {"streaming": query.get("streaming", ["0"])[0] in ("1", "true")}
+        is_text = query.get("text", ["0"])[0] in ("1", "true") or _body_is_text(headers.get("content-type", ""), body)
+        data = body.decode("utf8", errors="replace") if is_text else body
+        return await self._extract(data, is_text, options)
+
+    async def _extract(self, data, is_text, options):
+        metrics = self.metrics
+        metrics.requests += 1
+        if metrics.queued >= self.max_queue:
+            metrics.rejected += 1
+            raise HTTPError(503, "Too many requests waiting, try again later")
+
+        started = time.perf_counter()
+        try:
+            references = await asyncio.wait_for(self._run_in_worker(started, data, is_text, options), self.timeout)
+        except asyncio.TimeoutError:
+            metrics.timeouts += 1
+            raise HTTPError(504, f"Extraction did not finish in {self.timeout} seconds")
+        except BrokenProcessPool:
+            metrics.failed += 1
+            raise HTTPError(500, "Worker process died")
+        except Exception as e:
+            metrics.failed += 1
+            raise HTTPError(422, f"{type(e).__name__}: {e}")
+
+        elapsed = time.perf_counter() - started
+        metrics.completed += 1
+        metrics.latencies.append(elapsed)
+        return 200, {"references": references, "elapsed": elapsed}
+
+    async def _run_in_worker(self, started, *args):
+        """
+        Waits for a free worker and runs the extraction there. The worker slot is released only
+        when the worker is really done, even if the request itself timed out before that.
+        A request that finds the pool broken waits for the new pool and runs there.
+        """
+        loop = asyncio.get_running_loop()
+        self.metrics.queued += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.metrics.queued -= 1
+        self.metrics.queue_waits.append(time.perf_counter() - started)
+        self.metrics.running += 1
+
+        def release(_):
+            loop.call_soon_threadsafe(self._release_slot)
+        executor = self._executor
+        try:
+            try:
+                future = executor.submit(_extract_document, *args)
+            except BrokenProcessPool:
+                executor = await asyncio.shield(self._replace_pool(executor))
+                future = executor.submit(_extract_document, *args)
+        except Exception:
+            self._release_slot()
+            raise
+        future.add_done_callback(release)
+        try:
+            return await asyncio.wrap_future(future)
+        except BrokenProcessPool:
+            # Let the failing request wait for the new pool, so that requests arriving meanwhile find it
+            await asyncio.shield(self._replace_pool(executor))
+            raise
+
+    def _release_slot(self):
+        self.metrics.running -= 1
+        self._slots.release()
+
+    async def _start_pool(self):
+        """Returns a new worker pool whose processes are started and have imported the parser"""
+        executor = ProcessPoolExecutor(max_workers=self.jobs, mp_context=_pool_context())
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(executor, _warm_up) for _ in range(self.jobs)))
+        return executor
+
+    async def _replace_pool(self, broken):
+        """
+        A crashed worker breaks the whole pool: replace it so that later requests succeed. Every request
+        running in the broken pool fails and asks for a new pool, but only the first one replaces it.
+        Returns the pool to use.
+        """
+        async with self._pool_lock:
+            if self._executor is broken:
+                self._executor = await self._start_pool()
+                broken.shutdown(wait=False)
+            return self._executor
+
+    async def _respond(self, writer, status, response):
+        body = json.dumps(response).encode("utf8")
+        head = (f"HTTP/1.1 {status} {STATUS_TEXTS.get(status, '')}\r\n"
+                f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\nConnection: close\r\n")
+        if status == 503:
+            head += "Retry-After: 1\r\n"
+        writer.write(head.encode("latin-1") + b"\r\n" + body)
+        await writer.drain()
+
+
+def run_server(host="127.0.0.1", port=8080, **settings):
+    """Runs ExtractionServer until interrupted"""
+    server = ExtractionServer(host, port, **settings)
+
+    async def main():
+        await server.start()
+        print(f"Serving on http://{server.host}:{server.port} with {server.jobs} workers")
+        try:
+            await server.serve_forever()
+        finally:
+            await server.close()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser(prog="server.py", description="HTTP service for extracting references")
+    argparser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    argparser.add_argument("--port", type=int, default=8080, help="port to listen on")
+    argparser.add_argument("--jobs", "-j", type=int, default=None, help="number of worker processes")
+    argparser.add_argument("--max-queue", type=int, default=32,
+                           help="number of requests that can wait for a worker before rejecting with 503")
+    argparser.add_argument("--timeout", type=float, default=60.0, help="seconds before a request fails with 504")
+    argparser.add_argument("--read-timeout", type=float, default=30.0,
+                           help="seconds a client may take to send a request before it fails with 408")
+    args = argparser.parse_args()
+    run_server(args.host, args.port, jobs=args.jobs, max_queue=args.max_queue, timeout=args.timeout,
+               read_timeout=args.read_timeout)
@@ -0,0 +1,173 @@
+import random
+import textwrap
+
+# Generator of synthetic article page text with known references, used by the benchmark.
+# Pages look like pdftotext layout output: fixed width rows, optional headers, footers and two columns.
+
+REFERENCE_STYLES = ["apa", "iso690", "indented", "numbered"]
+
+LASTNAMES = ["Smith", "Jones", "Virtanen", "Korhonen", "Nieminen", "Müller", "Schmidt", "Öberg", "Larsen",
+             "Dubois", "Moreau", "Rossi", "Bianchi", "García", "Martínez", "Novak", "Kowalski", "Tanaka",
+             "Nakamura", "Chen", "Wang", "Okafor", "Mensah", "Brown", "Taylor", "Wilson", "Anderson",
+             "Lee-Park", "Hämäläinen", "Johansson"]
+TITLE_WORDS = ["analysis", "learning", "networks", "growth", "education", "climate", "policy", "adaptive",
+               "evidence", "models", "regional", "social", "dynamics", "reading", "soil", "urban", "health",
+               "longitudinal", "effects", "patterns", "teachers", "measurement", "systems", "change",
+               "digital", "forest", "language", "students", "markets", "energy"]
+TITLE_STARTS = ["Effects of", "Towards", "Rethinking", "A study of", "Modelling", "Understanding",
+                "Measuring", "On the", "Evidence on", "Patterns of"]
+JOURNALS = ["Journal of Applied Studies", "Computers and Society", "Environmental Research Letters",
+            "Scandinavian Journal of Education", "Review of Economic Dynamics", "Language Learning",
+            "Forest Ecology", "Health Policy"]
+BODY_WORDS = ["the", "of", "and", "results", "data", "we", "in", "this", "study", "show", "that", "model",
+              "a", "is", "were", "analysis", "observed", "for", "with", "method", "sample", "effect",
+              "participants", "between", "significant", "previous", "work", "suggests", "approach", "to"]
+SECTIONS = ["Introduction", "Background", "Materials and methods", "Results", "Discussion", "Conclusions"]
+
+HEADER_EVEN = "Journal of Synthetic Research 14 (2019) 101-130"
+HEADER_ODD = "A. Author et al. / Synthetic article for benchmarking"
+
+
+class SyntheticReference(object):
+    """
+    Ground truth of one generated reference.
+    text is the reference as the parser should return it (numbering removed, whitespace collapsed).
+    """
+    def __init__(self, text, year, lastnames):
+        self.text = text
+        self.year = year
+        self.lastnames = lastnames
+
+    def __str__(self):
+        return self.text
+
+    def to_dict(self):
+        return {"text": self.text, "year": self.year, "lastnames": self.lastnames}
+
+
+class SyntheticArticle(object):
+    """Generated pages with the references they contain"""
+    def __init__(self, pages, references, settings):
+        self.pages = pages
+        self.references = references
+        self.settings = settings
+
+    def __str__(self):
+        return "\n\n".join(self.pages)
+
+
+def generate_article(pages=12, references=40, style="apa", two_columns=False, headers=True, footers=True,
+                     lines_per_page=50, width=96, seed=0):
+    """
+    Generates a SyntheticArticle of given number of pages ending with a reference section.
+    style: one of REFERENCE_STYLES
+        apa: author-year references, continuation lines flush left
+        iso690: "Lastname FN" authors and year at the end, continuation lines flush left
+        indented: apa references with hanging indentation
+        numbered: numbered iso690 references, continuation lines aligned after the number
+    The reference section takes as many pages as it needs, the rest of the pages are body text.
+    """
+    if style not in REFERENCE_STYLES:
+        raise ValueError(f"Unknown reference style: {style}. Use one of {REFERENCE_STYLES}")
+
+    rng = random.Random(seed)
+    settings = {"pages": pages, "references": references, "style": style, "two_columns": two_columns,
+                "headers": headers, "footers": footers, "lines_per_page": lines_per_page, "width": width,
+                "seed": seed}
+
+    gutter = 4
+    column_width = (width - gutter) // 2 if two_columns else width
+    rows_per_column = lines_per_page - (2 if headers else 0) - (2 if footers else 0)
+    rows_per_page = rows_per_column * (2 if two_columns else 1)
+
+    truth = [_generate_reference(rng, style) for _ in range(references)]
+    reference_lines = ["", "References", ""]
+    for number, ref in enumerate(truth, start=1):
+        reference_lines += _layout_reference(ref, style, number, column_width)
+
+    body_rows = max(pages * rows_per_page - len(reference_lines), rows_per_column)
+    lines = _body_lines(rng, body_rows, column_width) + reference_lines
+
+    page_texts = []
+    for page_nr, start in enumerate(range(0, len(lines), rows_per_page)):
+        page_lines = lines[start:start + rows_per_page]
+        if two_columns:
+            rows = _two_column_rows(page_lines[:rows_per_column], page_lines[rows_per_column:], column_width, gutter)
+        else:
+            rows = page_lines
+        page_texts.append(_page_text(rows, page_nr, headers, footers, width))
+
+    return SyntheticArticle(page_texts, truth, settings)
+
+
+def _generate_reference(rng, style):
+    """Returns SyntheticReference of random authors, year, title and journal in given style"""
+    lastnames = rng.sample(LASTNAMES, rng.randint(1, 4))
+    initials = ["".join(rng.choice("ABCDEFGHJKLMNPRST") for _ in range(rng.randint(1, 2))) for _ in lastnames]
+    year = rng.randint(1960, 2019)
+    title = rng.choice(TITLE_STARTS) + " " + " ".join(rng.sample(TITLE_WORDS, rng.randint(2, 6)))
+    journal = rng.choice(JOURNALS)
+    volume, issue, first_page = rng.randint(1, 60), rng.randint(1, 12), rng.randint(1, 900)
+    pages = f"{first_page}-{first_page + rng.randint(5, 30)}"
+
+    if style in ["apa", "indented"]:
+        names = [f"{lastname}, " + " ".join(initial + "." for initial in name_initials)
+                 for lastname, name_initials in zip(lastnames, initials)]
+        if len(names) > 1:
+            names[-1] = "& " + names[-1]
+        text = f"{', '.join(names)} ({year}). {title}. {journal}, {volume}({issue}), {pages}."
+    else:
+        names = [f"{lastname} {name_initials}" for lastname, name_initials in zip(lastnames, initials)]
+        text = f"{', '.join(names)}. {title}. {journal} {volume}({issue}):{pages}, {year}."
+    return SyntheticReference(text, year, lastnames)
+
+
+def _layout_reference(ref, style, number, column_width):
+    """Returns the reference wrapped into lines of a column in the layout of the style"""
+    if style == "numbered":
+        prefix = f"{number}. "
+        return textwrap.wrap(ref.text, column_width, initial_indent=prefix, subsequent_indent=" " * len(prefix),
+                             break_long_words=False, break_on_hyphens=False)
+    elif style == "indented":
+        return textwrap.wrap(ref.text, column_width, subsequent_indent="    ",
+                             break_long_words=False, break_on_hyphens=False)
+    return textwrap.wrap(ref.text, column_width, break_long_words=False, break_on_hyphens=False)
+
+
+def _body_lines(rng, rows, column_width):
+    """Returns rows of body text: title, section headings and paragraphs with in-text citations"""
+    lines = ["Synthetic article for benchmarking reference extraction", ""]
+    sections = iter(SECTIONS)
+    while len(lines) < rows:
+        section = next(sections, None)
+        if section is not None and rng.random() < 0.3:
+            lines += ["", section, ""]
+        words = []
+        for _ in range(rng.randint(4, 8)):
+            sentence = rng.sample(BODY_WORDS, rng.randint(6, 14))
+            if rng.random() < 0.3:
+                sentence.append(f"({rng.choice(LASTNAMES)}, {rng.randint(1960, 2019)})")
+            sentence[0] = sentence[0].capitalize()
+            words.append(" ".join(sentence) + ".")
+        lines += textwrap.wrap(" ".join(words), column_width) + [""]
+    return lines[:rows]
+
+
+def _two_column_rows(left, right, column_width, gutter):
+    rows = []
+    for row_nr in range(len(left)):
+        right_row = right[row_nr] if row_nr < len(right) else ""
+        rows.append((left[row_nr].ljust(column_width + gutter) + right_row).rstrip())
+    return rows
+
+
+def _page_text(rows, page_nr, headers, footers, width):
+    """Adds header and footer rows to page rows and returns the page as pdftotext would"""
+    page_rows = []
+    if headers:
+        header = HEADER_EVEN if page_nr % 2 == 0 else HEADER_ODD
+        page_rows += [header.rjust(width) if page_nr % 2 == 0 else header, ""]
+    page_rows += rows
+    if footers:
+        page_rows += ["", str(101 + page_nr).center(width).rstrip()]
+    return "\n".join(page_rows) + "\n"
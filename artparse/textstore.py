@@ -0,0 +1,54 @@
+from bisect import bisect_right
+
+PAGE_SEPARATOR = "\n\n"
+
+
+class DocumentText(object):
+    """
+    Full text of a document, joined once from its pages, with the offset where each page starts.
+    Stages share the same buffer and take slices of it (or search it with pos/endpos)
+    instead of joining the pages again.
+    """
+    def __init__(self, pages, page_offset=0):
+        self.pages = list(pages)
+        self.page_offset = page_offset
+        self.page_starts = []
+        position = 0
+        for page in self.pages:
+            self.page_starts.append(position)
+            position += len(page) + len(PAGE_SEPARATOR)
+        self.text = PAGE_SEPARATOR.join(self.pages) + PAGE_SEPARATOR if self.pages else ""
+
+    def __len__(self):
+        return len(self.text)
+
+    def __str__(self):
+        return self.text
+
+    def is_current(self, pages):
+        """Checks whether the text was built from exactly these page strings"""
+        if pages is None or len(pages) != len(self.pages):
+            return False
+        return all(page is stored for page, stored in zip(pages, self.pages))
+
+    def slice(self, start=0, end=None):
+        return self.text[start:end]
+
+    def page_span(self, page_index):
+        """Returns (start, end) offsets of a page, page_index counting from the first stored page"""
+        start = self.page_starts[page_index]
+        return (start, start + len(self.pages[page_index]))
+
+    def page_index(self, offset):
+        """Returns the index of the stored page containing the offset"""
+        return max(bisect_right(self.page_starts, offset) - 1, 0)
+
+    def locate(self, offset):
+        """Maps an offset in the full text to (page_number, line_number), both counting from zero"""
+        if len(self.pages) == 0:
+            return None
+        page_index = self.page_index(offset)
+        page_start = self.page_starts[page_index]
+        offset = min(offset, page_start + len(self.pages[page_index]))
+        line_nr = self.text.count("\n", page_start, offset)
+        return (self.page_offset + page_index, line_nr)
@@ -0,0 +1,15 @@
+import pytest
+from artparse import synthetic
+
+
+@pytest.fixture
+def article():
+    return synthetic.generate_article(pages=8, references=20, style="numbered")
+
+
+@pytest.fixture
+def pdffile(tmp_path):
+    # Any file does, StubBackend returns its pages for every pdf
+    path = tmp_path / "article.pdf"
+    path.write_bytes(b"%PDF-1.4 stub")
+    return str(path)
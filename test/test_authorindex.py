@@ -0,0 +1,35 @@
+from artparse.author import Author
+from artparse.authorindex import AuthorIndex, author_key, trigram_similarity
+from artparse.reference import Reference
+
+
+def test_author_index_resolves_variants():
+    index = AuthorIndex()
+    first = index.resolve(Author("T. S.", "Müller"))
+    assert index.resolve(Author("TS", "Muller")) == first
+    assert index.resolve(Author("T.", "van Muller")) == first
+    assert index.resolve(Author("K.", "Muller")) != first
+
+    sawyer = index.resolve(Author("Tom", "Sawyer"))
+    assert index.resolve(Author("T.", "Sawyer")) == sawyer
+    assert index.lookup(Author("T.", "Sawyers")) == sawyer
+    assert index.lookup(Author("J.", "Nobody")) is None
+
+    organization = index.resolve(Author(non_person_author="World Health Organization"))
+    assert organization not in (first, sawyer)
+    assert len(index) == 4
+
+
+def test_author_keys():
+    assert author_key(Author("T. S.", "van Müller")) == ("person", "muller", "ts")
+    assert author_key(Author(non_person_author="WHO"))[0] == "organization"
+    assert trigram_similarity("sawyer", "sawyer") == 1.0
+
+
+def test_add_author_skips_duplicates():
+    ref = Reference("x")
+    ref.authors.append(Author("T.", "Smith"))
+    ref.authors.append(Author("T.", "Smith"))
+    assert ref.add_author(Author("T", "Smith")) == -1
+    assert ref.add_author(Author("K.", "Jones")) is None
+    assert len(ref.authors) == 3
@@ -0,0 +1,44 @@
+import io
+import pytest
+from artparse import backends
+from artparse.backends import StubBackend
+from artparse.parsecontrol import extract, extract_text
+
+
+class BrokenBackend(backends.Backend):
+    name = "broken"
+
+    def pages(self, infile):
+        raise ValueError("cannot open")
+
+
+def test_extract_with_stub_backend_equals_text(article, pdffile):
+    references = extract(pdffile, backend=StubBackend(article.pages))
+    expected = extract_text(article.pages)
+    assert len(references) >= len(article.references)
+    assert [ref.rawtext for ref in references] == [ref.rawtext for ref in expected]
+    assert all(ref.page is not None for ref in references)
+
+
+def test_probe_selects_backend_with_usable_text(article):
+    glyphs = StubBackend(["�" * 200] * len(article.pages), name="glyphs")
+    text = StubBackend(article.pages, name="text")
+    result = backends.probe(io.BytesIO(b"%PDF-1.4"), [BrokenBackend(), glyphs, text], fallback=BrokenBackend())
+    assert result.backend is text
+    assert result.pages == article.pages
+    assert set(result.timings) == {"broken", "glyphs", "text"}
+    assert not result.timings["broken"][1] and not result.timings["glyphs"][1]
+
+
+def test_probe_falls_back_when_no_backend_opens():
+    fallback = StubBackend(["Plain text of a page with enough letters to be usable, " * 3], name="fallback")
+    result = backends.probe(io.BytesIO(b"%PDF-1.4"), [BrokenBackend()], fallback=fallback)
+    assert result.backend is fallback
+    assert backends.probe(io.BytesIO(b""), [BrokenBackend()], fallback=None).backend is None
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        backends.get_backend("nothing")
+    assert backends.probe_page_numbers(10, 2) == [4, 9]
+    assert backends.probe_page_numbers(1, 2) == [0]
@@ -0,0 +1,51 @@
+import copy
+import json
+import pytest
+from artparse import benchmark, synthetic
+from artparse.parsecontrol import extract_text
+
+# iso690 references have their year at the end and flush left continuation
+# lines, the parser only finds a few of them so far
+RECALL_FLOORS = {"apa": 1.0, "indented": 1.0, "numbered": 1.0, "iso690": 0.1}
+
+
+def test_generated_article_is_reproducible():
+    settings = {"pages": 6, "references": 10, "style": "apa", "two_columns": True, "seed": 3}
+    first, second = synthetic.generate_article(**settings), synthetic.generate_article(**settings)
+    assert first.pages == second.pages
+    assert [ref.to_dict() for ref in first.references] == [ref.to_dict() for ref in second.references]
+    assert len(first.pages) == 6 and len(first.references) == 10
+
+
+def test_run_case_times_stages():
+    results = benchmark.run([("numbered", {"pages": 6, "references": 10, "style": "numbered"})], repeat=2)
+    case = results["cases"][0]
+    assert case["error"] is None
+    assert case["accuracy"]["recall"] == 1.0
+    assert {"read", "normalize_layout", "parse", "extract_authors"} <= set(case["stages"])
+    assert case["total"]["pages_per_second"] > 0
+    # Results are saved as JSON
+    assert json.loads(json.dumps(results)) == results
+
+
+def test_compare_reports_changes():
+    previous = benchmark.run([("numbered", {"pages": 6, "references": 10, "style": "numbered"})], repeat=1)
+    current = copy.deepcopy(previous)
+    current["cases"][0]["accuracy"]["recall"] = 0.5
+    lines = benchmark.compare(previous, current)
+    assert len(lines) == 1
+    assert "recall 100.0% -> 50.0%" in lines[0]
+
+
+@pytest.mark.parametrize("style", sorted(RECALL_FLOORS))
+def test_extract_text_finds_references(style):
+    article = synthetic.generate_article(pages=8, references=20, style=style)
+    found = benchmark.score(extract_text(article.pages), article.references)
+    assert found["recall"] >= RECALL_FLOORS[style]
+
+
+@pytest.mark.xfail(reason="iso690 references are not split reliably yet", strict=True)
+def test_extract_text_finds_iso690_references():
+    article = synthetic.generate_article(pages=8, references=20, style="iso690")
+    found = benchmark.score(extract_text(article.pages), article.references)
+    assert found["recall"] == 1.0
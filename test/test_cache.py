@@ -0,0 +1,73 @@
+import os
+import pickle
+from artparse.backends import StubBackend
+from artparse.cache import ResultCache
+from artparse.author import Author
+from artparse.reference import Reference
+from artparse.parsecontrol import extract
+
+PAGES = ["first page\nwith two lines", "", "third page: ünïcode ✓"]
+
+
+def make_reference():
+    ref = Reference("Smith, J. (2001). Title. Journal.")
+    ref.year = 2001
+    ref.page, ref.line = 3, 7
+    ref.span_year_start, ref.span_year_end = 11, 15
+    ref.add_author(Author("J.", "Smith"))
+    return ref
+
+
+def test_cache_round_trip(tmp_path):
+    with ResultCache(str(tmp_path / "cache.db")) as cache:
+        cache.put_pages("abc", PAGES, page_offset=2)
+        assert cache.get_pages("abc") == (PAGES, 2)
+        assert cache.get_pages("missing") is None
+
+        key = cache.result_key("abc", {"streaming": True})
+        assert key != cache.result_key("abc", {"streaming": False})
+        cache.put_references(key, [make_reference()])
+        assert [ref.to_dict() for ref in cache.get_references(key)] == [make_reference().to_dict()]
+
+        cache.put_ocr_text("page", "recognized")
+        assert cache.get_ocr_text("page") == "recognized"
+        stats = cache.stats()
+        assert stats["entries"] == 3
+        assert stats["pages_hits"] == 1 and stats["pages_misses"] == 1
+        assert stats["size"] > 0
+
+
+def test_cache_keeps_size_and_evicts(tmp_path):
+    path = str(tmp_path / "cache.db")
+    with ResultCache(path, max_size=2000) as cache:
+        for number in range(20):
+            cache.put_ocr_text(str(number), os.urandom(200).hex())
+        stats = cache.stats()
+        assert 0 < stats["size"] <= 2000
+        assert stats["evictions"] > 0
+        assert cache.get_ocr_text("19") is not None
+        assert cache.get_ocr_text("0") is None
+        size = stats["size"]
+    with ResultCache(path, max_size=2000) as cache:
+        assert cache.stats()["size"] == size
+        cache.clear()
+        assert cache.stats()["size"] == 0
+
+
+def test_cache_can_be_pickled(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache.db"))
+    cache.put_ocr_text("page", "text")
+    copy = pickle.loads(pickle.dumps(cache))
+    assert copy.get_ocr_text("page") == "text"
+    copy.close()
+    cache.close()
+
+
+def test_cached_references_are_reused(article, pdffile, tmp_path):
+    cache = ResultCache(str(tmp_path / "cache.db"))
+    first = extract(pdffile, cache=cache, backend=StubBackend(article.pages))
+    # An empty backend would find nothing, so the references have to come from the cache
+    second = extract(pdffile, cache=cache, backend=StubBackend([], name="stub"))
+    assert [ref.to_dict() for ref in second] == [ref.to_dict() for ref in first]
+    assert cache.stats()["references_hits"] == 1
+    cache.close()
@@ -0,0 +1,47 @@
+from difflib import SequenceMatcher
+import pytest
+from artparse import dedup, patterns
+from artparse.author import Author
+from artparse.reference import Reference
+
+
+def make_reference(rawtext, year, lastname, title):
+    ref = Reference(rawtext)
+    ref.year = year
+    ref.title = title
+    ref.authors.append(Author("J.", lastname))
+    return ref
+
+
+@pytest.mark.parametrize("text1, text2", [("deep learning of things", "deep learning of thing"),
+                                          ("abc", "xyz"), ("", ""), ("survey", "a survey of methods")])
+def test_similarity_is_ratio_without_threshold(text1, text2):
+    assert dedup.similarity(text1, text2) == SequenceMatcher(None, text1, text2, autojunk=False).ratio()
+
+
+def test_similarity_bound_below_threshold():
+    ratio = SequenceMatcher(None, "short", "a much longer text", autojunk=False).ratio()
+    bound = dedup.similarity("short", "a much longer text", 0.9)
+    assert ratio <= bound < 0.9
+    assert dedup.similarity("same title", "same title", 0.9) == 1.0
+
+
+def test_deduplicate_finds_variants():
+    references = [
+        make_reference("a", 2001, "Smith", "Deep learning of reference parsing"),
+        make_reference("b", 2002, "Jones", "Something else entirely"),
+        make_reference("c", 2001, "Smith", "Deep learning of reference parsing."),
+        make_reference("d", 2001, "Smyth", "Deep learning of reference parsing"),
+        make_reference("e", 2005, "Smith", "Deep learning of reference parsing"),
+    ]
+    assert dedup.deduplicate(references) == [[0, 2, 3]]
+
+
+def test_signature_folds_names_and_titles():
+    sig = dedup.signature(make_reference("x", 1999, "Müller-Lyer", "The  Title, of: Things!"))
+    assert sig == dedup.Signature(1999, "mullerlyer", "the title of things")
+    assert dedup.blocking_keys(dedup.Signature(None, "smith", "title")) == []
+
+
+def test_fold_text():
+    assert patterns.fold_text("Müller  Ångström") == "muller angstrom"
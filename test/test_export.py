@@ -0,0 +1,70 @@
+import json
+import pytest
+from artparse import export
+from artparse.author import Author
+from artparse.parsecontrol import ExtractionResult
+from artparse.reference import Reference
+
+
+def make_reference(rawtext, lastnames, year=None):
+    ref = Reference(rawtext)
+    ref.pdffile = "doc.pdf"
+    ref.year = year
+    for lastname in lastnames:
+        ref.authors.append(Author(lastname[0] + ".", lastname))
+    return ref
+
+
+def make_references():
+    references = [make_reference("Smith, J. (2001). First.", ["Smith"], 2001),
+                  make_reference("", []),
+                  make_reference("Jones, K. & Smith, J. (1999). Sëcond ✓.", ["Jones", "Smith"], 1999)]
+    for number, ref in enumerate(references):
+        ref.page, ref.line = number, number * 10
+    references[0].span_year_start, references[0].span_year_end = 11, 15
+    references[2].title = "Sëcond"
+    return references
+
+
+def test_jsonl_writer(tmp_path):
+    path = str(tmp_path / "out.jsonl")
+    references = make_references()
+    with export.open_writer(path) as writer:
+        assert writer.write(references) == 3
+        assert writer.write_result(ExtractionResult("other.pdf", references=references[:1])) == 1
+        assert writer.write_result(ExtractionResult("failed.pdf", error="broken")) == 0
+    with open(path, encoding="utf8") as infile:
+        records = [json.loads(line) for line in infile]
+    assert [record["source"] for record in records] == ["doc.pdf"] * 3 + ["other.pdf"]
+    assert [record["index"] for record in records] == [0, 1, 2, 0]
+    assert records[2]["rawtext"] == references[2].rawtext
+    assert records[2]["authors"] == [aut.to_dict() for aut in references[2].authors]
+    assert set(records[0]) == set(export.RECORD_FIELDS)
+    assert writer.documents == 2 and writer.references == 4
+
+    with export.open_writer(path, append=True) as writer:
+        writer.write(references[:1])
+    with open(path, encoding="utf8") as infile:
+        assert len(infile.readlines()) == 5
+
+
+def test_parquet_writer(tmp_path):
+    pyarrow_parquet = pytest.importorskip("pyarrow.parquet")
+    path = str(tmp_path / "out.parquet")
+    references = make_references()
+    with export.open_writer(path, row_group_size=2) as writer:
+        writer.write(references)
+        writer.write(references, source="again.pdf")
+    table = pyarrow_parquet.read_table(path)
+    assert table.num_rows == 6
+    assert table.column("rawtext").to_pylist() == [ref.rawtext for ref in references] * 2
+    assert table.column("source").to_pylist()[3:] == ["again.pdf"] * 3
+
+    with export.open_writer(path, append=True) as writer:
+        writer.write(references)
+    assert writer.path.endswith("out-1.parquet")
+
+
+def test_unknown_output_format():
+    with pytest.raises(ValueError):
+        export.open_writer("out.csv")
@@ -0,0 +1,38 @@
+from artparse import patterns
+from artparse.reference import Reference, ReferenceFeatures, YearSpan
+
+TEXT = "Smith, J., & Jones, K. (2019a). A title: on things. Journal of Stuff, 12(3), 45-67."
+
+
+def test_years_with_suffix():
+    assert ReferenceFeatures(TEXT).years == [YearSpan(24, 28, 29)]
+    assert ReferenceFeatures("No year here, only 1850 and 2150").years == []
+
+
+def test_punctuation_offsets():
+    punctuation = ReferenceFeatures(TEXT).punctuation
+    assert punctuation["&"] == [TEXT.index("&")]
+    assert punctuation[":"] == [TEXT.index(":")]
+    assert punctuation[";"] == []
+    for char, offsets in punctuation.items():
+        assert len(offsets) == TEXT.count(char)
+
+
+def test_capitalized_tokens():
+    tokens = [TEXT[start:end] for start, end in ReferenceFeatures(TEXT).capitalized_tokens]
+    assert tokens[:4] == ["Smith", "J", "Jones", "K"]
+
+
+def test_authors_before_year():
+    features = ReferenceFeatures(TEXT)
+    end = TEXT.index("(")
+    assert features.authors(end, True) == ["Smith, J.,", "Jones, K."]
+    assert patterns.count_authors(features.author_text(end), True) == 2
+
+
+def test_features_follow_rawtext():
+    ref = Reference("Smith, J. (2001). Title.")
+    assert ref.features.years[0].start == ref.rawtext.index("2001")
+    ref.rawtext = "Jones, K. (1999). Other."
+    assert ref.features.text == ref.rawtext
+    assert ref.features.years[0].start == ref.rawtext.index("1999")
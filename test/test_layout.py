@@ -0,0 +1,68 @@
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from artparse import layout, synthetic
+from artparse.artparser import Extractor
+
+
+def read_article(pages):
+    article = Extractor()
+    article.read_pages(pages)
+    article.detect_headers_footers()
+    return article
+
+
+@pytest.mark.parametrize("style", synthetic.REFERENCE_STYLES)
+@pytest.mark.parametrize("two_columns", [False, True])
+def test_normalize_layout_equals_separate_stages(style, two_columns):
+    pages = synthetic.generate_article(pages=6, references=20, style=style, two_columns=two_columns).pages
+    combined = read_article(pages)
+    combined.normalize_layout()
+
+    separate = read_article(pages)
+    separate.remove_headers_footers()
+    separate.detect_columns()
+    separate.columns_to_one()
+    separate.remove_document_margins()
+
+    assert combined.pdf == separate.pdf
+    assert combined.column_info == separate.column_info
+
+
+def test_two_column_pages_have_splits():
+    pages = synthetic.generate_article(pages=4, references=20, two_columns=True).pages
+    article = read_article(pages)
+    article.normalize_layout()
+    assert any(len(splits) > 0 for splits in article.column_info)
+
+
+def test_normalize_pages_in_pool_equals_serial():
+    pages = synthetic.generate_article(pages=12, references=30, two_columns=True).pages
+    trims = [(1, 1)] * len(pages)
+    serial = layout.normalize_pages(pages, trims)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        assert layout.normalize_pages(pages, trims, executor) == serial
+        assert layout.normalize_pages(pages, trims, executor, workers=5) == serial
+
+
+def test_layout_pool_is_reused():
+    article = synthetic.generate_article(pages=12, references=30, two_columns=True)
+    executor = layout.get_executor(2)
+    assert layout.get_executor(2) is executor
+    parallel = read_article(article.pages)
+    parallel.layout_executor = executor
+    parallel.normalize_layout()
+    serial = read_article(article.pages)
+    serial.normalize_layout()
+    assert parallel.pdf == serial.pdf
+    assert layout.get_executor(2) is executor
+
+
+def test_normalize_page_drops_header_and_footer():
+    page = synthetic.generate_article(pages=4, references=20).pages[1]
+    lines = page.splitlines()
+    text, grid, page_layout = layout.normalize_page(page, header_lines=1, footer_lines=1)
+    assert lines[0] not in text
+    assert lines[-1].strip() not in text
+    assert page_layout.header_lines == 1 and page_layout.footer_lines == 1
+    assert page_layout.column_splits == []
+    assert grid.rows == len(text.splitlines())
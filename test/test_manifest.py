@@ -0,0 +1,72 @@
+import pytest
+from artparse import parsecontrol
+from artparse.manifest import Manifest, DONE, FAILED
+from artparse.parse import batch_main
+from artparse.parsecontrol import batch_extract, watch_folder
+
+
+class StopWatching(Exception):
+    pass
+
+
+def stop_after(checks):
+    """Replacement of time.sleep that ends a watch after the given number of checks"""
+    calls = []
+
+    def sleep(seconds):
+        calls.append(seconds)
+        if len(calls) >= checks:
+            raise StopWatching()
+    return sleep
+
+
+def write_documents(directory, article, count=3):
+    directory.mkdir()
+    for number in range(count):
+        (directory / f"article{number}.txt").write_text("\f".join(article.pages), encoding="utf8")
+
+
+def test_batch_with_manifest(article, tmp_path):
+    documents = tmp_path / "documents"
+    write_documents(documents, article)
+    manifest = Manifest(str(tmp_path / "manifest.db"))
+
+    results = list(batch_extract([str(documents)], jobs=1, manifest=manifest, text_input=True))
+    assert len(results) == 3
+    for result in results:
+        assert result.ok
+        assert result.fingerprint is not None
+        manifest.record_result(result)
+    assert manifest.stats() == {DONE: 3}
+    assert list(batch_extract([str(documents)], jobs=1, manifest=manifest, text_input=True)) == []
+    manifest.close()
+
+
+def test_watch_retries_failed_documents_once(tmp_path, monkeypatch):
+    documents = tmp_path / "documents"
+    documents.mkdir()
+    broken = documents / "broken.pdf"
+    broken.write_bytes(b"not a pdf")
+    manifest = Manifest(str(tmp_path / "manifest.db"))
+    manifest.record(str(broken), error="failed before")
+
+    monkeypatch.setattr(parsecontrol.time, "sleep", stop_after(5))
+    results = []
+    with pytest.raises(StopWatching):
+        for result in watch_folder([str(documents)], manifest, interval=0, jobs=1, retry_failed=True,
+                                   backend="pypdf2"):
+            results.append(result)
+            manifest.record_result(result)
+    assert [(result.filename, result.ok) for result in results] == [(str(broken), False)]
+    assert manifest.stats() == {FAILED: 1}
+    manifest.close()
+
+
+def test_watch_needs_durable_writer(tmp_path):
+    class ClosedWriter(object):
+        path = str(tmp_path / "out.parquet")
+        durable_documents = False
+
+    with pytest.raises(ValueError):
+        batch_main([str(tmp_path)], writer=ClosedWriter(), manifest=Manifest(str(tmp_path / "manifest.db")),
+                   watch=0)
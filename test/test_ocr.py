@@ -0,0 +1,56 @@
+from PyPDF2 import PdfWriter, PageObject
+from PyPDF2.generic import DictionaryObject, EncodedStreamObject, NameObject
+from artparse import pdfmanipulate
+from artparse.events import EventSink
+
+
+class RecordingSink(EventSink):
+    enabled = True
+
+    def __init__(self):
+        self.events = []
+
+    def emit(self, event, message="", **fields):
+        self.events.append((event, fields))
+
+
+def write_scan(path, image_data, filter_name="/JBIG2Decode"):
+    """Writes a one page pdf that draws an image stream encoded with filter_name"""
+    writer = PdfWriter()
+    image = EncodedStreamObject()
+    image[NameObject("/Type")] = NameObject("/XObject")
+    image[NameObject("/Subtype")] = NameObject("/Image")
+    image[NameObject("/Filter")] = NameObject(filter_name)
+    image._data = image_data
+    reference = writer._add_object(image)
+    page = PageObject.create_blank_page(width=100, height=100)
+    page[NameObject("/Resources")] = DictionaryObject(
+        {NameObject("/XObject"): DictionaryObject({NameObject("/Im0"): reference})})
+    writer.add_page(page)
+    with open(path, "wb") as outfile:
+        writer.write(outfile)
+
+
+def test_page_digests_of_jbig2_scans(tmp_path):
+    paths = [str(tmp_path / name) for name in ["first.pdf", "copy.pdf", "other.pdf"]]
+    write_scan(paths[0], b"jbig2 image")
+    write_scan(paths[1], b"jbig2 image")
+    write_scan(paths[2], b"another image")
+    sink = RecordingSink()
+    digests = [pdfmanipulate.page_digests(path, [0], sink)[0] for path in paths]
+    assert digests[0] == digests[1] != digests[2]
+    assert sink.events == []
+
+
+def test_page_digests_of_unreadable_pdf(tmp_path):
+    path = tmp_path / "broken.pdf"
+    path.write_bytes(b"not a pdf")
+    sink = RecordingSink()
+    digests = pdfmanipulate.page_digests(str(path), [0, 1], sink)
+    assert len(set(digests.values())) == 2
+    assert [event for event, _ in sink.events] == ["error"]
+
+
+def test_textless_pages():
+    pages = ["Plenty of text on this page, more than enough", "", "  12  ", "Another page with its text layer"]
+    assert pdfmanipulate.textless_pages(pages) == [1, 2]
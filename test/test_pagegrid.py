@@ -0,0 +1,27 @@
+from artparse import synthetic
+from artparse.pagegrid import PageGrid, detect_column_splits, column_bounds
+
+WORDS = "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor".split()
+
+
+def column_lines(number, width, rows):
+    """Lines of ragged text of at most width characters"""
+    lines = []
+    for row in range(rows):
+        words = [WORDS[(row + number + index) % len(WORDS)] for index in range(6)]
+        lines.append(" ".join(words)[:width - 1 - row % 5].rstrip())
+    return lines
+
+
+def test_three_columns():
+    columns = [column_lines(number, 25, 30) for number in range(3)]
+    page = "\n".join("".join(f"{line:<{30}}" for line in row).rstrip() for row in zip(*columns))
+    splits = detect_column_splits(PageGrid.from_page(page))
+    assert splits == [30, 60]
+    assert column_bounds(splits) == [(0, 30), (30, 60), (60, None)]
+
+
+def test_single_column_has_no_splits():
+    assert detect_column_splits(PageGrid.from_page("\n".join(column_lines(0, 70, 30)))) == []
+    page = synthetic.generate_article(pages=4, references=20, style="numbered").pages[-1]
+    assert detect_column_splits(PageGrid.from_page(page)) == []
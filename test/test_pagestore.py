@@ -0,0 +1,53 @@
+import pytest
+from artparse import pagestore
+from artparse.backends import StubBackend
+from artparse.cache import file_digest
+from artparse.parsecontrol import extract
+
+PAGES = ["first page\nwith two lines", "", "third page: ünïcode ✓"]
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_page_store_round_trip(tmp_path, compress):
+    path = str(tmp_path / "doc.pages")
+    pagestore.write_pages(path, PAGES, compress=compress, page_offset=4)
+    with pagestore.PageStore(path) as store:
+        assert len(store) == len(PAGES)
+        assert list(store) == PAGES
+        assert store[-1] == PAGES[-1]
+        assert store[1:] == PAGES[1:]
+        assert store.page_offset == 4
+        assert store.compressed == compress
+        with pytest.raises(IndexError):
+            store[len(PAGES)]
+
+
+def test_page_store_rejects_broken_files(tmp_path):
+    empty = tmp_path / "empty.pages"
+    empty.write_bytes(b"")
+    with pytest.raises(pagestore.PageStoreError):
+        pagestore.PageStore(str(empty))
+
+    path = str(tmp_path / "doc.pages")
+    pagestore.write_pages(path, PAGES)
+    with open(path, "rb") as infile:
+        data = infile.read()
+    truncated = tmp_path / "truncated.pages"
+    truncated.write_bytes(data[:-5])
+    with pytest.raises(pagestore.PageStoreError):
+        pagestore.PageStore(str(truncated))
+
+
+def test_store_path_by_digest(tmp_path):
+    pdf = tmp_path / "doc.pdf"
+    pdf.write_bytes(b"%PDF-1.4 content")
+    digest = file_digest(str(pdf))
+    assert pagestore.store_path("dir", str(pdf)) == pagestore.store_path("dir", None, digest=digest)
+    assert pagestore.store_path("dir", str(pdf), "ocr").endswith(f"{digest}-ocr{pagestore.EXTENSION}")
+
+
+def test_page_store_is_reused(article, pdffile, tmp_path):
+    store = str(tmp_path / "pages")
+    first = extract(pdffile, page_store_dir=store, backend=StubBackend(article.pages))
+    second = extract(pdffile, page_store_dir=store, backend=StubBackend([], name="stub"))
+    assert [ref.to_dict() for ref in second] == [ref.to_dict() for ref in first]
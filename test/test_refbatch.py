@@ -0,0 +1,80 @@
+import pytest
+from artparse.author import Author
+from artparse.backends import StubBackend
+from artparse.parsecontrol import extract
+from artparse.refbatch import ReferenceBatch
+from artparse.reference import Reference
+
+
+def make_reference(rawtext, lastnames, year=None):
+    ref = Reference(rawtext)
+    ref.pdffile = "doc.pdf"
+    ref.year = year
+    for lastname in lastnames:
+        ref.authors.append(Author(lastname[0] + ".", lastname))
+    return ref
+
+
+def make_references():
+    references = [make_reference("Smith, J. (2001). First.", ["Smith"], 2001),
+                  make_reference("", []),
+                  make_reference("Jones, K. & Smith, J. (1999). Sëcond ✓.", ["Jones", "Smith"], 1999)]
+    for number, ref in enumerate(references):
+        ref.page, ref.line = number, number * 10
+    references[0].span_year_start, references[0].span_year_end = 11, 15
+    references[2].title = "Sëcond"
+    return references
+
+
+def test_batch_views_equal_references():
+    references = make_references()
+    batch = ReferenceBatch(references)
+    assert len(batch) == len(references)
+    assert [view.to_dict() for view in batch] == [ref.to_dict() for ref in references]
+    assert batch[-1].rawtext == references[-1].rawtext
+    assert [view.rawtext for view in batch[1:]] == [ref.rawtext for ref in references[1:]]
+    assert batch.reference(2).to_dict() == references[2].to_dict()
+    assert batch.text() == "".join(ref.rawtext for ref in references)
+    with pytest.raises(IndexError):
+        batch[len(references)]
+
+
+def test_batch_interns_authors():
+    batch = ReferenceBatch(make_references())
+    assert len(batch.authors) == 2
+    assert batch[0].authors[0] is batch[2].authors[1]
+    assert batch[1].authors == []
+
+
+def test_batch_reads_while_appending():
+    batch = ReferenceBatch()
+    texts = [f"reference {number}" if number % 3 else "" for number in range(50)]
+    for number, text in enumerate(texts):
+        batch.append(Reference(text))
+        assert batch[number].rawtext == text
+        assert batch[number // 2].rawtext == texts[number // 2]
+    assert [view.rawtext for view in batch] == texts
+    assert batch.text() == "".join(texts)
+
+
+def test_batch_views_can_set_integer_fields():
+    batch = ReferenceBatch(make_references())
+    view = batch[1]
+    assert view.year is None
+    view.year = 2020
+    view.line = None
+    assert batch[1].year == 2020 and batch[1].line is None
+    assert view.features.years == []
+
+
+def test_batch_memory_usage_counts_text_size():
+    ascii_batch = ReferenceBatch([Reference("a" * 1000)])
+    wide_batch = ReferenceBatch([Reference("✓" * 1000)])
+    assert ascii_batch.memory_usage() < 1000 * 2 + 500
+    assert wide_batch.memory_usage() > ascii_batch.memory_usage()
+
+
+def test_references_do_not_keep_caches(article, pdffile):
+    for ref in extract(pdffile, backend=StubBackend(article.pages)):
+        assert ref._features is None
+        assert ref._author_keys is None
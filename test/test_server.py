@@ -0,0 +1,97 @@
+import asyncio
+import json
+import pytest
+from artparse import synthetic
+from artparse.server import ExtractionServer, HTTPError, _body_is_text
+
+
+async def request(port, method, path, body=None, content_type=None):
+    head = f"{method} {path} HTTP/1.1\r\nHost: localhost\r\n"
+    if body is not None:
+        head += f"Content-Length: {len(body)}\r\n"
+    if content_type is not None:
+        head += f"Content-Type: {content_type}\r\n"
+    return await send(port, head.encode("latin-1") + b"\r\n" + (body or b""))
+
+
+async def send(port, data):
+    """Sends raw request data and returns (status, response) once the server closes the connection"""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(data)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    status_line, _, payload = response.partition(b"\r\n\r\n")
+    return int(status_line.split()[1]), json.loads(payload)
+
+
+def run_with_server(requests, **settings):
+    """
+    Starts a server on a free port, sends the requests one by one and returns their (status, response).
+    A request is a tuple of request() arguments or raw bytes.
+    """
+    async def main():
+        server = ExtractionServer(port=0, jobs=1, **settings)
+        await server.start()
+        try:
+            return [await (send(server.port, arguments) if isinstance(arguments, bytes) else
+                           request(server.port, *arguments)) for arguments in requests]
+        finally:
+            await server.close()
+    return asyncio.run(main())
+
+
+def test_server_extracts_text():
+    article = synthetic.generate_article(pages=6, references=15, style="numbered")
+    text = "\f".join(article.pages).encode("utf8")
+    responses = run_with_server([("GET", "/health"),
+                                 ("POST", "/extract", text, "text/plain; charset=utf-8"),
+                                 ("POST", "/extract?text=1&streaming=1", text),
+                                 ("GET", "/metrics")])
+    assert responses[0] == (200, {"status": "ok"})
+    status, result = responses[1]
+    assert status == 200
+    assert len(result["references"]) >= len(article.references)
+    assert responses[2][0] == 200
+    assert responses[2][1]["references"] == result["references"]
+    status, metrics = responses[3]
+    assert status == 200
+    assert metrics["completed"] == 2 and metrics["failed"] == 0
+    assert metrics["latency"]["count"] == 2
+
+
+def test_server_rejects_bad_requests():
+    responses = run_with_server([("GET", "/nowhere"),
+                                 ("GET", "/extract"),
+                                 ("POST", "/extract"),
+                                 ("POST", "/extract", b"x" * 200),
+                                 ("POST", "/extract", b"\x89PNG\r\n\x1a\n", "image/png")],
+                                max_body=100)
+    assert [status for status, _ in responses] == [404, 405, 411, 413, 415]
+    assert all("error" in response for _, response in responses)
+
+
+def test_server_rejects_bad_content_length():
+    responses = run_with_server([b"POST /extract HTTP/1.1\r\nContent-Length: -1\r\n\r\n",
+                                 b"POST /extract HTTP/1.1\r\nContent-Length: many\r\n\r\n"])
+    assert [status for status, _ in responses] == [400, 400]
+
+
+def test_server_times_out_slow_clients():
+    # Neither a request head without its blank line nor a body shorter than its length holds the connection
+    responses = run_with_server([b"POST /extract HTTP/1.1\r\n",
+                                 b"POST /extract HTTP/1.1\r\nContent-Length: 10\r\n\r\nshort",
+                                 ("GET", "/health")],
+                                read_timeout=0.2)
+    assert [status for status, _ in responses] == [408, 408, 200]
+
+
+def test_body_types():
+    assert _body_is_text("text/plain", b"%PDF looks like a pdf")
+    assert not _body_is_text("application/pdf", b"anything")
+    assert not _body_is_text("", b"%PDF-1.4")
+    assert _body_is_text("application/octet-stream", "Smith, J. (2001). Tïtle.".encode("utf8"))
+    for content_type, body in [("", b"\xff\xfe\x00binary"), ("", b"text\x00with nul"), ("image/png", b"text")]:
+        with pytest.raises(HTTPError) as error:
+            _body_is_text(content_type, body)
+        assert error.value.status == 415
@@ -0,0 +1,24 @@
+from artparse import patterns
+from artparse.artparser import has_reference_heading
+from artparse.backends import StubBackend
+from artparse.parsecontrol import extract, extract_text
+
+
+def test_streaming_reads_last_pages(article, pdffile):
+    references = extract(pdffile, streaming=True, backend=StubBackend(article.pages))
+    assert [ref.rawtext for ref in references] == [ref.rawtext for ref in extract_text(article.pages)]
+
+
+def test_reference_heading():
+    assert patterns.REFERENCE_HEADING.search("Text\n  References\nSmith")
+    assert patterns.REFERENCE_HEADING.search("Text\n3. Literature cited\nSmith")
+    assert not patterns.REFERENCE_HEADING.search("See the references below")
+
+
+def test_reference_heading_inside_column():
+    left = ["Body text of the left column", "continues here", "and ends"]
+    right = ["References", "Smith, J. (2001). Title.", "Jones, K. (1999). Other."]
+    page = "\n".join(f"{l:<40}{r}" for l, r in zip(left, right))
+    assert not patterns.REFERENCE_HEADING.search(page)
+    assert has_reference_heading(page)
+    assert not has_reference_heading("Only body text\nwithout any heading")
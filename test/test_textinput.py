@@ -0,0 +1,19 @@
+from artparse.parsecontrol import extract, extract_text, find_documents, document_extensions
+
+
+def test_text_file_equals_text(article, tmp_path):
+    path = tmp_path / "article.txt"
+    path.write_text("\f".join(article.pages) + "\f", encoding="utf8")
+    references = extract(str(path))
+    assert [ref.rawtext for ref in references] == [ref.rawtext for ref in extract_text(article.pages)]
+    assert [ref.rawtext for ref in extract_text("\f".join(article.pages))] == [ref.rawtext for ref in references]
+
+
+def test_directories_hold_text_files_only_with_text_input(tmp_path):
+    for name in ("a.pdf", "b.txt", "README.txt"):
+        (tmp_path / name).write_bytes(b"")
+    assert find_documents([str(tmp_path)], document_extensions()) == [str(tmp_path / "a.pdf")]
+    assert find_documents([str(tmp_path)], document_extensions(text_input=True)) == [
+        str(tmp_path / name) for name in ("README.txt", "a.pdf", "b.txt")]
+    # Files given by name are used as given
+    assert find_documents([str(tmp_path / "b.txt")]) == [str(tmp_path / "b.txt")]
@@ -0,0 +1,34 @@
+from artparse.textstore import DocumentText, PAGE_SEPARATOR
+
+
+def test_text_joins_pages():
+    document = DocumentText(["first\npage", "second"])
+    assert document.text == "first\npage" + PAGE_SEPARATOR + "second" + PAGE_SEPARATOR
+    assert document.slice(*document.page_span(1)) == "second"
+
+
+def test_locate_pages_and_lines():
+    document = DocumentText(["a\nb\nc", "d\ne"], page_offset=3)
+    assert document.locate(0) == (3, 0)
+    assert document.locate(document.text.index("c")) == (3, 2)
+    assert document.locate(document.text.index("d")) == (4, 0)
+    assert document.locate(document.text.index("e")) == (4, 1)
+
+
+def test_locate_separator_belongs_to_previous_page():
+    document = DocumentText(["a\nb", "c"])
+    page_start, page_end = document.page_span(0)
+    assert document.locate(page_end) == (0, 1)
+    assert document.locate(page_end + 1) == (0, 1)
+
+
+def test_locate_empty_document():
+    assert DocumentText([]).locate(0) is None
+
+
+def test_is_current():
+    pages = ["one", "two"]
+    document = DocumentText(pages)
+    assert document.is_current(pages)
+    assert not document.is_current(["one"])
+    assert not document.is_current(None)
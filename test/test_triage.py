@@ -0,0 +1,35 @@
+import json
+from artparse.backends import StubBackend
+from artparse.parse import triage_main
+from artparse.parsecontrol import triage
+
+
+def test_triage(article, pdffile):
+    result = triage(pdffile, backend=StubBackend(article.pages))
+    assert result.page_count == len(article.pages)
+    assert result.has_text
+    assert not result.two_column
+    assert result.references_page is not None
+    assert result.error is None
+
+
+def test_triage_of_unreadable_pdf(tmp_path):
+    path = tmp_path / "broken.pdf"
+    path.write_bytes(b"%PDF-1.4 \xff\xfe broken")
+    for backend in ("pypdf2", "pdftotext-layout"):
+        result = triage(str(path), backend=backend)
+        assert result.error is not None
+        assert result.page_count is None and not result.has_text
+        assert result.backend == backend
+    assert triage(str(tmp_path / "missing.pdf")) is None
+
+
+def test_triage_main_reports_every_document(tmp_path, capsys):
+    for name in ("a.pdf", "b.pdf"):
+        (tmp_path / name).write_bytes(b"%PDF-1.4 \xff\xfe broken")
+    assert triage_main([str(tmp_path), str(tmp_path / "missing.pdf")], backend="pypdf2") == 3
+    captured = capsys.readouterr()
+    lines = [json.loads(line) for line in captured.out.splitlines()]
+    assert [line["filename"] for line in lines] == [str(tmp_path / "a.pdf"), str(tmp_path / "b.pdf")]
+    assert all(line["error"] for line in lines)
+    assert len(captured.err.splitlines()) == 3